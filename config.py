@@ -3,4 +3,29 @@ MIN_YIELD = 0.02
 ROLL_DTE_THRESHOLD = 5
 RSI_MAX = 70
 MIN_ROC = 0.10
-IV_PREFERRED = 0.5
\ No newline at end of file
+IV_PREFERRED = 0.5
+SNAPSHOT_TIMEOUT = 10  # seconds allowed for a full option-chain snapshot
+MAX_MKT_DATA_LINES = 90  # concurrent market-data subscriptions (IB default line limit is 100)
+MIN_DTE = 5  # chain pruning: shortest expiry considered
+MAX_DTE = 45  # chain pruning: longest expiry considered
+MAX_EXPIRIES = 3  # chain pruning: expiries quoted per cycle
+MONEYNESS_ITM = 0.05  # chain pruning: max fraction in-the-money
+MONEYNESS_OTM = 0.20  # chain pruning: max fraction out-of-the-money
+CONTRACT_CACHE_PATH = "data/contract_cache.json"
+CHAIN_PARAMS_TTL_HOURS = 24  # reqSecDefOptParams results are reused for this long
+COVERED_CALL_TIMEOUT = 120  # seconds before a covered-call cycle is cancelled
+CSP_TIMEOUT = 120  # seconds before a CSP cycle is cancelled
+STRATEGY_IO_WORKERS = 4  # thread pool for blocking helpers (yfinance, model, webhooks)
+MAX_CONCURRENT_STRATEGIES = 8  # strategy runs in flight at once across the watchlist
+RISK_FREE_RATE = 0.045  # annualized, used for Black-Scholes IV and greeks
+EARNINGS_CACHE_PATH = "data/earnings_calendar.json"
+EARNINGS_TTL_HOURS = 24  # earnings dates are refetched at most this often
+IV_HISTORY_DIR = "data/iv_history"
+IV_PERCENTILE_WINDOW = 252  # trading days in the IV percentile lookback
+REALIZED_VOL_WINDOW = 21  # closes in the rolling realized-vol estimate
+OPTIONS_STORE_DIR = "data/options"  # partitioned Parquet option-chain history
+COLLECT_MIN_DTE = 0  # snapshot collector: shortest expiry stored
+COLLECT_MAX_DTE = 60  # snapshot collector: longest expiry stored
+COLLECT_WORKERS = 8  # snapshot collector: concurrent Yahoo requests across the watchlist
+TRADE_DB_PATH = "logs/trades.db"  # SQLite (WAL) trade history
+TRADE_JOURNAL_PATH = "logs/trades.jsonl"  # append-only ML trade journal (+ .idx offsets, .lock)
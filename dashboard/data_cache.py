@@ -0,0 +1,147 @@
+# dashboard/data_cache.py
+"""
+Data access shared by the dashboard panels.
+
+Streamlit re-executes a panel on every widget interaction, but this module is
+imported once per server process, so the caches below are shared by every panel
+and every browser session. Each source is keyed on the (mtime, size) of its files:
+an unchanged file is served from memory without touching the disk, and a changed
+one is read incrementally. Trade rows are read by id past the last one seen
+(plus the pending rows that may since have been reconciled), journal records by
+the journal's offset index, and the model pickle is reloaded only when it is
+rewritten. Callers get copies, so panels can modify what they receive.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from config import TRADE_DB_PATH, TRADE_JOURNAL_PATH
+from utils.trade_journal import JournalReader, get_journal
+from utils.trade_model import TradeModel
+from utils.trade_store import get_trade_store
+
+MODEL_PATH = "models/trade_model.pkl"
+
+
+def _signature(*paths):
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class TradeHistoryCache:
+    """Trade store rows, refreshed from new ids and newly reconciled rows when the database changes."""
+
+    def __init__(self, path: str = TRADE_DB_PATH):
+        self.path = path
+        self.store = get_trade_store(path)
+        self.frame = pd.DataFrame()
+        self.last_id = 0
+        self.signature = None
+        self._lock = threading.Lock()
+
+    def load(self) -> pd.DataFrame:
+        # WAL mode: commits land in the -wal file until a checkpoint folds them into the database.
+        signature = _signature(self.path, f"{self.path}-wal")
+        with self._lock:
+            if signature != self.signature:
+                self._refresh()
+                self.signature = signature
+            return self.frame.copy()
+
+    def _refresh(self):
+        if self.store.max_id() < self.last_id:  # the newest rows were deleted or the database replaced; start over
+            self.frame, self.last_id = pd.DataFrame(), 0
+        frames = [self.store.query("id > ?", [self.last_id])]
+        if not self.frame.empty:
+            pending = self.frame.loc[self.frame["Actual PnL"].isnull(), "id"].tolist()
+            for i in range(0, len(pending), 500):
+                ids = pending[i:i + 500]
+                frames.append(self.store.query(f"actual_pnl IS NOT NULL AND id IN ({', '.join('?' * len(ids))})",
+                                               ids))
+        changed = [frame for frame in frames if not frame.empty]
+        if not changed:
+            return
+        merged = pd.concat([self.frame, *changed], ignore_index=True) if not self.frame.empty else \
+            pd.concat(changed, ignore_index=True)
+        self.frame = merged.drop_duplicates("id", keep="last").sort_values("id").reset_index(drop=True)
+        self.last_id = int(self.frame["id"].max())
+
+
+class JournalCache:
+    """ML journal records, advanced through the journal's index only when it grows."""
+
+    def __init__(self, path: str = TRADE_JOURNAL_PATH):
+        self.journal = get_journal(path)
+        self.reader = JournalReader(self.journal)
+        self.signature = None
+        self._lock = threading.Lock()
+
+    def load(self) -> pd.DataFrame:
+        signature = _signature(self.journal.index_path)
+        with self._lock:
+            if signature != self.signature:
+                self.reader.refresh()
+                self.signature = signature
+            return self.reader.frame.copy()
+
+
+class ModelCache:
+    """A TradeModel whose pickle is reloaded only after it is rewritten."""
+
+    def __init__(self, model_path: str = MODEL_PATH, log_path: str = TRADE_JOURNAL_PATH):
+        self.model = TradeModel(log_path, model_path)
+        self.signature = None
+        self._lock = threading.Lock()
+
+    def load(self) -> TradeModel:
+        signature = _signature(self.model.model_path)
+        with self._lock:
+            if signature != self.signature:
+                self.model.model = None
+                self.model.load_model()
+                self.signature = signature
+            return self.model
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _cache(kind, path):
+    with _caches_lock:
+        if (kind, path) not in _caches:
+            _caches[(kind, path)] = kind(path)
+        return _caches[(kind, path)]
+
+
+def trade_history(path: str = None) -> pd.DataFrame:
+    """Every logged trade, oldest first, with the trade log's column names (plus `id`)."""
+    return _cache(TradeHistoryCache, path or TRADE_DB_PATH).load()
+
+
+def recent_trades(n: int = 5, path: str = None) -> pd.DataFrame:
+    return trade_history(path).tail(n).reset_index(drop=True)
+
+
+def journal_records(path: str = None) -> pd.DataFrame:
+    """ML trade journal records in append order."""
+    return _cache(JournalCache, path or TRADE_JOURNAL_PATH).load()
+
+
+def scored_trades(path: str = None) -> pd.DataFrame:
+    """Journal records that carry a score, as TradeModel trains on them."""
+    df = journal_records(path)
+    if df.empty or "score" not in df.columns:
+        return pd.DataFrame()
+    return df.dropna(subset=["score"])
+
+
+def trade_model(model_path: str = None) -> TradeModel:
+    return _cache(ModelCache, model_path or MODEL_PATH).load()
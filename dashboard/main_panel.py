@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-import os
 import asyncio
 from datetime import datetime
+from data_cache import trade_history
 
 # Import your backtest engine from your ML core module
 from ml.ML_Module.core.backtest_engine import BacktestEngine
@@ -12,30 +12,29 @@ def run():
 
     # === BOT STATUS OVERVIEW ===
     st.header("Bot Status Overview")
-    log_path = "logs/trade_history.csv"
     last_trade_time = "No trades yet."
     trade_count = 0
+    df = pd.DataFrame()
 
-    if os.path.exists(log_path):
-        try:
-            df = pd.read_csv(log_path)
-            if not df.empty:
-                trade_count = len(df)
-                # Convert Date column to datetime for proper display
-                df["Date"] = pd.to_datetime(df["Date"])
-                last_trade_time = df["Date"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
-        except Exception as e:
-            st.error(f"Error loading trade log: {e}")
-    else:
-        st.warning("Trade log not found. Trades will appear here once executed.")
+    try:
+        # Served from the shared cache; only rows added since the last rerun are read.
+        df = trade_history()
+        trade_count = len(df)
+        if trade_count:
+            # Convert Date column to datetime for proper display
+            last_trade_time = pd.to_datetime(df["Date"]).iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            st.warning("Trade log is empty. Trades will appear here once executed.")
+    except Exception as e:
+        st.error(f"Error loading trade log: {e}")
 
     st.metric("Total Trades Executed", trade_count)
     st.metric("Last Trade Date", last_trade_time)
 
     # === PERFORMANCE & SCORE ANALYTICS ===
     st.header("Performance & Score Analytics")
-    if os.path.exists(log_path) and trade_count > 0:
-        df = pd.read_csv(log_path)
+    if trade_count > 0:
+        recent = df.tail(5)
         df["Date"] = pd.to_datetime(df["Date"])
         df.sort_values("Date", inplace=True)
 
@@ -54,7 +53,7 @@ def run():
             st.info("No PnL data available.")
 
         st.subheader("Recent Trades")
-        st.dataframe(df.tail(5))
+        st.dataframe(recent)
     else:
         st.info("No trade data available to display performance analytics.")
 
@@ -1,8 +1,6 @@
 import streamlit as st
 import pandas as pd
-import os
-import json
-from utils.trade_model import TradeModel
+from data_cache import scored_trades, trade_model
 
 def run():
     st.title("ML Panel")
@@ -11,18 +9,15 @@ def run():
 st.subheader("ML Trade Scoring Insights")
 
 try:
-    with open("logs/trades.json", "r") as f:
-        trades = json.load(f)
-    df = pd.DataFrame(trades)
+    df = scored_trades()
     df["date"] = pd.to_datetime(df["date"])
     df.sort_values("date", ascending=False, inplace=True)
 
     st.metric("Trades Logged", len(df))
 
-    model = TradeModel()
-    model.load_model()
+    model = trade_model()
 
-    df["predicted_score"] = df.apply(lambda row: model.predict_score(row.to_dict()), axis=1)
+    df["predicted_score"] = model.predict_many(df)
     st.write("Recent Trades with Predicted Score:")
     st.dataframe(df[["date", "side", "strike", "roc", "score", "predicted_score"]].head(10))
 
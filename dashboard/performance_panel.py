@@ -1,17 +1,16 @@
 import streamlit as st
 import pandas as pd
-import os
 import matplotlib.pyplot as plt
+from data_cache import trade_history
 
 def run():
     st.title("Performance Analytics")
 
-    LOG_PATH = "logs/trade_history.csv"
+    df = trade_history()
 
-    if not os.path.exists(LOG_PATH):
+    if df.empty:
         st.warning("No trade data available yet.")
     else:
-        df = pd.read_csv(LOG_PATH)
         df["Date"] = pd.to_datetime(df["Date"])
         df.sort_values("Date", inplace=True)
 
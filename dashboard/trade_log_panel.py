@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-import os
+from data_cache import trade_history
 
 def run():
     st.title("Trade Log Panel")
@@ -8,10 +7,9 @@ def run():
 
 st.title("Trade Log & Conviction History")
 
-LOG_PATH = "logs/trade_history.csv"
+df = trade_history()
 
-if os.path.exists(LOG_PATH):
-    df = pd.read_csv(LOG_PATH)
+if not df.empty:
     st.dataframe(df)
 else:
     st.warning("No trade log found yet. Once trades are executed, they will appear here.")
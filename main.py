@@ -16,6 +16,7 @@ def load_config(config_file="config.yaml"):
     else:
         return {
             "symbol": os.getenv("TRADE_SYMBOL", "NVDA"),
+            "watchlist": [s for s in os.getenv("TRADE_WATCHLIST", "").split(",") if s] or None,
             "cost_basis": float(os.getenv("COST_BASIS", 650)),
             "log_level": os.getenv("LOG_LEVEL", "INFO"),
             "ml_model_path": os.getenv("ML_MODEL_PATH", "model.pkl")
@@ -41,14 +42,17 @@ def main():
         logging.info("Initializing IBKRClient...")
         ibkr = IBKRClient()
         logging.info("Initializing StrategyManager...")
-        manager = StrategyManager(ibkr, symbol=config["symbol"], cost_basis=config["cost_basis"])
-        
-        logging.info("Loading Machine Learning Model...")
-        model = RegressionModel(config["ml_model_path"])
-        manager.set_ml_model(model)  # Assuming StrategyManager can accept an ML model
-        
-        logging.info("Running StrategyManager...")
-        manager.run()
+        manager = StrategyManager(ibkr, symbol=config["symbol"], cost_basis=config["cost_basis"],
+                                  watchlist=config.get("watchlist"))
+        try:
+            logging.info("Loading Machine Learning Model...")
+            model = RegressionModel(config["ml_model_path"])
+            manager.set_ml_model(model)  # Assuming StrategyManager can accept an ML model
+
+            logging.info("Running StrategyManager...")
+            manager.run()
+        finally:
+            manager.close()
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         sys.exit(1)
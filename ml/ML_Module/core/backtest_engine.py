@@ -3,13 +3,12 @@ import os
 import logging
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score
 import xgboost as xgb
-import optuna
 import joblib
 import asyncio
+import itertools
 
 # Import configuration from core/config.py
 from .config import config
@@ -24,38 +23,56 @@ logger.addHandler(handler)
 
 # Import additional modules
 from sklearn.metrics import accuracy_score
-from utils.pnl_tracker import PnLTracker
-from utils.fetch_real_options_data import fetch_options_data
-from strategy.trade_scorer import TradeScorer  # New: import the trade scorer
+from .data_utils import compact_dtypes, concat_compact, iter_trade_data
+from .backtest_kernel import dynamic_params, simulate_exits, summarize
+from .sweep import ParameterSweep
+from .tuning import tune_xgb
+from utils.greeks import add_greeks
+from utils.earnings import near_earnings_mask
+from utils.iv_history import IVHistory, daily_atm_iv
+from utils.options_store import OptionsStore, normalize_snapshots
 
 class BacktestEngine:
     """
     An institutional-grade backtest engine that:
-      - Automatically pulls real options data via fetch_options_data
-      - Loads 5 years of historical options data from config['data_path']
+      - Backtests on the history accumulated by the daily snapshot collector
+        (utils/fetch_real_options_data.collect_snapshots) without downloading anything itself
+      - Loads 5 years of historical options data from the partitioned options store
+        (utils/options_store.py), reading only the 16-21 DTE partitions; falls back to
+        the CSV at config['data_path'] while the store is empty
       - Filters the data to only include options with expiration between 16 and 21 days (DTE)
       - Trains an XGBoost model (with optional hyperparameter tuning via Optuna)
-      - Uses the TradeScorer (which combines ML predictions, conviction, and risk adjustments)
-        to decide on trade entries
-      - Runs backtests by simulating trade signals with dynamic, volatility-adjusted exit criteria
+      - Enters on the model's predicted signals
+      - Runs backtests by simulating trade signals with dynamic, volatility-adjusted exit criteria,
+        vectorized over all signals (see core/backtest_kernel.py)
       - Logs performance metrics and workflow details for evaluation
     """
 
     def __init__(self):
+        self.symbol = config.get("symbol", "NVDA")
         self.data_path = config.get("data_path", "data/real_options_data.csv")
         self.model_path = config.get("model_path", "models/xgb_model.pkl")
+        self.options_store = OptionsStore(config.get("options_store", "data/options"))
+        self.min_dte = config.get("min_dte", 16)
+        self.max_dte = config.get("max_dte", 21)
+        self.chunksize = config.get("chunksize", 100_000)
         self.train_model_flag = config.get("train_model", True)
         self.predict_threshold = config.get("predict_threshold", 0.5)
         self.strategy_params = config.get("strategy_params", {})
         self.optuna_trials = config.get("optuna_trials", 25)
+        self.optuna_jobs = config.get("optuna_jobs")
+        self.optuna_storage = config.get("optuna_storage", "models/optuna.db")
         # Base trading parameters (defaults from config)
         self.trade_holding_period = config.get("trade_holding_period", 2)  # base days holding
         self.stop_loss_pct = config.get("stop_loss_pct", 0.03)
         self.take_profit_pct = config.get("take_profit_pct", 0.05)
+        self.risk_free_rate = config.get("risk_free_rate", 0.045)
 
         self.model = None
+        self.trades = None
 
         logger.info("[BacktestEngine] Initialized with configuration:")
+        logger.info(f"  symbol={self.symbol}")
         logger.info(f"  data_path={self.data_path}")
         logger.info(f"  model_path={self.model_path}")
         logger.info(f"  train_model={self.train_model_flag}")
@@ -66,34 +83,100 @@ class BacktestEngine:
         logger.info(f"  take_profit_pct={self.take_profit_pct}")
 
     def load_data(self) -> pd.DataFrame:
-        if not os.path.exists(self.data_path):
-            raise FileNotFoundError(f"[BacktestEngine] Data file not found: {self.data_path}")
-        df = pd.read_csv(self.data_path)
-        # Normalize column names to lowercase.
-        df.columns = df.columns.str.lower()
-        logger.info(f"[BacktestEngine] Loaded {len(df)} rows from {self.data_path}")
+        """The whole prepared dataset, assembled from the compacted chunks of iter_data."""
+        df = concat_compact(list(self.iter_data()))
+        if df.empty:
+            raise ValueError(self._no_rows_message())
+        return df
+
+    def _no_rows_message(self) -> str:
+        return (f"[BacktestEngine] No rows with {self.min_dte} <= DTE <= {self.max_dte} in "
+                f"{self.options_store.root} or {self.data_path}; widen min_dte/max_dte or collect more snapshots.")
+
+    def iter_data(self, chunksize: int = None):
+        """
+        Stream the prepared dataset in chunks of at most `chunksize` rows. Each chunk is
+        read from the options store (or the CSV fallback), downcast to float32/int32 with
+        categorical strings, then given greeks, earnings proximity and IV percentile, so
+        only one raw chunk is ever in memory.
+        """
+        chunksize = chunksize or self.chunksize
+        # DTE is stored with every snapshot, so the filter is pushed down to the Parquet scan.
+        chunks = self.options_store.iter_frames(min_dte=self.min_dte, max_dte=self.max_dte, batch_size=chunksize)
+        first = next(chunks, None)
+        if first is not None:
+            chunks, source = itertools.chain([first], chunks), self.options_store.root
+        else:
+            chunks, source = self._iter_csv(chunksize), self.data_path
+        # In-memory IV histories: the backtest's tenor must never be written into the live ones.
+        iv_histories = {}
+        total = 0
+        for chunk in chunks:
+            chunk = self._prepare_chunk(compact_dtypes(chunk), iv_histories)
+            total += len(chunk)
+            yield chunk
+        logger.info(f"[BacktestEngine] Loaded {total} rows ({self.min_dte}<=DTE<={self.max_dte}) from {source} "
+                    f"in chunks of {chunksize}")
 
-        # Compute DTE if "date" and "expiry" exist.
-        if "date" in df.columns and "expiry" in df.columns:
-            df["dte"] = df.apply(lambda row: 
-                                 (datetime.strptime(str(row["expiry"]), "%Y%m%d") - datetime.strptime(row["date"], "%Y-%m-%d")).days,
-                                 axis=1)
-            initial_count = len(df)
-            df = df[(df["dte"] >= 16) & (df["dte"] <= 21)]
-            logger.info(f"[BacktestEngine] Filtered data on DTE: kept {len(df)} of {initial_count} rows (16<=DTE<=21)")
+    def _prepare_chunk(self, df: pd.DataFrame, iv_histories: dict) -> pd.DataFrame:
+        # Recompute IV and greeks for the chunk in one vectorized pass.
+        greek_inputs = {"underlying_price", "strike", "dte", "price", "optiontype"}
+        if greek_inputs.issubset(df.columns):
+            df = add_greeks(df, type_col="optiontype", iv_col="iv", rate=self.risk_free_rate)
         else:
-            logger.warning("[BacktestEngine] 'date' or 'expiry' column missing; cannot filter by DTE.")
+            logger.debug(f"[BacktestEngine] Missing {sorted(greek_inputs - set(df.columns))}; keeping stored greeks.")
+
+        # Label earnings proximity per row against the cached earnings calendar.
+        if "date" in df.columns:
+            symbols = df["symbol"].astype(str) if "symbol" in df.columns else pd.Series(self.symbol, index=df.index)
+            groups = symbols.groupby(symbols).indices
+            near = np.zeros(len(df), dtype=np.int8)
+            for sym, rows in groups.items():
+                near[rows] = near_earnings_mask(sym, df["date"].values[rows])
+            df["nearearnings"] = near
+
+            # Record each day's ATM IV, then read every row's IV percentile as of its date.
+            # The store is scanned by date, then expiry, so the first chunk holding a day has
+            # its front expiry; later chunks for the same day do not overwrite it.
+            if "iv" in df.columns:
+                iv_pct = np.full(len(df), np.nan)
+                for sym, rows in groups.items():
+                    history, seen = iv_histories.setdefault(sym, (IVHistory(sym, root=None), set()))
+                    atm = daily_atm_iv(df.iloc[rows])
+                    new = ~atm.index.isin(list(seen))
+                    seen.update(atm.index[new])
+                    history.record_many(atm.index[new], atm.values[new])
+                    iv_pct[rows] = history.percentiles(df["date"].values[rows])
+                df["iv_percentile"] = np.where(np.isnan(iv_pct), df.get("iv_percentile", 0.5), iv_pct)
 
         # Filter to only numeric columns and 'label'
         if 'label' in df.columns:
-            numeric_cols = df.select_dtypes(include=['number', 'bool', 'category']).columns.tolist()
+            numeric_cols = df.select_dtypes(include=['number', 'bool']).columns.tolist()
             if 'label' not in numeric_cols:
                 numeric_cols.append('label')
             df = df[numeric_cols]
-        return df
+        return compact_dtypes(df)
+
+    def _iter_csv(self, chunksize: int):
+        logger.warning(f"[BacktestEngine] Options store {self.options_store.root} is empty; reading {self.data_path} "
+                       f"(import it with `python -m utils.options_store {self.data_path}`)")
+        if not os.path.exists(self.data_path):
+            raise FileNotFoundError(f"[BacktestEngine] Data file not found: {self.data_path}")
+        for chunk in iter_trade_data(self.data_path, chunksize):
+            try:
+                # Lowercases columns, parses date/expiry and computes DTE for all rows at once.
+                chunk = normalize_snapshots(chunk)
+            except ValueError:
+                chunk.columns = chunk.columns.str.lower()
+                logger.warning("[BacktestEngine] 'date' or 'expiry' column missing; cannot filter by DTE.")
+                yield chunk
+                continue
+            yield chunk[(chunk["dte"] >= self.min_dte) & (chunk["dte"] <= self.max_dte)]
 
     def train_model(self, df: pd.DataFrame):
         logger.info("[BacktestEngine] Starting model training...")
+        if df.empty:
+            raise ValueError(self._no_rows_message())
         if 'label' not in df.columns:
             raise ValueError("[BacktestEngine] 'label' column missing in dataset for training.")
         X = df.drop('label', axis=1)
@@ -110,7 +193,7 @@ class BacktestEngine:
         }
         model_params.update(self.strategy_params)
         if self.optuna_trials > 0:
-            self.run_optuna_tuning(X_train, y_train)
+            model_params.update(self.run_optuna_tuning(X_train, y_train))
         self.model = xgb.XGBClassifier(**model_params)
         self.model.fit(X_train, y_train)
         preds = self.model.predict(X_test)
@@ -125,23 +208,25 @@ class BacktestEngine:
         joblib.dump(self.model, self.model_path)
         logger.info(f"[BacktestEngine] Model saved to {self.model_path}")
 
-    def run_optuna_tuning(self, X_train: pd.DataFrame, y_train: pd.Series):
+    def run_optuna_tuning(self, X_train: pd.DataFrame, y_train: pd.Series) -> dict:
+        """
+        Tune on a validation split carved out of the training set (the test split stays
+        untouched for the final evaluation). The study is stored per symbol and dataset in
+        SQLite, so an interrupted run resumes. Returns the best parameters.
+        """
         logger.info("[BacktestEngine] Starting Optuna hyperparameter tuning...")
-        def objective(trial):
-            params = {
+        X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2, shuffle=True, random_state=42)
+        def space(trial):
+            return {
                 "n_estimators": trial.suggest_int("n_estimators", 50, 300),
                 "max_depth": trial.suggest_int("max_depth", 2, 8),
                 "learning_rate": trial.suggest_float("learning_rate", 1e-3, 1e-1, log=True),
-                "eval_metric": "logloss",
-                "use_label_encoder": False
             }
-            model = xgb.XGBClassifier(**params)
-            model.fit(X_train, y_train)
-            preds = model.predict(X_train)
-            return accuracy_score(y_train, preds)
-        study = optuna.create_study(direction="maximize")
-        study.optimize(objective, n_trials=self.optuna_trials)
-        logger.info(f"[BacktestEngine] Optuna best params: {study.best_params}, Best score: {study.best_value:.3f}")
+        best_params, study = tune_xgb(X_fit, y_fit, X_val, y_val, space, n_trials=self.optuna_trials,
+                                      study_name=f"backtest-{self.symbol}", storage=self.optuna_storage,
+                                      n_jobs=self.optuna_jobs, base_params=self.strategy_params)
+        logger.info(f"[BacktestEngine] Optuna best params: {best_params}, Best validation AUC: {study.best_value:.3f}")
+        return best_params
 
     def load_model(self):
         if not os.path.exists(self.model_path):
@@ -153,96 +238,66 @@ class BacktestEngine:
         if self.model is None:
             logger.info("[BacktestEngine] Model not in memory; loading from disk...")
             self.load_model()
-        df = self.load_data()
-        if 'label' in df.columns:
-            X = df.drop('label', axis=1)
-            y = df['label']
+        # Score chunk by chunk; only the price and signal columns are kept for the exit simulation.
+        features = getattr(self.model, "feature_names_in_", None)
+        prices, signals = [], []
+        correct = labelled = 0
+        for chunk in self.iter_data():
+            y = chunk.pop('label').to_numpy() if 'label' in chunk.columns else None
+            X = chunk.reindex(columns=features) if features is not None else chunk
+            predictions = self.model.predict_proba(X)[:, 1] >= self.predict_threshold
+            if y is not None:
+                correct += int((predictions == y).sum())
+                labelled += len(y)
+            if "price" in chunk.columns:
+                prices.append(chunk["price"].to_numpy(dtype=np.float32))
+                signals.append(predictions)
+        if labelled:
+            logger.info(f"[BacktestEngine] Backtest Accuracy={correct / labelled:.3f} with threshold={self.predict_threshold}")
         else:
             logger.warning("[BacktestEngine] No 'label' column found. Using entire dataset as features only.")
-            X = df
-            y = None
-        probas = self.model.predict_proba(X)[:, 1]
-        predictions = (probas >= self.predict_threshold).astype(int)
-        if y is not None:
-            acc = accuracy_score(y, predictions)
-            logger.info(f"[BacktestEngine] Backtest Accuracy={acc:.3f} with threshold={self.predict_threshold}")
         # Compute volatility from daily log returns.
-        if "price" in df.columns:
-            prices = df["price"].values
-            if len(prices) > 1:
-                log_returns = np.diff(np.log(prices))
-                volatility = np.std(log_returns)
-            else:
-                volatility = 0.01
-            logger.info(f"[BacktestEngine] Computed daily volatility: {volatility:.4f}")
+        if prices:
+            prices = np.concatenate(prices)
             # Dynamically adjust trading parameters based on volatility.
-            dynamic_holding = max(1, int(round(self.trade_holding_period / (1 + volatility))))
-            dynamic_stop_loss = self.stop_loss_pct * (1 + volatility)
-            dynamic_take_profit = self.take_profit_pct * (1 + volatility)
+            dynamic_holding, dynamic_stop_loss, dynamic_take_profit, volatility = dynamic_params(
+                prices, self.trade_holding_period, self.stop_loss_pct, self.take_profit_pct)
+            logger.info(f"[BacktestEngine] Computed daily volatility: {volatility:.4f}")
             logger.info(f"[BacktestEngine] Dynamic holding period: {dynamic_holding} day(s), "
                         f"Stop-loss: {dynamic_stop_loss:.3f}, Take-profit: {dynamic_take_profit:.3f}")
-            from utils.pnl_tracker import PnLTracker
-            pnl_tracker = PnLTracker()
-            # Instantiate TradeScorer to incorporate conviction scores.
-            from strategy.trade_scorer import TradeScorer
-            trade_scorer = TradeScorer(symbol="NVDA")
-            # Dummy trade class for simulation.
-            class DummyTrade:
-                def __init__(self, symbol, strike, expiry, side, entry_price, quantity=1):
-                    self.symbol = symbol
-                    self.strike = strike
-                    self.expiry = expiry
-                    self.side = side
-                    self.entry_price = entry_price
-                    self.quantity = quantity
-            # Simulate trades over the dataset.
-            for i in range(len(df) - dynamic_holding):
-                if predictions[i] == 1:
-                    entry_price = df.iloc[i]["price"]
-                    # Create a dummy option object to pass to the TradeScorer.
-                    dummy_option = DummyTrade(
-                        symbol="NVDA", strike=entry_price,
-                        expiry=(datetime.now() + timedelta(days=dynamic_holding)).strftime("%Y%m%d"),
-                        side="LONG", entry_price=entry_price, quantity=1
-                    )
-                    # Get hybrid score from the trade scorer.
-                    hybrid_score = trade_scorer.score_and_log_trade(dummy_option, premium=entry_price, side="LONG")
-                    if hybrid_score < 0.15:
-                        continue  # Skip trade if conviction is too low.
-                    exit_price = None
-                    for j in range(i+1, i + dynamic_holding + 1):
-                        future_price = df.iloc[j]["price"]
-                        if future_price >= entry_price * (1 + dynamic_take_profit):
-                            exit_price = future_price
-                            logger.info(f"Take-profit triggered at row {j}: {future_price}")
-                            break
-                        elif future_price <= entry_price * (1 - dynamic_stop_loss):
-                            exit_price = future_price
-                            logger.info(f"Stop-loss triggered at row {j}: {future_price}")
-                            break
-                    if exit_price is None:
-                        exit_price = df.iloc[i + dynamic_holding]["price"]
-                        logger.info(f"No exit condition met; exiting at row {i + dynamic_holding}: {exit_price}")
-                    expiry = (datetime.now() + timedelta(days=dynamic_holding)).strftime("%Y%m%d")
-                    trade = DummyTrade(
-                        symbol="SIM", strike=entry_price, expiry=expiry,
-                        side="LONG", entry_price=entry_price, quantity=1
-                    )
-                    pnl_tracker.record_trade(trade, entry_price, side="LONG", quantity=1)
-                    pnl_tracker.close_trade(trade, exit_price)
-            pnl_tracker.report()
+            # Simulate every signal's exit in one vectorized pass.
+            trades = simulate_exits(prices, np.concatenate(signals), dynamic_holding,
+                                    dynamic_take_profit, dynamic_stop_loss)
+            stats = summarize(trades)
+            logger.info(f"[BacktestEngine] Simulated {stats['trades']} trades: "
+                        f"PnL={stats['total_pnl']:.2f}, win rate={stats['win_rate']:.1%}, "
+                        f"avg return={stats['avg_return']:.3%}, avg holding={stats['avg_holding']:.1f} rows, "
+                        f"take-profit={stats['take_profit']}, stop-loss={stats['stop_loss']}, "
+                        f"time exit={stats['time']}")
+            self.trades = trades
         else:
             logger.warning("[BacktestEngine] 'price' column not found in dataset; skipping trade simulation.")
         logger.info("[BacktestEngine] Backtest run complete. (Simulated trade signals and PnL computed.)")
 
+    def run_sweep(self, params, train_size, test_size, step=None, anchored=False, n_samples=None,
+                  seed=None, rank_by="oos_sharpe", max_workers=None) -> pd.DataFrame:
+        """
+        Walk-forward sweep of trade_holding_period, stop_loss_pct, take_profit_pct and
+        predict_threshold over the loaded dataset (see core/sweep.py). Parameters not
+        swept keep this engine's values. Returns the configurations ranked by
+        out-of-sample `rank_by`.
+        """
+        df = self.load_data()
+        sweep = ParameterSweep(df, model_params=self.strategy_params, max_workers=max_workers)
+        defaults = {"trade_holding_period": self.trade_holding_period, "stop_loss_pct": self.stop_loss_pct,
+                    "take_profit_pct": self.take_profit_pct, "predict_threshold": self.predict_threshold}
+        results = sweep.run(params, train_size, test_size, step=step, anchored=anchored, n_samples=n_samples,
+                            seed=seed, rank_by=rank_by, defaults=defaults)
+        logger.info(f"[BacktestEngine] Sweep top configurations:\n{results.head(10).to_string(index=False)}")
+        return results
+
     def run(self):
-        logger.info("[BacktestEngine] Updating dataset from real market data...")
-        updated_csv = fetch_options_data(ticker_symbol="NVDA", expiration_date=None, output_csv=self.data_path)
-        if updated_csv:
-            self.data_path = updated_csv
-            logger.info(f"[BacktestEngine] Data path updated to {self.data_path}")
-        else:
-            logger.warning("[BacktestEngine] Failed to update dataset; using existing data.")
+        logger.info(f"[BacktestEngine] Using accumulated option history in {self.options_store.root}")
         if self.train_model_flag:
             df = self.load_data()
             self.train_model(df)
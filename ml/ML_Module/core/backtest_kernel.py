@@ -0,0 +1,84 @@
+# core/backtest_kernel.py
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+EXIT_TIME, EXIT_TAKE_PROFIT, EXIT_STOP_LOSS = 0, 1, 2
+EXIT_REASONS = np.array(["time", "take_profit", "stop_loss"])
+
+
+def dynamic_params(prices, holding, stop_loss, take_profit):
+    """
+    Volatility-adjusted holding period, stop-loss and take-profit: the std of log
+    returns over `prices` shortens the hold and widens both exit levels.
+    Returns (holding, stop_loss, take_profit, volatility).
+    """
+    prices = np.asarray(prices, dtype=float)
+    volatility = float(np.std(np.diff(np.log(prices)))) if len(prices) > 1 else 0.01
+    return (max(1, int(round(holding / (1 + volatility)))), stop_loss * (1 + volatility),
+            take_profit * (1 + volatility), volatility)
+
+
+def simulate_exits(prices, signals, holding, take_profit, stop_loss, quantity=1):
+    """
+    Simulate a long entry at every signal row and its exit, for all signals at once.
+
+    Each entry at row i watches prices[i+1 .. i+holding] through a zero-copy
+    sliding window. It exits at the first row that reaches the take-profit or
+    stop-loss level (take-profit wins when both are hit on the same row), or at
+    row i+holding when neither is hit. Signals in the last `holding` rows are
+    ignored because their window is incomplete.
+
+    Returns a DataFrame with one row per trade: entry_idx, exit_idx, entry_price,
+    exit_price, reason, pnl and return.
+    """
+    prices = np.asarray(prices, dtype=float)
+    signals = np.asarray(signals, dtype=bool)
+    holding = max(int(holding), 1)
+    if len(prices) <= holding:
+        return _trades(np.array([], dtype=int), np.array([], dtype=int), prices, np.array([], dtype=int), quantity)
+
+    entries = np.flatnonzero(signals[:len(prices) - holding])
+    future = sliding_window_view(prices, holding + 1)[entries, 1:]
+    entry_price = prices[entries][:, None]
+    tp_hit = future >= entry_price * (1 + take_profit)
+    sl_hit = future <= entry_price * (1 - stop_loss)
+    hit = tp_hit | sl_hit
+
+    first = hit.argmax(axis=1)
+    any_hit = hit[np.arange(len(entries)), first]
+    exit_idx = entries + np.where(any_hit, first + 1, holding)
+    reason = np.where(any_hit, np.where(tp_hit[np.arange(len(entries)), first], EXIT_TAKE_PROFIT, EXIT_STOP_LOSS),
+                      EXIT_TIME)
+    return _trades(entries, exit_idx, prices, reason, quantity)
+
+
+def _trades(entries, exit_idx, prices, reason, quantity):
+    entry_price = prices[entries]
+    exit_price = prices[exit_idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = exit_price / entry_price - 1
+    return pd.DataFrame({
+        "entry_idx": entries,
+        "exit_idx": exit_idx,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "reason": pd.Categorical.from_codes(reason, EXIT_REASONS),
+        "pnl": (exit_price - entry_price) * quantity,
+        "return": returns,
+    })
+
+
+def summarize(trades):
+    """Aggregate PnL statistics for a trades frame from simulate_exits."""
+    n = len(trades)
+    counts = trades["reason"].value_counts()
+    return {
+        "trades": n,
+        "total_pnl": float(trades["pnl"].sum()),
+        "avg_return": float(trades["return"].mean()) if n else 0.0,
+        "win_rate": float((trades["pnl"] > 0).mean()) if n else 0.0,
+        "avg_holding": float((trades["exit_idx"] - trades["entry_idx"]).mean()) if n else 0.0,
+        **{reason: int(counts.get(reason, 0)) for reason in EXIT_REASONS},
+    }
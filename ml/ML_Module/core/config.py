@@ -1,10 +1,18 @@
 # core/config.py
 
 config = {
+    "symbol": "NVDA",
     "data_path": "data/real_options_data.csv",
+    "options_store": "data/options",
+    "min_dte": 16,
+    "max_dte": 21,
+    "chunksize": 100_000,  # rows per chunk when loading and scoring backtest data
     "model_path": "models/xgb_model.pkl",
     "train_model": True,
     "predict_threshold": 0.5,
     "strategy_params": {},
-    "optuna_trials": 25
+    "optuna_trials": 25,
+    "optuna_jobs": None,  # parallel trials; None = one per core
+    "optuna_storage": "models/optuna.db",
+    "risk_free_rate": 0.045
 }
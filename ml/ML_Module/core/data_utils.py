@@ -1,9 +1,49 @@
 # core/data_utils.py
 
 import pandas as pd
+import numpy as np
 import os
+from pandas.api.types import union_categoricals
 
-def load_trade_data(path):
+# String columns with few distinct values (or repeated per snapshot) kept as categoricals.
+CATEGORICAL_COLUMNS = {"optiontype", "currency", "contractsymbol", "symbol", "contractsize"}
+
+
+def compact_dtypes(df, categoricals=CATEGORICAL_COLUMNS):
+    """Downcast in place: float64 -> float32, int64 -> int32 when it fits, known string columns -> category."""
+    for col in df.columns:
+        values = df[col]
+        if col.lower() in categoricals and not isinstance(values.dtype, pd.CategoricalDtype):
+            df[col] = values.astype("category")
+        elif pd.api.types.is_float_dtype(values) and values.dtype.itemsize > 4:
+            df[col] = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values) and values.dtype.itemsize > 4 and len(values) \
+                and np.iinfo(np.int32).min <= values.min() and values.max() <= np.iinfo(np.int32).max:
+            df[col] = values.astype(np.int32)
+    return df
+
+
+def concat_compact(frames):
+    """Concatenate compacted chunks, unioning categories so categorical columns stay categorical."""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame()
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and len(frames) > 1:
+            categories = union_categoricals([frame[col] for frame in frames if col in frame.columns]).categories
+            for frame in frames:
+                if col in frame.columns:
+                    frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_trade_data(path, chunksize=100_000):
+    """Stream a CSV in compacted chunks of `chunksize` rows."""
     if not os.path.exists(path):
         raise FileNotFoundError(f"No data found at {path}")
-    return pd.read_csv(path)
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield compact_dtypes(chunk)
+
+
+def load_trade_data(path, chunksize=100_000):
+    return concat_compact(iter_trade_data(path, chunksize))
@@ -1,18 +1,10 @@
 # core/feature_engineering.py
 
-import pandas as pd
-import json
-import os
+from utils.trade_journal import get_journal
 
-def load_old_trade_log(log_path):
-    if not os.path.exists(log_path):
-        return pd.DataFrame()
-
-    with open(log_path, 'r') as f:
-        trades = json.load(f)
-
-    df = pd.DataFrame(trades)
-    return df
+def load_old_trade_log(log_path=None, since=0):
+    """Journal records from position `since` on (0 = the whole log)."""
+    return get_journal(log_path).read_frame(since)
 
 
 def generate_features(df):
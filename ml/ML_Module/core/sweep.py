@@ -0,0 +1,185 @@
+# core/sweep.py
+
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from .backtest_kernel import dynamic_params, simulate_exits
+
+logger = logging.getLogger(__name__)
+
+SWEEP_PARAMS = ("trade_holding_period", "stop_loss_pct", "take_profit_pct", "predict_threshold")
+DEFAULT_MODEL_PARAMS = {"n_estimators": 100, "max_depth": 4, "learning_rate": 0.1, "eval_metric": "logloss"}
+
+
+def param_grid(grid):
+    """Every combination of a {param: [values]} grid, as a list of dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def param_sampler(space, n, seed=None):
+    """
+    `n` random configurations. Each entry of `space` is either a list of choices
+    or a (low, high) tuple sampled uniformly (as an int when both bounds are ints).
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for key, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                config[key] = int(rng.integers(low, high + 1)) if isinstance(low, int) and isinstance(high, int) \
+                    else float(rng.uniform(low, high))
+            else:
+                config[key] = spec[rng.integers(len(spec))]
+        configs.append(config)
+    return configs
+
+
+def walk_forward_windows(n_rows, train_size, test_size, step=None, anchored=False):
+    """(train, test) row ranges rolling forward through the dataset; test always follows train."""
+    step = step or test_size
+    windows = []
+    start = 0
+    while start + train_size + test_size <= n_rows:
+        train = (0 if anchored else start, start + train_size)
+        windows.append((train, (start + train_size, start + train_size + test_size)))
+        start += step
+    return windows
+
+
+# -------------------------
+# Shared memory
+# -------------------------
+
+def _share(array):
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+_arrays = {}
+_blocks = []
+
+
+def _attach(specs):
+    """Pool initializer: map the parent's shared blocks into this worker as read-only arrays."""
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        if key != "probas":
+            array.flags.writeable = False
+        _arrays[key] = array
+
+
+def _fit_window(train, test, offset, model_params):
+    """Train on one window and write its out-of-sample probabilities into the shared buffer."""
+    X, y = _arrays["X"], _arrays["y"]
+    model = xgb.XGBClassifier(**model_params)
+    model.fit(X[train[0]:train[1]], y[train[0]:train[1]])
+    _arrays["probas"][offset:offset + test[1] - test[0]] = model.predict_proba(X[test[0]:test[1]])[:, 1]
+
+
+def _evaluate(configs, windows, offsets):
+    prices, probas = _arrays["prices"], _arrays["probas"]
+    rows = []
+    for config in configs:
+        returns, per_window = [], []
+        for (train, test), offset in zip(windows, offsets):
+            holding, stop_loss, take_profit, _ = dynamic_params(
+                prices[train[0]:train[1]], config["trade_holding_period"],
+                config["stop_loss_pct"], config["take_profit_pct"])
+            signals = probas[offset:offset + test[1] - test[0]] >= config["predict_threshold"]
+            trades = simulate_exits(prices[test[0]:test[1]], signals, holding, take_profit, stop_loss)
+            returns.append(trades["return"].to_numpy())
+            per_window.append(trades["pnl"].sum())
+        returns = np.concatenate(returns) if returns else np.array([])
+        std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+        rows.append({
+            **config,
+            "oos_trades": len(returns),
+            "oos_pnl": float(np.sum(per_window)),
+            "oos_avg_return": float(returns.mean()) if len(returns) else 0.0,
+            "oos_win_rate": float((returns > 0).mean()) if len(returns) else 0.0,
+            # Per-trade Sharpe (no sqrt(n) factor, so trading more often is not rewarded by itself).
+            "oos_sharpe": float(returns.mean() / std) if std > 0 else 0.0,
+            "profitable_windows": float(np.mean(np.array(per_window) > 0)) if per_window else 0.0,
+        })
+    return rows
+
+
+class ParameterSweep:
+    """
+    Walk-forward sweep of the backtest trading parameters across a process pool.
+
+    The feature matrix, labels and prices are copied once into shared memory and
+    mapped read-only by every worker, so nothing is pickled per task. One model
+    is trained per walk-forward window (in parallel) and its out-of-sample
+    probabilities are written to a shared buffer; configurations are then
+    evaluated in chunks with the vectorized exit kernel. Each configuration's
+    results are aggregated over all test windows and the table is ranked by
+    `rank_by`.
+    """
+
+    def __init__(self, df, label_col="label", price_col="price", model_params=None, max_workers=None):
+        self.X = df.drop(columns=[label_col]).to_numpy(dtype=np.float32)
+        self.y = df[label_col].to_numpy(dtype=np.int32)
+        self.prices = df[price_col].to_numpy(dtype=float)
+        self.max_workers = max_workers or os.cpu_count()
+        # Split the cores between the pool's workers instead of letting every model use all of them.
+        threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        self.model_params = {**DEFAULT_MODEL_PARAMS, "n_jobs": threads, **(model_params or {})}
+
+    def run(self, params, train_size, test_size, step=None, anchored=False, n_samples=None, seed=None,
+            rank_by="oos_sharpe", defaults=None):
+        """
+        `params` is a list of configuration dicts, a {param: [values]} grid, or
+        (with `n_samples`) a sampler space for param_sampler. Parameters missing
+        from a configuration fall back to `defaults`.
+        """
+        if isinstance(params, dict):
+            params = param_sampler(params, n_samples, seed) if n_samples else param_grid(params)
+        configs = [{**(defaults or {}), **config} for config in params]
+        missing = {i: sorted(set(SWEEP_PARAMS) - config.keys()) for i, config in enumerate(configs)
+                   if set(SWEEP_PARAMS) - config.keys()}
+        if missing:
+            raise ValueError(f"[Sweep] Configurations are missing parameters (by index): {missing}")
+        windows = walk_forward_windows(len(self.y), train_size, test_size, step, anchored)
+        if not windows or not configs:
+            raise ValueError(f"[Sweep] Nothing to run: {len(configs)} configurations, {len(windows)} windows")
+        offsets = np.cumsum([0] + [test[1] - test[0] for _, test in windows])
+
+        blocks, specs = [], {}
+        for key, array in (("X", self.X), ("y", self.y), ("prices", self.prices),
+                           ("probas", np.zeros(offsets[-1]))):
+            block, specs[key] = _share(array)
+            blocks.append(block)
+        try:
+            with ProcessPoolExecutor(self.max_workers, initializer=_attach, initargs=(specs,)) as pool:
+                list(pool.map(_fit_window, *zip(*[(train, test, offset, self.model_params)
+                                                  for (train, test), offset in zip(windows, offsets)])))
+                logger.info(f"[Sweep] Trained {len(windows)} walk-forward models")
+                chunk = max(1, len(configs) // (self.max_workers * 4))
+                chunks = [configs[i:i + chunk] for i in range(0, len(configs), chunk)]
+                results = [row for rows in pool.map(_evaluate, chunks, itertools.repeat(windows),
+                                                    itertools.repeat(offsets[:-1]))
+                           for row in rows]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        table = pd.DataFrame(results).sort_values(rank_by, ascending=False, ignore_index=True)
+        logger.info(f"[Sweep] Evaluated {len(configs)} configurations over {len(windows)} windows; "
+                    f"best {rank_by}={table[rank_by].iloc[0]:.3f}")
+        return table
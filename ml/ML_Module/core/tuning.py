@@ -0,0 +1,97 @@
+# core/tuning.py
+
+import hashlib
+import logging
+import os
+
+import numpy as np
+import optuna
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+
+
+class XGBoostPruningCallback(xgb.callback.TrainingCallback):
+    """Report the validation metric to the trial after every boosting round and stop hopeless trials."""
+
+    def __init__(self, trial, observation_key="validation_0-auc"):
+        self.trial = trial
+        self.dataset, self.metric = observation_key.split("-", 1)
+
+    def after_iteration(self, model, epoch, evals_log):
+        score = evals_log[self.dataset][self.metric][-1]
+        self.trial.report(float(score[0] if isinstance(score, tuple) else score), epoch)
+        if self.trial.should_prune():
+            raise optuna.TrialPruned(f"Trial pruned at round {epoch}")
+        return False
+
+
+def storage_url(path=None):
+    """SQLite storage for studies, so an interrupted run picks up where it stopped."""
+    path = path or config.get("optuna_storage", "models/optuna.db")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return f"sqlite:///{path}"
+
+
+def fingerprint(*arrays, extra=None) -> str:
+    """Short hash of the data (values, and column names for DataFrames) plus `extra`."""
+    digest = hashlib.sha1(repr(extra).encode())
+    for array in arrays:
+        digest.update(repr(list(getattr(array, "columns", []))).encode())
+        digest.update(np.ascontiguousarray(np.asarray(array)).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def tune_xgb(X_train, y_train, X_val, y_val, space, n_trials, study_name, storage=None, n_jobs=None,
+             base_params=None):
+    """
+    Tune an XGBClassifier on validation AUC and return (best_params, study).
+
+    `space(trial)` returns the sampled hyperparameters. The stored study name is
+    `study_name` plus a fingerprint of the data, the search space and
+    `base_params`, so only an interrupted run on the same inputs resumes (running
+    just its missing trials); new or grown data starts a fresh study. Trials
+    run `n_jobs` at a time (default: one per core; XGBoost releases the GIL while
+    boosting) and each model gets an equal share of the cores. The pruning
+    callback reports validation AUC every round, so the median pruner can stop a
+    trial long before its last tree.
+    """
+    n_jobs = n_jobs or config.get("optuna_jobs") or os.cpu_count()
+    threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    inputs = (space.__code__.co_code, space.__code__.co_consts, sorted((base_params or {}).items()))
+    study_name = f"{study_name}-{fingerprint(X_train, y_train, X_val, y_val, extra=inputs)}"
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=storage_url(storage),
+        direction="maximize",
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=10),
+        load_if_exists=True,
+    )
+    done = sum(trial.state in FINISHED for trial in study.trials)
+    remaining = max(n_trials - done, 0)
+    if done:
+        logger.info(f"[Tuning] Resuming study '{study_name}': {done} trials done, {remaining} to run")
+
+    def objective(trial):
+        # The pruning callback needs AUC on the eval set; it overrides any eval_metric in base_params.
+        params = {**(base_params or {}), **space(trial), "eval_metric": "auc", "n_jobs": threads,
+                  "callbacks": [XGBoostPruningCallback(trial)]}
+        model = xgb.XGBClassifier(**params)
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        return roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+
+    if remaining:
+        study.optimize(objective, n_trials=remaining, n_jobs=n_jobs)
+    if not any(trial.state == optuna.trial.TrialState.COMPLETE for trial in study.trials):
+        raise RuntimeError(f"[Tuning] Study '{study_name}' has no completed trials")
+
+    pruned = sum(trial.state == optuna.trial.TrialState.PRUNED for trial in study.trials)
+    logger.info(f"[Tuning] Study '{study_name}': {len(study.trials)} trials ({pruned} pruned), "
+                f"best AUC={study.best_value:.3f}, params={study.best_params}")
+    return dict(study.best_params), study
+
@@ -1,15 +1,18 @@
-from datetime import datetime
+import asyncio
 from strategy.volatility_model import VolatilityRegime
 from strategy.trade_filter import TradeFilter
 from strategy.execution import TradeExecutor
 from config import *
-from utils.earnings import is_near_earnings
+from utils.market_context import build_market_context_async
+from utils.option_chain import days_to_expiry
+from utils.volatility import VolatilityToolkit
 from utils.trade_model import TradeModel
 from utils.conviction import compute_conviction_score
 from strategy.trade_signal_features import TradeSignalFeatures
 from strategy.trade_scorer import TradeScorer
-from utils.discord_alerts import send_discord_alert
-from utils.webhook_logger import post_trade_to_webhook, log_trade
+from utils.discord_alerts import send_discord_alert_async
+from utils.webhook_logger import post_trade_to_webhook
+from utils.trade_logger import log_trade
 
 # Define weights for scoring (can be moved to config)
 conviction_weights = {
@@ -32,62 +35,76 @@ conviction_overrides = {
 }
 
 class CoveredCallStrategy:
-    def __init__(self, ibkr_client, symbol, cost_basis=650):
+    def __init__(self, ibkr_client, symbol, cost_basis=650, model=None):
         self.symbol = symbol
         self.ibkr = ibkr_client
         self.vol_model = VolatilityRegime(self.symbol)
         self.filter = TradeFilter(self.symbol, cost_basis)
         self.executor = TradeExecutor(self.ibkr)
-        self.model = TradeModel()
+        self.model = model or TradeModel()
         self.signal_engine = TradeSignalFeatures(symbol)
         self.scorer = TradeScorer(symbol)
+        self.vol = VolatilityToolkit(symbol)
 
     def run(self):
-        if is_near_earnings(self.symbol):
+        return self.ibkr.ib.run(self.run_async())
+
+    async def run_async(self):
+        """
+        One covered-call cycle as a coroutine on the IB event loop. Broker calls are
+        awaited directly; blocking helpers (yfinance, model inference, webhooks, file
+        logging) go through asyncio.to_thread so they do not stall other strategies.
+        """
+        now = self.ibkr.now()
+        context = await build_market_context_async(self.symbol, as_of=now)
+        if context.near_earnings:
             print("[EARNINGS] Skipping covered call due to upcoming earnings.")
             return
 
         vol_regime = self.vol_model.detect_regime()
         if not self.ibkr.has_underlying(self.symbol):
-            self.ibkr.buy_underlying(self.symbol)
+            await self.ibkr.buy_underlying_async(self.symbol)
 
         open_call = self.ibkr.get_open_calls(self.symbol)
-        if open_call and open_call.days_to_expiry > ROLL_DTE_THRESHOLD:
+        if open_call and days_to_expiry(open_call.lastTradeDateOrContractMonth, now.date()) > ROLL_DTE_THRESHOLD:
             return
 
-        chain = self.ibkr.get_option_chain(self.symbol)
+        chain = await self.ibkr.get_option_chain_async(self.symbol)
         selected = self.filter.select_strikes(chain)
-
-        # First, compute the ML score for each option.
         for opt in selected:
-            features = {
-                "delta": opt.delta,
-                "roc": opt.roc,
-                "rsi": opt.rsi,
-                "momentum": opt.momentum,
-                "yield_to_strike": opt.yield_to_strike,
-                "iv_percentile": opt.iv_percentile,
-                "near_earnings": int(opt.near_earnings),
-            }
-            opt.ml_score = self.model.predict_score(features)
+            context.annotate(opt)
+            opt.roc = self.vol.calculate_roc(opt.strike * opt.yield_, opt.strike, max(opt.days_to_expiry, 1))
+            opt.yield_to_strike = opt.yield_
+            opt.dte = opt.days_to_expiry
+
+        # First, compute the ML score for every option in one batched model call.
+        features = [{
+            "delta": opt.delta,
+            "roc": opt.roc,
+            "rsi": opt.rsi,
+            "momentum": opt.momentum,
+            "yield_to_strike": opt.yield_to_strike,
+            "iv_percentile": opt.iv_percentile,
+            "near_earnings": int(opt.near_earnings),
+        } for opt in selected]
+        ml_scores = await asyncio.to_thread(self.model.predict_many, features)
+        if ml_scores is None:
+            ml_scores = [None] * len(selected)
+        for opt, ml_score in zip(selected, ml_scores):
+            opt.ml_score = ml_score
             # Default conviction score if not set
             if not hasattr(opt, 'conviction_score'):
                 opt.conviction_score = 0
 
-            hybrid_score = 0.7 * opt.ml_score + 0.3 * (opt.conviction_score / 100)
-            # You might want to filter options here if the hybrid score is too low.
-            if hybrid_score < 0.15:
-                continue
-
         # Next, compute conviction scores for each option.
         for opt in selected:
             features = {
-                'DTE': opt.dte_score,
-                'Strike Distance': opt.strike_dist_score,
-                'Premium Yield': opt.yield_score,
-                'Delta': opt.delta_score,
-                'IV Rank': opt.iv_rank_score,
-                'RSI': opt.rsi_score,
+                'DTE': getattr(opt, 'dte_score', 0),
+                'Strike Distance': getattr(opt, 'strike_dist_score', 0),
+                'Premium Yield': getattr(opt, 'yield_score', 0),
+                'Delta': getattr(opt, 'delta_score', 0),
+                'IV Rank': getattr(opt, 'iv_rank_score', 0),
+                'RSI': getattr(opt, 'rsi_score', 0),
                 'Earnings Proximity': 1 if not opt.near_earnings else 0,
                 'Cost Basis Awareness': 1 if opt.strike > self.filter.cost_basis else 0,
                 'Sizing': 1  # assume valid unless flagged
@@ -97,34 +114,42 @@ class CoveredCallStrategy:
             opt.overrides = result['overrides']
 
         if selected:
-            self.executor.write_calls(self.symbol, selected)
-            for opt in selected:
-                signal = self.signal_engine.get_features(opt, side="CALL")
-                score = self.model.predict_score(signal)
+            await self.executor.write_calls_async(self.symbol, selected)
+            signals = [self.signal_engine.get_features(opt, side="CALL") for opt in selected]
+            scores = await asyncio.to_thread(self.model.predict_many, signals)
+            if scores is None:
+                scores = [None] * len(selected)
+            for opt, score in zip(selected, scores):
                 # Combine ML prediction and conviction into a hybrid score
+                if score is None:
+                    continue
                 hybrid_score = 0.7 * score + 0.3 * (opt.conviction_score / 100)
-                if score is None or hybrid_score < 0.15:
+                if hybrid_score < 0.15:
                     continue
 
                 premium = round(opt.strike * opt.yield_, 2)
-                self.scorer.score_and_log_trade(opt, premium, side="CALL")
-                send_discord_alert(f'[CALL] Sold NVDA call {opt.strike} exp {opt.expiry}')
-                post_trade_to_webhook({
+                traded_at = self.ibkr.now()  # the replay clock under the simulated broker
+                await self.scorer.score_and_log_trade_async(opt, premium, side="CALL")
+                await send_discord_alert_async(f'[CALL] Sold {self.symbol} call {opt.strike} exp {opt.expiry}')
+                await asyncio.to_thread(post_trade_to_webhook, {
                     "type": "Sell Call",
+                    "symbol": self.symbol,
                     "strike": opt.strike,
                     "premium": premium,
                     "dte": opt.dte,
                     "conviction": opt.conviction_score,
                     "ml_score": opt.ml_score,
                     "hybrid_score": hybrid_score,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": traded_at.isoformat()
                 })
-                log_trade({
-                    "Date": datetime.now().strftime("%Y-%m-%d"),
+                await asyncio.to_thread(log_trade, {
+                    "Date": traded_at.strftime("%Y-%m-%d"),
                     "Type": "Sell Call",
+                    "Symbol": self.symbol,
                     "Strike": opt.strike,
                     "Premium": premium,
                     "DTE": opt.dte,
+                    "Expiry": opt.expiry,
                     "Conviction": opt.conviction_score,
                     "Overrides": ", ".join(opt.overrides),
                     "ML Score": opt.ml_score,
@@ -1,3 +1,4 @@
+import asyncio
 from config import DELTA_TARGET, MIN_YIELD
 from utils.logger import logger
 from utils.volatility import VolatilityToolkit
@@ -5,29 +6,30 @@ from utils.pnl_tracker import PnLTracker
 from strategy.trade_scorer import TradeScorer
 from utils.trade_model import TradeModel
 from utils.signals import TradeSignalFeatures
-from utils.discord_alerts import send_discord_alert
+from utils.discord_alerts import send_discord_alert_async
 from utils.smart_executor import SmartExecutor
-from ib_insync import Option
-from utils.earnings import is_near_earnings
 
 class CSPOverlay:
-    def __init__(self, ibkr_client, symbol):
+    def __init__(self, ibkr_client, symbol, model=None):
         self.ibkr = ibkr_client
         self.symbol = symbol
         self.pnl = PnLTracker()
         self.smart_exec = SmartExecutor(ibkr_client)
-        self.model = TradeModel()
+        self.model = model or TradeModel()
         self.signal_engine = TradeSignalFeatures(symbol)
         self.scorer = TradeScorer(symbol)
         self.vol = VolatilityToolkit(symbol)
         self.min_roc = 0.10  # 10% annualized minimum ROC
 
     def run(self):
+        return self.ibkr.ib.run(self.run_async())
+
+    async def run_async(self):
         if self.ibkr.get_open_calls(self.symbol):
             logger.info("[CSP] Skipping CSP: Call already open")
             return
 
-        chain = self.ibkr.get_put_chain(self.symbol)
+        chain = await self.ibkr.get_put_chain_async(self.symbol)
         filtered = []
         for opt in chain:
             roc = self.vol.calculate_roc(opt.strike * opt.yield_, opt.strike, opt.days_to_expiry)
@@ -39,10 +41,13 @@ class CSPOverlay:
             return
 
         sorted_trades = sorted(filtered, key=lambda x: -x[1])
-        for candidate, roc in sorted_trades:
-            signal = self.signal_engine.get_features(candidate, side="PUT")
-            score = self.model.predict_score(signal)
-            if score is not None and score >= 0.15:
+        # One market snapshot per cycle, shared by every candidate's features.
+        context = await self.signal_engine.refresh_context_async(as_of=self.ibkr.now())
+        signals = await asyncio.to_thread(
+            lambda: [self.signal_engine.get_features(candidate, "PUT", context) for candidate, _ in sorted_trades])
+        scores = await asyncio.to_thread(self.model.predict_many, signals)
+        for (candidate, roc), score in zip(sorted_trades, scores if scores is not None else []):
+            if score >= 0.15:
                 best = candidate
                 break
         else:
@@ -53,11 +58,10 @@ class CSPOverlay:
 
         logger.info(f"[SIMULATED CSP] Selling put: {self.symbol} {best.strike} @ {best.expiry}, "
                     f"delta={best.delta:.2f}, yield={best.yield_:.3f}, ROC={roc:.2%}, premium=${premium}")
-        contract = Option(self.symbol, best.expiry.replace("-", ""), best.strike, "P", "SMART")
-        self.ibkr.ib.qualifyContracts(contract)
-        self.smart_exec.place_limit_order(contract, 1, action="SELL")
-        self.ibkr.sell_put(best)
-        send_discord_alert(f'[CSP] Sold NVDA put {best.strike} exp {best.expiry}')
+        contract = await self.ibkr.option_contract_async(self.symbol, best.expiry, best.strike, "P")
+        await self.smart_exec.place_limit_order_async(contract, 1, action="SELL")
+        await self.ibkr.sell_put_async(best)
+        await send_discord_alert_async(f'[CSP] Sold {self.symbol} put {best.strike} exp {best.expiry}')
         self.pnl.record_trade(best, premium)
-        self.scorer.score_and_log_trade(best, premium, side="PUT")
+        await self.scorer.score_and_log_trade_async(best, premium, side="PUT")
         self.pnl.report()
\ No newline at end of file
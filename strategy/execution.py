@@ -1,5 +1,4 @@
 from utils.smart_executor import SmartExecutor
-from ib_insync import Option, LimitOrder
 
 class TradeExecutor:
     def __init__(self, ibkr_client):
@@ -7,8 +6,10 @@ class TradeExecutor:
         self.smart_exec = SmartExecutor(ibkr_client)
 
     def write_calls(self, symbol, options):
+        return self.ibkr.ib.run(self.write_calls_async(symbol, options))
+
+    async def write_calls_async(self, symbol, options):
         for option in options:
-            contract = Option(symbol, option.expiry.replace("-", ""), option.strike, "C", "SMART")
-            self.ibkr.ib.qualifyContracts(contract)
-            self.smart_exec.place_limit_order(contract, quantity=1, action="SELL")
-            self.ibkr.sell_option(option)
\ No newline at end of file
+            contract = await self.ibkr.option_contract_async(symbol, option.expiry, option.strike, "C")
+            await self.smart_exec.place_limit_order_async(contract, quantity=1, action="SELL")
+            await self.ibkr.sell_option_async(option)
\ No newline at end of file
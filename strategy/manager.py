@@ -1,27 +1,65 @@
-class StrategyManager:
-    def __init__(self, ibkr_client, symbol, cost_basis):
-        self.ibkr_client = ibkr_client
-        self.symbol = symbol
-        self.cost_basis = cost_basis
-        self.ml_model = None
-    
-    def set_ml_model(self, model):
-        self.ml_model = model
-    
-    def run(self):
-        # ...existing code...
-        if self.ml_model:
-            features = self.extract_features()
-            prediction = self.ml_model.predict(features)
-            self.make_decision(prediction)
-        # ...existing code...
-    
-    def extract_features(self):
-        # Implement feature extraction logic
-        # Example: Fetch historical data, current market data, etc.
-        return []
-    
-    def make_decision(self, prediction):
-        # Implement decision-making logic based on prediction
-        # Example: Execute trades, adjust positions, etc.
+from config import COVERED_CALL_TIMEOUT, CSP_TIMEOUT, STRATEGY_IO_WORKERS, MAX_CONCURRENT_STRATEGIES
+from strategy.covered_call import CoveredCallStrategy
+from strategy.csp_overlay import CSPOverlay
+from strategy.runtime import StrategyRuntime
+from utils.trade_model import TradeModel
+
+class StrategyManager:
+    def __init__(self, ibkr_client, symbol=None, cost_basis=650, watchlist=None):
+        """
+        Runs the covered-call and CSP pipelines for every symbol in `watchlist`
+        (or just `symbol`). `cost_basis` is either one number or a {symbol: basis} map
+        covering every symbol in the watchlist.
+        All symbols share one broker connection, contract cache, market-data lines,
+        trade model and worker pool.
+        """
+        self.ibkr_client = ibkr_client
+        self.watchlist = list(watchlist or [symbol])
+        self.symbol = self.watchlist[0]
+        self.cost_basis = cost_basis
+        if isinstance(cost_basis, dict):
+            missing = [sym for sym in self.watchlist if sym not in cost_basis]
+            if missing:
+                raise ValueError(f"No cost basis for {', '.join(missing)}; covered calls need each symbol's basis.")
+        self.ml_model = None
+        self.trade_model = TradeModel()
+        self.runtime = StrategyRuntime(ibkr_client, max_workers=STRATEGY_IO_WORKERS,
+                                       max_concurrent=MAX_CONCURRENT_STRATEGIES)
+        for sym in self.watchlist:
+            basis = cost_basis[sym] if isinstance(cost_basis, dict) else cost_basis
+            self.runtime.add(f"{sym}:covered_call",
+                             CoveredCallStrategy(ibkr_client, sym, basis, model=self.trade_model),
+                             COVERED_CALL_TIMEOUT)
+            self.runtime.add(f"{sym}:csp", CSPOverlay(ibkr_client, sym, model=self.trade_model), CSP_TIMEOUT)
+    
+    def close(self):
+        """Release the shared worker pool; call once the manager will not run again."""
+        self.runtime.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def set_ml_model(self, model):
+        self.ml_model = model
+    
+    def run(self):
+        # ...existing code...
+        if self.ml_model:
+            features = self.extract_features()
+            prediction = self.ml_model.predict(features)
+            self.make_decision(prediction)
+        # Every symbol's covered-call and CSP pipelines run concurrently on the shared IB event loop.
+        return self.runtime.run_cycle()
+    
+    def extract_features(self):
+        # Implement feature extraction logic
+        # Example: Fetch historical data, current market data, etc.
+        return []
+    
+    def make_decision(self, prediction):
+        # Implement decision-making logic based on prediction
+        # Example: Execute trades, adjust positions, etc.
         pass
\ No newline at end of file
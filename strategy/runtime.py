@@ -0,0 +1,70 @@
+# strategy/runtime.py
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StrategyRuntime:
+    """
+    Runs strategies concurrently as coroutines on the IBKRClient's event loop.
+
+    Each registered strategy must expose `run_async()`. Every cycle the strategies
+    are started together, so broker round trips in one overlap with work in the
+    others; each gets its own timeout and is cancelled on expiry without affecting
+    the rest. Blocking helpers that strategies push through asyncio.to_thread share
+    one bounded thread pool, installed as the loop's default executor. With many
+    strategies registered (one pair per watchlist symbol), at most `max_concurrent`
+    of them are in flight at once; a strategy's timeout starts when it gets a slot.
+    """
+
+    def __init__(self, ibkr_client, max_workers: int = 4, max_concurrent: Optional[int] = None):
+        self.ibkr = ibkr_client
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="strategy-io")
+        self.max_concurrent = max_concurrent
+        self.strategies: Dict[str, tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add(self, name: str, strategy, timeout: Optional[float] = None):
+        self.strategies[name] = (strategy, timeout)
+
+    def run_cycle(self) -> Dict[str, str]:
+        return self.ibkr.ib.run(self.run_cycle_async())
+
+    async def run_cycle_async(self) -> Dict[str, str]:
+        asyncio.get_running_loop().set_default_executor(self.pool)
+        slots = asyncio.Semaphore(self.max_concurrent or max(len(self.strategies), 1))
+        self._tasks = {
+            name: asyncio.ensure_future(self._run_one(name, strategy, timeout, slots))
+            for name, (strategy, timeout) in self.strategies.items()
+        }
+        results = await asyncio.gather(*self._tasks.values())
+        self._tasks = {}
+        outcome = dict(zip(self.strategies, results))
+        logger.info(f"[RUNTIME] Cycle complete: {outcome}")
+        return outcome
+
+    async def _run_one(self, name: str, strategy, timeout: Optional[float], slots: asyncio.Semaphore) -> str:
+        try:
+            async with slots:
+                await asyncio.wait_for(strategy.run_async(), timeout)
+            return "ok"
+        except asyncio.TimeoutError:
+            logger.warning(f"[RUNTIME] {name} timed out after {timeout}s and was cancelled")
+            return "timeout"
+        except asyncio.CancelledError:
+            logger.warning(f"[RUNTIME] {name} was cancelled")
+            return "cancelled"
+        except Exception as e:
+            logger.exception(f"[RUNTIME] {name} failed: {e}")
+            return "error"
+
+    def cancel(self, name: str):
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
@@ -1,13 +1,16 @@
-from strategy.manager import StrategyManager
-from utils.ibkr_interface import IBKRClient
+import sys
+from utils.sim_broker import ChainSnapshots, replay
 
-def simulate_backtest():
-    print("[BACKTEST] Running simulated strategy loop")
-    ibkr = IBKRClient()
-    manager = StrategyManager(ibkr, symbol="NVDA", cost_basis=650)
-    for i in range(30):  # Simulate 30 trading days
-        print(f"[DAY {i+1}]")
-        manager.run()
+def simulate_backtest(path=None, start=None, end=None):
+    """Replays stored chain snapshots (the options store, or a CSV at `path`) through the live StrategyManager."""
+    print(f"[BACKTEST] Replaying chain snapshots from {path or 'the options store'}")
+    snapshots = ChainSnapshots.from_csv(path) if path else ChainSnapshots.from_store(start=start, end=end)
+    result = replay(snapshots, start=start, end=end, cost_basis=650)
+    equity = result["equity"]
+    if not equity.empty:
+        print(f"[BACKTEST] {len(equity)} days, {len(result['fills'])} fills, "
+              f"final equity ${equity['equity'].iloc[-1]:,.2f}")
+    return result
 
 if __name__ == "__main__":
-    simulate_backtest()
\ No newline at end of file
+    simulate_backtest(*sys.argv[1:])
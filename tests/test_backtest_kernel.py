@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from ml.ML_Module.core.backtest_kernel import simulate_exits, summarize
+
+def reference_exits(prices, signals, holding, take_profit, stop_loss):
+    exits = []
+    for i in range(len(prices) - holding):
+        if not signals[i]:
+            continue
+        entry = prices[i]
+        for j in range(i + 1, i + holding + 1):
+            if prices[j] >= entry * (1 + take_profit) or prices[j] <= entry * (1 - stop_loss):
+                exits.append((i, j))
+                break
+        else:
+            exits.append((i, i + holding))
+    return exits
+
+class TestBacktestKernel(unittest.TestCase):
+
+    def test_matches_row_by_row_scan(self):
+        rng = np.random.default_rng(3)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 2000)))
+        signals = rng.random(2000) < 0.3
+        trades = simulate_exits(prices, signals, 5, 0.03, 0.02)
+        expected = reference_exits(prices, signals, 5, 0.03, 0.02)
+        self.assertEqual(list(zip(trades["entry_idx"], trades["exit_idx"])), expected)
+        np.testing.assert_allclose(trades["pnl"], prices[trades["exit_idx"]] - prices[trades["entry_idx"]])
+
+    def test_exit_reasons_and_summary(self):
+        prices = np.array([100, 106, 100, 97, 100, 101, 100, 100])
+        trades = simulate_exits(prices, np.ones(8, dtype=bool), 2, 0.05, 0.02)
+        self.assertEqual(list(trades["reason"]), ["take_profit", "stop_loss", "stop_loss", "time", "time", "time"])
+        stats = summarize(trades)
+        self.assertEqual((stats["trades"], stats["take_profit"], stats["stop_loss"], stats["time"]), (6, 1, 2, 3))
+        self.assertEqual(list(trades["pnl"]), [6, -6, -3, 4, 0, -1])
+        self.assertAlmostEqual(stats["win_rate"], 2 / 6)
+
+    def test_short_series(self):
+        self.assertEqual(summarize(simulate_exits([100, 101], [True, True], 2, 0.05, 0.05))["trades"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pandas as pd
+
+from utils import fetch_real_options_data as collector
+from utils.options_store import OptionsStore
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        today = datetime.now()
+        self.options = [(today + timedelta(days=d)).strftime("%Y-%m-%d") for d in (3, 17, 30, 90)]
+
+    def history(self, period="5d"):
+        return pd.DataFrame({"Close": [100.0]})
+
+    def option_chain(self, expiry):
+        def side(right):
+            return pd.DataFrame({
+                "contractSymbol": [f"{self.symbol}{pd.Timestamp(expiry):%y%m%d}{right}{k * 1000:08d}" for k in (95, 105)],
+                "strike": [95.0, 105.0], "lastPrice": [6.0, 1.5], "bid": [5.9, 1.4], "ask": [6.1, 1.6],
+            })
+        return SimpleNamespace(calls=side("C"), puts=side("P"))
+
+
+class TestCollectSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = OptionsStore(os.path.join(self.tmp.name, "options"))
+        patches = [patch.object(collector.yf, "Ticker", FakeTicker),
+                   patch.object(collector, "is_near_earnings", lambda symbol: False),
+                   patch.object(collector, "get_iv_history",
+                                lambda symbol: SimpleNamespace(record_chain=lambda *a: None, save=lambda: None,
+                                                               iv_percentile=lambda day: 0.5))]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_collects_every_expiry_in_the_window_once_per_day(self):
+        added = collector.collect_snapshots(["NVDA", "AAPL"], min_dte=0, max_dte=45, max_workers=3, store=self.store)
+        self.assertEqual(added, {"NVDA": 12, "AAPL": 12})  # 3 expiries x 4 contracts
+        df = self.store.read()
+        self.assertEqual(sorted(df["dte"].unique().tolist()), [3, 17, 30])
+        self.assertEqual(df["expiry"].nunique(), 3)
+
+        again = collector.collect_snapshots(["NVDA", "AAPL"], min_dte=0, max_dte=45, store=self.store)
+        self.assertEqual(again, {"NVDA": 0, "AAPL": 0})
+        self.assertEqual(len(self.store.read()), 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from ib_insync import Option, Stock
+from utils.contract_cache import ContractCache
+
+class TestContractCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "contracts.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_fill_and_persist(self):
+        cache = ContractCache(self.path)
+        cache.put_contract(Option("NVDA", "20990117", 100.0, "C", "SMART", conId=42, multiplier="100"))
+        cache.put_contract(Stock("NVDA", "SMART", "USD", conId=7))
+        cache.save()
+
+        reloaded = ContractCache(self.path)
+        option = Option("NVDA", "20990117", 100, "C", "SMART")
+        self.assertTrue(reloaded.fill(option))
+        self.assertEqual(option.conId, 42)
+        self.assertEqual(reloaded.get_contract("NVDA").conId, 7)
+        self.assertFalse(reloaded.fill(Option("NVDA", "20990117", 105.0, "C", "SMART")))
+        self.assertEqual((reloaded.hits, reloaded.misses), (2, 1))
+
+    def test_prune_drops_expired_options(self):
+        cache = ContractCache(self.path)
+        cache.put_contract(Option("NVDA", "20250117", 100.0, "P", "SMART", conId=1))
+        cache.put_contract(Option("NVDA", "20250221", 100.0, "P", "SMART", conId=2))
+        self.assertEqual(cache.prune(today=date(2025, 2, 1)), 1)
+        self.assertIsNone(cache.get_contract("NVDA", "20250117", 100.0, "P"))
+        self.assertIsNotNone(cache.get_contract("NVDA", "20250221", 100.0, "P"))
+
+    def test_chain_ttl(self):
+        cache = ContractCache(self.path, chain_ttl_hours=0)
+        cache.put_chain("NVDA", ["20990117"], [100, 95])
+        self.assertIsNone(cache.get_chain("NVDA"))
+        cache.chain_ttl = ContractCache(self.path).chain_ttl
+        self.assertEqual(cache.get_chain("NVDA")["strikes"], [95.0, 100.0])
+
+if __name__ == '__main__':
+    unittest.main()
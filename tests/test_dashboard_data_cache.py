@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+
+from dashboard import data_cache
+from utils.trade_journal import TradeJournal
+
+
+def trade(strike, **extra):
+    return {"Date": "2025-03-03", "Type": "Sell Call", "Symbol": "NVDA", "Strike": strike, "Premium": 1.0,
+            "Expiry": "2025-03-21", **extra}
+
+
+class TestDashboardDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "trades.db")
+        self.cache = data_cache.TradeHistoryCache(self.db)
+        self.store = self.cache.store
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_database_is_served_from_memory(self):
+        self.store.insert(trade(100.0))
+        self.assertEqual(len(self.cache.load()), 1)
+        with mock.patch.object(self.store, "query") as query:
+            self.assertEqual(len(self.cache.load()), 1)
+            query.assert_not_called()
+
+    def test_reads_new_rows_and_reconciled_updates(self):
+        first = self.store.insert(trade(100.0))
+        self.cache.load()
+        self.store.insert(trade(110.0))
+        self.store.update(first, **{"Actual PnL": 1.0})
+        df = self.cache.load()
+        self.assertEqual(df["Strike"].tolist(), [100.0, 110.0])
+        self.assertEqual(df["Actual PnL"].iloc[0], 1.0)
+        self.assertEqual(self.cache.last_id, 2)
+
+    def test_deleted_rows_trigger_a_full_reload_without_counting(self):
+        self.store.insert(trade(100.0))
+        second = self.store.insert(trade(110.0))
+        self.cache.load()
+        with self.store._conn() as conn:
+            conn.execute("DELETE FROM trades WHERE id = ?", [second])
+        with mock.patch.object(self.store, "count") as count:
+            self.assertEqual(self.cache.load()["Strike"].tolist(), [100.0])
+            count.assert_not_called()
+        self.assertEqual(self.cache.last_id, 1)
+
+    def test_copies_are_returned(self):
+        self.store.insert(trade(100.0))
+        df = self.cache.load()
+        df["Strike"] = 0.0
+        self.assertEqual(self.cache.load()["Strike"].iloc[0], 100.0)
+
+    def test_journal_cache_follows_appends(self):
+        path = os.path.join(self.tmp.name, "trades.jsonl")
+        TradeJournal(path).append({"score": 0.5})
+        cache = data_cache.JournalCache(path)
+        self.assertEqual(len(cache.load()), 1)
+        cache.journal.append({"score": 0.7})
+        self.assertEqual(cache.load()["score"].tolist(), [0.5, 0.7])
+
+    def test_model_reloaded_only_when_pickle_changes(self):
+        path = os.path.join(self.tmp.name, "model.pkl")
+        joblib.dump({"version": 1}, path)
+        cache = data_cache.ModelCache(path)
+        self.assertEqual(cache.load().model, {"version": 1})
+        with mock.patch.object(cache.model, "load_model") as load_model:
+            cache.load()
+            load_model.assert_not_called()
+        joblib.dump({"version": 2, "trees": list(range(10))}, path)
+        self.assertEqual(cache.load().model["version"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from utils import data_loader
+from utils.price_store import PriceStore
+
+
+def download_frame(symbols, periods=5):
+    """What yf.download(group_by="ticker") returns: (symbol, field) columns."""
+    index = pd.date_range("2025-01-01", periods=periods, freq="D", tz="America/New_York")
+    frames = {sym: pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": np.arange(periods, dtype=float) + 100,
+                                 "Volume": 1.0}, index=index) for sym in symbols}
+    return pd.concat(frames, axis=1)
+
+
+class TestDataLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceStore(self.tmpdir.name, max_age=60)
+        for target, value in [("price_store", self.store),
+                              ("SharedBackoff", functools.partial(data_loader.SharedBackoff, delay=0.01))]:
+            patcher = mock.patch.object(data_loader, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def download(self, side_effect):
+        patcher = mock.patch.object(data_loader.yf, "download", side_effect=side_effect)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_partial_batch_stores_returned_symbols_and_fails_the_rest(self):
+        download = self.download(lambda symbols, **kw: download_frame(["AAA"]))
+        failed = data_loader.refresh_price_store_many(["AAA", "BBB"])
+        self.assertEqual(failed, {"BBB"})
+        self.assertEqual(download.call_count, 1)
+        self.assertEqual(len(self.store.read("AAA")), 5)
+        self.assertTrue(self.store.read("BBB").empty)
+
+    def test_failed_attempt_backs_off_then_retries(self):
+        calls = []
+
+        def flaky(symbols, **kw):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise ConnectionError("rate limited")
+            return download_frame(symbols)
+
+        self.download(flaky)
+        self.assertEqual(data_loader.refresh_price_store_many(["AAA"]), set())
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.01)
+        self.assertEqual(len(self.store.read("AAA")), 5)
+
+    def test_exhausted_retries_fail_the_whole_batch(self):
+        download = self.download(ConnectionError("down"))
+        self.assertEqual(data_loader.refresh_price_store_many(["AAA", "BBB"]), {"AAA", "BBB"})
+        self.assertEqual(download.call_count, data_loader.RETRY_COUNT)
+
+    def test_batches_respect_the_concurrency_limit(self):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow(symbols, **kw):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return download_frame(symbols)
+
+        download = self.download(slow)
+        failed = data_loader.refresh_price_store_many(["A", "B", "C", "D", "E"], batch_size=2, max_concurrency=2)
+        self.assertEqual(failed, set())
+        self.assertEqual(download.call_count, 3)
+        self.assertLessEqual(peak[0], 2)
+
+    def test_fresh_symbols_are_not_downloaded(self):
+        self.store.append("AAA", "1d", download_frame(["AAA"])["AAA"])
+        download = self.download(lambda symbols, **kw: download_frame(symbols))
+        bars = data_loader.load_bars_many(["AAA"], period="max")
+        download.assert_not_called()
+        self.assertEqual(len(bars["AAA"]), 5)
+
+    def test_replay_does_not_see_the_same_day_close(self):
+        self.store.append("AAA", "1d", download_frame(["AAA"])["AAA"])  # closes 100..104 on Jan 1-5
+        download = self.download(lambda symbols, **kw: download_frame(symbols))
+        bars = data_loader.load_bars("AAA", period="max", as_of="2025-01-03 15:30")
+        download.assert_not_called()
+        self.assertEqual(bars["Close"].tolist(), [100.0, 101.0])
+        self.assertEqual(data_loader.load_bars("AAA", period="max", as_of="2025-01-04 09:30")["Close"].iloc[-1], 102.0)
+
+    def test_shared_backoff_grows_exponentially(self):
+        backoff = data_loader.SharedBackoff(delay=0.01, factor=2)
+        before = time.monotonic()
+        backoff.failed(0)
+        backoff.failed(2)
+        self.assertGreaterEqual(backoff.resume_at - before, 0.04)
+        started = time.monotonic()
+        asyncio.run(backoff.wait())
+        self.assertGreaterEqual(time.monotonic() - started, 0.03)
+
+    def test_run_uses_the_background_loop_from_inside_another_loop(self):
+        async def loop_thread():
+            return threading.current_thread().name
+
+        async def caller():
+            # Strategies call the sync API from worker threads while their own loop keeps running.
+            return await asyncio.to_thread(data_loader._run, loop_thread())
+
+        self.assertEqual(asyncio.run(caller()), "data-loader-loop")
+
+
+if __name__ == "__main__":
+    unittest.main()
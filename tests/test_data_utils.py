@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from ml.ML_Module.core.backtest_engine import BacktestEngine
+from ml.ML_Module.core.data_utils import compact_dtypes, concat_compact, load_trade_data
+
+
+class TestDataUtils(unittest.TestCase):
+    def test_compact_dtypes_downcasts_and_categorizes(self):
+        df = compact_dtypes(pd.DataFrame({"price": [1.5, 2.5], "volume": [10, 20], "OptionType": ["CALL", "PUT"],
+                                          "currency": ["USD", "USD"], "Date": ["2025-01-02", "2025-01-03"]}))
+        self.assertEqual(df["price"].dtype, np.float32)
+        self.assertEqual(df["volume"].dtype, np.int32)
+        self.assertIsInstance(df["OptionType"].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(df["currency"].dtype, pd.CategoricalDtype)
+        self.assertNotIsInstance(df["Date"].dtype, pd.CategoricalDtype)
+
+    def test_chunks_with_different_categories_stay_categorical(self):
+        a = compact_dtypes(pd.DataFrame({"OptionType": ["CALL"], "price": [1.0]}))
+        b = compact_dtypes(pd.DataFrame({"OptionType": ["PUT"], "price": [2.0]}))
+        df = concat_compact([a, b])
+        self.assertIsInstance(df["OptionType"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df["OptionType"].tolist(), ["CALL", "PUT"])
+
+    def test_chunked_load_matches_full_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trades.csv")
+            full = pd.DataFrame({"contractSymbol": [f"NVDA250404C{i:08d}" for i in range(25)],
+                                 "strike": np.arange(25, dtype=float), "label": [0, 1] * 12 + [0]})
+            full.to_csv(path, index=False)
+            df = load_trade_data(path, chunksize=7)
+        self.assertEqual(len(df), 25)
+        self.assertEqual(df["contractSymbol"].astype(str).tolist(), full["contractSymbol"].tolist())
+        np.testing.assert_allclose(df["strike"], full["strike"])
+
+    def test_empty_dte_window_is_reported(self):
+        engine = BacktestEngine()
+        with tempfile.TemporaryDirectory() as tmp:
+            engine.options_store.root = os.path.join(tmp, "options")
+            engine.data_path = os.path.join(tmp, "options.csv")
+            with open("data/real_options_data.csv") as src, open(engine.data_path, "w") as dst:
+                dst.writelines(src.readlines()[:20])  # the shipped sample holds no 16-21 DTE rows
+            with self.assertRaisesRegex(ValueError, "No rows with 16 <= DTE <= 21"):
+                engine.load_data()
+        with self.assertRaisesRegex(ValueError, "No rows"):
+            engine.train_model(pd.DataFrame())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+import numpy as np
+from utils.earnings import EarningsCalendar
+
+class TestEarningsCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.calendar = EarningsCalendar(os.path.join(self.tmpdir.name, "earnings.json"))
+        self.calendar.entries["NVDA"] = {"fetched": datetime.now().isoformat(),
+                                         "dates": ["2025-02-26", "2025-05-28", "2025-08-27"]}
+        self.calendar.save()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_near_mask(self):
+        dates = ["2025-02-18", "2025-02-19", "2025-03-05", "2025-03-06", "2025-07-01", "2025-09-30"]
+        mask = self.calendar.near_mask("NVDA", dates, window=7)
+        np.testing.assert_array_equal(mask, [False, True, True, False, False, False])
+
+    def test_persisted_index_is_reused(self):
+        reloaded = EarningsCalendar(self.calendar.path)
+        self.assertTrue(reloaded.is_near("nvda", datetime(2025, 5, 30), window=3))
+        self.assertFalse(reloaded.is_near("NVDA", datetime(2025, 6, 2), window=3))
+
+    def test_concurrent_lookups_fetch_once(self):
+        calls = []
+
+        def fetch(symbol):
+            calls.append(symbol)
+            time.sleep(0.05)
+            return {"2025-04-29"}
+
+        with mock.patch("utils.earnings._fetch_earnings_dates", side_effect=fetch):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda _: self.calendar.dates("AMD"), range(8)))
+        self.assertEqual(calls, ["AMD"])
+        self.assertTrue(all(len(r) == 1 for r in results))
+        self.assertFalse(os.path.exists(f"{self.calendar.path}.tmp"))
+
+if __name__ == '__main__':
+    unittest.main()
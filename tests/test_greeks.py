@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+import pandas as pd
+from utils.greeks import bs_price, bs_greeks, implied_volatility, add_greeks
+
+class TestGreeks(unittest.TestCase):
+
+    def test_implied_volatility_round_trip(self):
+        rng = np.random.default_rng(7)
+        n = 5000
+        spot = rng.uniform(50, 200, n)
+        strike = spot * rng.uniform(0.8, 1.2, n)
+        t = rng.uniform(5, 120, n) / 365
+        vol = rng.uniform(0.15, 1.0, n)
+        is_call = rng.random(n) < 0.5
+        price = bs_price(spot, strike, t, vol, is_call, rate=0.04)
+        iv = implied_volatility(price, spot, strike, t, is_call, rate=0.04)
+        # Deep ITM rows with ~zero vega are intrinsic-only and carry no vol information.
+        informative = bs_greeks(spot, strike, t, vol, is_call, rate=0.04)["vega"] > 1e-3
+        np.testing.assert_allclose(iv[informative], vol[informative], atol=1e-4)
+
+    def test_invalid_prices_return_nan(self):
+        iv = implied_volatility([0.0, 150.0, -1.0], 100.0, 100.0, 30 / 365, True)
+        self.assertTrue(np.isnan(iv).all())
+
+    def test_call_put_delta_parity(self):
+        greeks = bs_greeks(100.0, [90.0, 100.0, 110.0], 0.1, 0.3, [[True], [False]])
+        np.testing.assert_allclose(greeks["delta"][0] - greeks["delta"][1], 1.0)
+        np.testing.assert_allclose(greeks["gamma"][0], greeks["gamma"][1])
+
+    def test_add_greeks_frame(self):
+        df = pd.DataFrame({
+            "underlying_price": [100.0, 100.0],
+            "strike": [105.0, 95.0],
+            "dte": [30, 30],
+            "OptionType": ["CALL", "PUT"],
+        })
+        df["price"] = bs_price(100.0, df["strike"], 30 / 365, 0.4, [True, False])
+        add_greeks(df)
+        np.testing.assert_allclose(df["iv"], 0.4, atol=1e-5)
+        self.assertGreater(df.loc[0, "delta"], 0)
+        self.assertLess(df.loc[1, "delta"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
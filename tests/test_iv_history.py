@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+import pandas as pd
+from utils import ibkr_interface, volatility
+from utils.ibkr_interface import IBKRClient
+from utils.iv_history import IVHistory, atm_iv
+
+class TestIVHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(7)
+        self.dates = pd.bdate_range("2023-01-02", periods=300)
+        self.closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(self.dates))))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def history(self):
+        return IVHistory("NVDA", root=self.tmpdir.name, window=60, rv_window=21, min_history=5)
+
+    def test_incremental_realized_vol_matches_full_recompute(self):
+        history = self.history()
+        history.update_closes(self.dates[:200], self.closes[:200])
+        history.save()
+        resumed = self.history()
+        self.assertEqual(resumed.update_closes(self.dates, self.closes), 100)
+
+        returns = pd.Series(np.log(self.closes)).diff()
+        expected = (returns.rolling(21).std() * np.sqrt(252)).dropna()
+        np.testing.assert_allclose(resumed.rv.values, expected.values, rtol=1e-9)
+        last = expected.values[-60:]
+        self.assertAlmostEqual(resumed.rv.pct[-1], np.sum(last < last[-1]) / 60)
+
+    def test_iv_percentile_by_date(self):
+        history = self.history()
+        ivs = np.linspace(0.30, 0.60, 10)
+        for day, iv in zip(self.dates[:10], ivs):
+            history.record_iv(day, iv)
+        history.record_iv(self.dates[9], 0.10)  # same-day update replaces the value
+        self.assertEqual(history.iv_percentile(self.dates[9]), 0.0)
+        self.assertAlmostEqual(history.iv_percentile(self.dates[8]), 8 / 9)
+        self.assertTrue(np.isnan(history.percentiles([self.dates[2]])[0]))  # not enough IV yet, no RV
+
+    def test_concurrent_updates_roll_each_close_once(self):
+        expected = self.history()
+        expected.update_closes(self.dates, self.closes)
+        shared = IVHistory("NVDA", root=None, window=60, rv_window=21, min_history=5)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: shared.update_closes(self.dates, self.closes), range(8)))
+        np.testing.assert_allclose(shared.rv.values, expected.rv.values)
+
+    def test_in_memory_history_is_never_saved(self):
+        history = IVHistory("NVDA", root=None)
+        history.record_iv(self.dates[0], 0.4)
+        history.save()
+        self.assertIsNone(history.path)
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_replayed_percentile_loads_bars_up_to_its_date(self):
+        history = IVHistory("NVDA", root=None, window=60, rv_window=21, min_history=5)
+        bars = pd.DataFrame({"Close": self.closes[:250]}, index=self.dates[:250])
+        with mock.patch.object(volatility, "get_iv_history", return_value=history), \
+                mock.patch.object(volatility, "load_bars", return_value=bars) as load:
+            volatility.VolatilityToolkit("NVDA").get_iv_percentile(self.dates[250])
+        load.assert_called_once_with("NVDA", period="2y", interval="1d", as_of=self.dates[250])
+
+    def test_chain_iv_is_stamped_with_the_client_clock(self):
+        history = IVHistory("NVDA", root=None)
+        client = IBKRClient.__new__(IBKRClient)
+        client.now = lambda: datetime(2024, 5, 17, 15, 30)
+        options = [SimpleNamespace(strike=100.0, days_to_expiry=30, iv=0.4)]
+        with mock.patch.object(ibkr_interface, "get_iv_history", return_value=history):
+            client._record_atm_iv("NVDA", options, 100.0)
+        self.assertEqual(history.iv.dates, ["2024-05-17"])
+
+    def test_atm_iv_uses_front_expiry_nearest_strike(self):
+        self.assertEqual(atm_iv([95, 100, 105, 100], [7, 7, 7, 30], [0.5, np.nan, 0.4, 0.3], 101), 0.4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,9 +22,10 @@ class TestMain(unittest.TestCase):
                 main.main()
         
         MockIBKRClient.assert_called_once()
-        MockStrategyManager.assert_called_once_with(mock_ibkr, symbol="NVDA", cost_basis=650)
+        MockStrategyManager.assert_called_once_with(mock_ibkr, symbol="NVDA", cost_basis=650, watchlist=None)
         mock_manager.set_ml_model.assert_called_once_with(mock_model)
         mock_manager.run.assert_called_once()
+        mock_manager.close.assert_called_once()
 
 if __name__ == '__main__':
     unittest.main()
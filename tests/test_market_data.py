@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from eventkit import Event
+from ib_insync import Option, Ticker
+
+from utils.market_data import MarketDataSubscriptions
+
+
+class FakeIB:
+    def __init__(self):
+        self.pendingTickersEvent = Event("pendingTickersEvent")
+        self.requested = []
+        self.cancelled = []
+
+    def reqMktData(self, contract):
+        self.requested.append(contract.conId)
+        return Ticker(contract=contract)
+
+    def cancelMktData(self, contract):
+        self.cancelled.append(contract.conId)
+
+
+def option(con_id):
+    return Option("NVDA", "20990117", 100.0 + con_id, "C", "SMART", conId=con_id)
+
+
+class TestMarketDataSubscriptions(unittest.TestCase):
+    def setUp(self):
+        self.ib = FakeIB()
+        self.md = MarketDataSubscriptions(self.ib, max_lines=2)
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    async def take(self, *con_ids):
+        async with self.md.lease([option(i) for i in con_ids]) as tickers:
+            return tickers
+
+    def test_lru_order_and_eviction_cancels(self):
+        async def scenario():
+            await self.take(1)
+            await self.take(2)
+            await self.take(1)  # hit: 1 becomes most recent
+            await self.take(3)  # evicts 2, the least recently used
+        self.run_async(scenario())
+        self.assertEqual(self.ib.requested, [1, 2, 3])
+        self.assertEqual(self.ib.cancelled, [2])
+        stats = self.md.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["pinned"]), (1, 3, 1, 0))
+
+    def test_pinned_lines_are_not_evicted_by_concurrent_lease(self):
+        async def scenario():
+            holding = asyncio.Event()
+            order = []
+
+            async def first():
+                async with self.md.lease([option(1), option(2)]):
+                    holding.set()
+                    await asyncio.sleep(0.05)
+                    order.append(("first released", list(self.ib.cancelled)))
+
+            async def second():
+                await holding.wait()
+                async with self.md.lease([option(3)], timeout=1):
+                    order.append(("second leased", list(self.ib.cancelled)))
+
+            await asyncio.gather(first(), second())
+            return order
+        order = self.run_async(scenario())
+        self.assertEqual(order, [("first released", []), ("second leased", [1])])
+
+    def test_lease_times_out_when_every_line_is_pinned(self):
+        async def scenario():
+            async with self.md.lease([option(1), option(2)]):
+                with self.assertRaises(asyncio.TimeoutError):
+                    async with self.md.lease([option(3)], timeout=0.01):
+                        pass
+            self.assertEqual(self.md.stats()["pinned"], 0)
+        self.run_async(scenario())
+        self.assertEqual(self.ib.cancelled, [])
+
+    def test_shared_contract_stays_pinned_until_last_lease_exits(self):
+        async def scenario():
+            async with self.md.lease([option(1)]):
+                async with self.md.lease([option(1)]):
+                    pass
+                self.md.release(option(1))  # still held by the outer lease
+                self.assertEqual(self.ib.cancelled, [])
+            self.md.release(option(1))
+        self.run_async(scenario())
+        self.assertEqual(self.ib.cancelled, [1])
+
+    def test_unqualified_contract_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.run_async(self.take(0))
+
+    def test_wait_for_quotes_returns_on_pending_tickers(self):
+        async def scenario():
+            async with self.md.lease([option(1)]) as (ticker,):
+                loop = asyncio.get_running_loop()
+
+                def quote():
+                    ticker.bid, ticker.ask = 1.0, 1.2
+                    self.ib.pendingTickersEvent.emit({ticker})
+                loop.call_later(0.01, quote)
+                started = loop.time()
+                await self.md.wait_for_quotes([ticker], timeout=5)
+                return loop.time() - started
+        self.assertLess(self.run_async(scenario()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
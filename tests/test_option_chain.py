@@ -0,0 +1,36 @@
+import unittest
+from datetime import date
+from utils.option_chain import select_expiries, select_strikes
+
+class TestOptionChainPruning(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date(2025, 3, 3)
+        self.expirations = ["20250307", "20250314", "20250321", "20250404", "20250516"]
+
+    def test_select_expiries_window(self):
+        expiries = select_expiries(self.expirations, 5, 45, today=self.today)
+        self.assertEqual(expiries, ["20250314", "20250321", "20250404"])
+
+    def test_select_expiries_caps_count(self):
+        expiries = select_expiries(self.expirations, 5, 45, max_expiries=2, today=self.today)
+        self.assertEqual(expiries, ["20250314", "20250321"])
+
+    def test_select_expiries_falls_back_to_nearest(self):
+        expiries = select_expiries(self.expirations, 50, 60, today=self.today)
+        self.assertEqual(expiries, ["20250516"])
+
+    def test_select_strikes_call_band(self):
+        strikes = select_strikes(range(50, 201, 10), 100.0, "C", itm_band=0.05, otm_band=0.20)
+        self.assertEqual(strikes, [100, 110, 120])
+
+    def test_select_strikes_put_band(self):
+        strikes = select_strikes(range(50, 201, 10), 100.0, "P", itm_band=0.05, otm_band=0.20)
+        self.assertEqual(strikes, [80, 90, 100])
+
+    def test_select_strikes_without_spot(self):
+        strikes = select_strikes([120, 100, 110], None, "C", itm_band=0.05, otm_band=0.20)
+        self.assertEqual(strikes, [100, 110, 120])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from utils.options_store import OptionsStore
+
+
+def snapshot(day, expiry, symbol="NVDA", strikes=(100.0, 110.0)):
+    rows = []
+    for right in ("C", "P"):
+        for strike in strikes:
+            rows.append({
+                "contractSymbol": f"{symbol}{pd.Timestamp(expiry):%y%m%d}{right}{int(strike * 1000):08d}",
+                "strike": strike, "lastPrice": 2.5, "bid": 2.4, "ask": 2.6, "Date": day,
+            })
+    return pd.DataFrame(rows)
+
+
+class TestOptionsStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = OptionsStore(os.path.join(self.tmp.name, "options"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dte_symbol_and_type_are_derived_at_write_time(self):
+        self.store.write(snapshot("2025-03-03", "2025-03-21"))
+        df = self.store.read()
+        self.assertEqual(len(df), 4)
+        self.assertTrue((df["dte"] == 18).all())
+        self.assertEqual(set(df["symbol"]), {"NVDA"})
+        self.assertEqual(sorted(df["optiontype"].unique()), ["CALL", "PUT"])
+        self.assertEqual(str(df["dte"].dtype), "int16")
+
+    def test_filters_are_pushed_down(self):
+        self.store.write(pd.concat([snapshot("2025-03-03", "2025-03-07"), snapshot("2025-03-03", "2025-03-21"),
+                                    snapshot("2025-03-10", "2025-03-28"), snapshot("2025-03-10", "2025-03-28", "AAPL")]))
+        self.assertEqual(len(self.store.read(min_dte=16, max_dte=21)), 12)
+        self.assertEqual(len(self.store.read(start="2025-03-05")), 8)
+        self.assertEqual(len(self.store.read(symbols=["aapl"])), 4)
+        puts = self.store.read(option_type="P", columns=["date", "strike", "optiontype"])
+        self.assertEqual(list(puts.columns), ["date", "strike", "optiontype"])
+        self.assertEqual(set(puts["optiontype"]), {"PUT"})
+
+    def test_rewriting_a_snapshot_replaces_its_partition(self):
+        self.store.write(snapshot("2025-03-03", "2025-03-21"))
+        self.store.write(snapshot("2025-03-03", "2025-03-21", strikes=(100.0,)))
+        self.assertEqual(len(self.store.read()), 2)
+
+    def test_append_is_idempotent_and_keeps_stored_rows(self):
+        first = snapshot("2025-03-03", "2025-03-21")
+        self.assertEqual(self.store.append(first), 4)
+        self.assertEqual(self.store.append(first), 0)
+
+        changed = snapshot("2025-03-03", "2025-03-21", strikes=(100.0, 120.0))
+        changed["lastPrice"] = 9.9
+        self.assertEqual(self.store.append(changed), 2)  # only the 120 strikes are new
+        df = self.store.read()
+        self.assertEqual(len(df), 6)
+        self.assertEqual(df.loc[df["strike"] == 100.0, "price"].tolist(), [2.5, 2.5])
+        self.assertEqual(len(self.store.files("2025-03-03", "2025-03-21", "NVDA")), 2)
+
+    def test_write_replaces_appended_parts(self):
+        self.store.append(snapshot("2025-03-03", "2025-03-21"))
+        self.store.append(snapshot("2025-03-03", "2025-03-21", strikes=(120.0,)))
+        self.store.write(snapshot("2025-03-03", "2025-03-21", strikes=(100.0,)))
+        self.assertEqual(len(self.store.read()), 2)
+
+    def test_empty_store_reads_empty(self):
+        self.assertTrue(self.store.read().empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
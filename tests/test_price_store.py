@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from utils.price_store import PriceStore, period_start
+
+def bars(start, periods, close0=100.0, tz="America/New_York"):
+    index = pd.date_range(start, periods=periods, freq="D", tz=tz)
+    close = close0 + np.arange(periods, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1,
+                         "Close": close, "Volume": 1000.0, "Dividends": 0.0}, index=index)
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PriceStore(self.tmpdir.name, max_age=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_append_merges_and_replaces_partial_bar(self):
+        self.assertEqual(self.store.append("NVDA", "1d", bars("2025-01-01", 5)), 5)
+        update = bars("2025-01-05", 3, close0=200.0)  # first row overlaps the last stored bar
+        self.assertEqual(self.store.append("NVDA", "1d", update), 2)
+
+        df = PriceStore(self.tmpdir.name).read("NVDA", "1d")
+        self.assertEqual(len(df), 7)
+        self.assertEqual(list(df.columns), ["Open", "High", "Low", "Close", "Volume"])
+        self.assertEqual(df["Close"].iloc[4], 200.0)
+        np.testing.assert_array_equal(self.store.closes("NVDA", "1d", 2), [201.0, 202.0])
+        self.assertEqual(self.store.last_timestamp("NVDA", "1d"), update.index[-1])
+
+    def test_read_from_start_and_freshness(self):
+        self.assertFalse(self.store.is_fresh("NVDA", "1d"))
+        self.assertEqual(self.store.append("NVDA", "1d", bars("2025-01-01", 10)), 10)
+        self.assertTrue(self.store.is_fresh("NVDA", "1d"))
+        df = self.store.read("NVDA", "1d", start=pd.Timestamp("2025-01-08", tz="UTC"))
+        self.assertEqual(len(df), 3)
+        self.assertTrue(self.store.read("AMD", "1d").empty)
+
+    def test_closes_at_uses_last_session_on_or_before_each_date(self):
+        self.store.append("NVDA", "1d", bars("2025-01-01", 5))  # closes 100..104 on Jan 1-5
+        closes = self.store.closes_at("NVDA", ["2025-01-03", "2025-01-05", "2025-01-09", "2024-12-31"])
+        np.testing.assert_array_equal(closes, [102.0, 104.0, 104.0, np.nan])
+        self.assertTrue(np.isnan(self.store.closes_at("AMD", ["2025-01-03"])).all())
+
+    def test_closes_at_is_nan_when_the_store_ends_well_before_the_date(self):
+        self.store.append("NVDA", "1d", bars("2025-01-01", 5))  # last bar Jan 5
+        closes = self.store.closes_at("NVDA", ["2025-01-10", "2025-01-11", "2025-03-21"])
+        np.testing.assert_array_equal(closes, [104.0, np.nan, np.nan])
+        self.assertEqual(self.store.closes_at("NVDA", ["2025-03-21"], max_gap_days=100)[0], 104.0)
+
+    def test_period_start(self):
+        now = pd.Timestamp("2025-06-30", tz="UTC")
+        self.assertEqual(period_start("6mo", now), pd.Timestamp("2024-12-30", tz="UTC"))
+        self.assertEqual(period_start("5d", now), pd.Timestamp("2025-06-25", tz="UTC"))
+        self.assertIsNone(period_start("max", now))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from ib_insync import Option, Ticker
+
+from utils import data_loader
+from utils.ibkr_interface import IBKRClient
+from utils.price_store import PriceStore
+from utils.reconcile_outcomes import reconcile_outcomes
+from utils.trade_store import TradeStore
+
+
+def trade(kind, strike, expiry, symbol="NVDA", **extra):
+    return {"Date": "2025-03-03", "Type": kind, "Symbol": symbol, "Strike": strike, "Premium": 2.0,
+            "Expiry": expiry, **extra}
+
+
+class TestReconcileOutcomes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TradeStore(os.path.join(self.tmp.name, "trades.db"))
+        prices = PriceStore(os.path.join(self.tmp.name, "prices"))
+        index = pd.date_range("2025-03-17", periods=5, freq="D", tz="America/New_York")
+        closes = pd.DataFrame({"Open": 0.0, "High": 0.0, "Low": 0.0, "Close": [100.0, 101, 102, 103, 105],
+                               "Volume": 0.0}, index=index)  # Mar 21 closes at 105
+        prices.append("NVDA", "1d", closes)
+        patcher = mock.patch.object(data_loader, "price_store", prices)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_calls_and_puts_from_stored_closes(self):
+        self.store.insert_many([
+            trade("Sell Call", 104.0, "2025-03-21"),  # 1 ITM: 2 - 1
+            trade("Sell Call", 110.0, "2025-03-21"),  # expires worthless
+            trade("Sell Put", 108.0, "2025-03-21"),   # 3 ITM: 2 - 3
+            trade("Sell Put", 95.0, "2025-03-21", **{"Underlying Expiry Price": 90.0}),  # logged by hand
+            trade("Sell Call", 100.0, "2025-04-17"),  # not expired yet
+        ])
+        self.assertEqual(reconcile_outcomes(as_of="2025-03-24", store=self.store, refresh=False), 4)
+        df = self.store.all()
+        np.testing.assert_array_equal(df["Actual PnL"].iloc[:4], [1.0, 2.0, -1.0, -3.0])
+        np.testing.assert_array_equal(df["Underlying Expiry Price"].iloc[:4], [105.0, 105.0, 105.0, 90.0])
+        self.assertTrue(pd.isna(df["Actual PnL"].iloc[4]))
+
+    def test_only_unreconciled_rows_are_touched(self):
+        self.store.insert(trade("Sell Call", 104.0, "2025-03-21", **{"Actual PnL": 7.0}))
+        self.store.insert(trade("Sell Call", 104.0, "2025-03-21", symbol="AMD"))  # no stored prices
+        self.assertEqual(reconcile_outcomes(as_of="2025-03-24", store=self.store, refresh=False), 0)
+        self.assertEqual(self.store.all()["Actual PnL"].tolist()[0], 7.0)
+        self.assertEqual(len(self.store.unreconciled()), 1)
+
+    def test_live_trade_after_midnight_reconciles_against_its_expiry(self):
+        client = IBKRClient.__new__(IBKRClient)  # no connection needed to turn a ticker into option data
+        client.now = lambda: datetime(2025, 3, 14, 0, 30)
+        opt = client._option_data(Ticker(contract=Option("NVDA", "20250321", 104.0, "C", "SMART"), bid=2.0, ask=2.0))
+        self.assertEqual(opt.days_to_expiry, 7)
+        self.store.insert_many([
+            {**trade("Sell Call", opt.strike, None, Date="2025-03-14", DTE=opt.days_to_expiry), "Expiry": opt.expiry},
+            {**trade("Sell Call", opt.strike, None, Date="2025-03-14", DTE=opt.days_to_expiry)},  # older rows: no Expiry
+        ])
+        self.assertEqual(reconcile_outcomes(as_of="2025-03-24", store=self.store, refresh=False), 2)
+        df = self.store.all()
+        self.assertEqual(df["Expiry"].tolist(), ["2025-03-21", "2025-03-21"])
+        np.testing.assert_array_equal(df["Underlying Expiry Price"], [105.0, 105.0])
+
+    def test_expiry_past_the_stored_bars_stays_unreconciled(self):
+        self.store.insert(trade("Sell Call", 104.0, "2025-04-17"))  # store ends Mar 21
+        self.assertEqual(reconcile_outcomes(as_of="2025-04-22", store=self.store, refresh=False), 0)
+        self.assertEqual(len(self.store.unreconciled()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
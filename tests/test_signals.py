@@ -0,0 +1,28 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.market_context import MarketContext
+from utils.signals import TradeSignalFeatures
+
+
+class TestTradeSignalFeatures(unittest.TestCase):
+    def setUp(self):
+        self.option = SimpleNamespace(strike=100.0, yield_=0.02, delta=0.3, expiry="20990117", days_to_expiry=30)
+
+    def test_features_come_from_the_given_context(self):
+        context = MarketContext("NVDA", np.arange(20.0), rsi=55.0, momentum=1.5, iv_percentile=0.4,
+                                near_earnings=True)
+        features = TradeSignalFeatures("NVDA").get_features(self.option, "PUT", context)
+        self.assertEqual((features["rsi"], features["iv_percentile"], features["near_earnings"]), (55.0, 0.4, 1))
+
+    def test_missing_context_is_rejected_instead_of_reusing_a_cached_one(self):
+        signals = TradeSignalFeatures("NVDA")
+        signals.context = MarketContext("NVDA", np.arange(20.0), 55.0, 1.5, 0.4, False)  # an earlier cycle's
+        with self.assertRaises(ValueError):
+            signals.get_features(self.option, "PUT")
+
+
+if __name__ == "__main__":
+    unittest.main()
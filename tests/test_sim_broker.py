@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from ib_insync import LimitOrder
+import utils.data_loader as data_loader
+import utils.earnings as earnings
+import utils.iv_history as iv_history
+from utils.price_store import PriceStore
+from utils.sim_broker import ChainSnapshots, SimClock, SimulatedIBKRClient, offline_side_effects
+
+def snapshot_frame():
+    rows = []
+    for day, spot in (("2025-01-02", 100.0), ("2025-01-17", 110.0), ("2025-01-21", 112.0)):
+        for strike in (90.0, 100.0, 105.0, 110.0, 150.0):
+            for right in ("CALL", "PUT"):
+                rows.append({"Date": day, "symbol": "NVDA", "expiry": "20250117", "strike": strike,
+                             "OptionType": right, "bid": 2.0, "ask": 2.2, "price": 2.1,
+                             "underlying_price": spot})
+    return pd.DataFrame(rows)
+
+class TestSimulatedBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshots = ChainSnapshots(snapshot_frame())
+        self.clock = SimClock(self.snapshots.dates)
+        self.broker = SimulatedIBKRClient(self.snapshots, self.clock, cash=10_000)
+
+    def test_chain_is_pruned_and_priced(self):
+        next(iter(self.clock))
+        chain = self.broker.get_option_chain("NVDA")
+        self.assertEqual([opt.strike for opt in chain], [100.0, 105.0, 110.0])  # 150 is outside the band
+        self.assertTrue(all(0 < opt.delta < 1 and opt.days_to_expiry == 15 for opt in chain))
+
+    def test_fills_settlement_and_marking(self):
+        days = iter(self.clock)
+        next(days)
+        self.broker.buy_underlying("NVDA")
+        self.assertTrue(self.broker.has_underlying("NVDA"))
+        call = self.broker.get_option_chain("NVDA")[1]  # 105 strike
+        trade = self.broker.sell_option(call)
+        self.assertEqual(trade.orderStatus.status, "Filled")
+        self.assertEqual(self.broker.get_open_calls("NVDA").strike, 105.0)
+
+        contract = self.broker.option_contract("NVDA", "20250117", 100.0, "P")
+        too_rich = self.broker.ib.placeOrder(contract, LimitOrder("SELL", 1, 5.0))
+        self.assertEqual(too_rich.orderStatus.status, "Cancelled")
+
+        next(days)  # expiry day: still open
+        self.broker.settle_expired()
+        self.assertIsNotNone(self.broker.get_open_calls("NVDA"))
+        next(days)  # settled at intrinsic against the 110 close on expiry
+        self.broker.settle_expired()
+        self.assertIsNone(self.broker.get_open_calls("NVDA"))
+        self.assertAlmostEqual(self.broker.cash, 10_000 - 100 * 100.0 + 200.0 - 500.0)
+        self.assertAlmostEqual(self.broker.mark()["equity"], self.broker.cash + 100 * 112.0)
+
+    def test_offline_side_effects_redirects_live_state(self):
+        with tempfile.TemporaryDirectory() as live, tempfile.TemporaryDirectory() as log_dir:
+            iv_root, calendar = os.path.join(live, "iv"), os.path.join(live, "earnings.json")
+            os.makedirs(iv_root)
+            with open(calendar, "w") as f:
+                json.dump({}, f)
+            store = PriceStore(os.path.join(live, "prices"))
+            with mock.patch.object(iv_history, "HISTORY_ROOT", iv_root), \
+                    mock.patch.object(earnings, "CALENDAR_PATH", calendar), \
+                    mock.patch.object(data_loader, "price_store", store):
+                with offline_side_effects(log_dir):
+                    history = iv_history.get_iv_history("NVDA")
+                    history.record_iv("2025-01-02", 0.4)
+                    history.save()
+                    self.assertEqual(earnings.get_calendar().path, os.path.join(log_dir, "earnings_calendar.json"))
+                    self.assertEqual(data_loader.price_store.root, os.path.join(log_dir, "prices"))
+                self.assertEqual(os.listdir(iv_root), [])
+                self.assertTrue(os.path.exists(os.path.join(log_dir, "iv_history", "NVDA.json")))
+                self.assertIs(data_loader.price_store, store)
+                self.assertEqual(iv_history.HISTORY_ROOT, iv_root)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import contextlib
+import unittest
+from types import SimpleNamespace
+
+from ib_insync import Option, OrderStatus, Ticker, Trade
+
+from utils.smart_executor import SmartExecutor
+
+
+class FakeMarketData:
+    def __init__(self, bid, ask):
+        self.bid, self.ask = bid, ask
+
+    @contextlib.asynccontextmanager
+    async def lease(self, contracts, timeout=None):
+        yield [Ticker(contract=contract, bid=self.bid, ask=self.ask) for contract in contracts]
+
+    async def wait_for_quotes(self, tickers, timeout):
+        return tickers
+
+
+class FakeIB:
+    """placeOrder records every call and lets a test script what happens to the trade next."""
+
+    def __init__(self, outcome=None):
+        self.outcome = outcome  # "Filled", "Cancelled" or None (order rests)
+        self.placed = []
+        self.trade = None
+
+    def placeOrder(self, contract, order):
+        self.placed.append(order.lmtPrice)
+        if self.trade is None:
+            order.orderId = 7
+            self.trade = Trade(contract, order, OrderStatus(orderId=7, status="Submitted"))
+        if self.outcome:
+            asyncio.get_running_loop().call_later(0.01, self._finish)
+        return self.trade
+
+    def _finish(self):
+        self.trade.orderStatus.status = self.outcome
+        event = self.trade.filledEvent if self.outcome == "Filled" else self.trade.cancelledEvent
+        event.emit(self.trade)
+
+
+def executor(outcome=None, bid=2.0, ask=2.2):
+    ib = FakeIB(outcome)
+    return SmartExecutor(SimpleNamespace(ib=ib, market_data=FakeMarketData(bid, ask)), attempt_timeout=0.05), ib
+
+
+CONTRACT = Option("NVDA", "20990117", 120.0, "C", "SMART", conId=1)
+
+
+class TestSmartExecutor(unittest.TestCase):
+    def test_fill_event_ends_the_wait_and_records_latency(self):
+        smart, ib = executor("Filled")
+        trade = asyncio.run(smart.place_limit_order_async(CONTRACT, 1))
+        self.assertEqual(trade.orderStatus.status, "Filled")
+        self.assertEqual(ib.placed, [round(2.1 * 0.98, 2)])
+        self.assertIn(7, smart.fill_latencies)
+        self.assertLess(smart.fill_latencies[7], 0.05)
+
+    def test_cancel_event_stops_retrying(self):
+        smart, ib = executor("Cancelled")
+        trade = asyncio.run(smart.place_limit_order_async(CONTRACT, 1))
+        self.assertEqual(trade.orderStatus.status, "Cancelled")
+        self.assertEqual(len(ib.placed), 1)
+        self.assertEqual(smart.fill_latencies, {})
+
+    def test_unfilled_order_is_repriced_in_place(self):
+        smart, ib = executor()
+        trade = asyncio.run(smart.place_limit_order_async(CONTRACT, 1, max_attempts=3))
+        self.assertEqual(trade.orderStatus.status, "Submitted")
+        self.assertEqual(len(ib.placed), 3)
+        self.assertGreater(ib.placed[0], ib.placed[1])
+        self.assertGreater(ib.placed[1], ib.placed[2])
+        self.assertIs(ib.trade.order, trade.order)  # one order, modified each time
+        self.assertEqual(len(trade.filledEvent), 0)  # handlers detached
+
+    def test_no_quote_places_nothing(self):
+        smart, ib = executor("Filled", bid=float("nan"), ask=float("nan"))
+        self.assertIsNone(asyncio.run(smart.place_limit_order_async(CONTRACT, 1)))
+        self.assertEqual(ib.placed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
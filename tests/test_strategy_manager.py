@@ -19,5 +19,15 @@ class TestStrategyManager(unittest.TestCase):
         mock_predict.assert_called_once_with([1, 2, 3])
         mock_make_decision.assert_called_once_with([0.5])
 
+    def test_cost_basis_map_must_cover_watchlist(self):
+        with self.assertRaisesRegex(ValueError, "AMD"):
+            StrategyManager(MagicMock(), watchlist=["NVDA", "AMD"], cost_basis={"NVDA": 650})
+
+    def test_close_shuts_down_the_worker_pool(self):
+        with StrategyManager(MagicMock(), symbol="NVDA", cost_basis=650) as manager:
+            pool = manager.runtime.pool
+        with self.assertRaises(RuntimeError):
+            pool.submit(print)
+
 if __name__ == '__main__':
     unittest.main()
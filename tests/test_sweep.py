@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from ml.ML_Module.core.sweep import ParameterSweep, param_grid, param_sampler, walk_forward_windows
+
+
+class WalkForwardWindowTests(unittest.TestCase):
+    def test_rolling_windows_never_overlap_their_test_range(self):
+        windows = walk_forward_windows(100, train_size=40, test_size=20)
+        self.assertEqual(windows, [((0, 40), (40, 60)), ((20, 60), (60, 80)), ((40, 80), (80, 100))])
+
+    def test_anchored_windows_grow_from_the_start(self):
+        windows = walk_forward_windows(100, train_size=40, test_size=30, step=30, anchored=True)
+        self.assertEqual(windows, [((0, 40), (40, 70)), ((0, 70), (70, 100))])
+
+
+class ParameterSpaceTests(unittest.TestCase):
+    def test_grid_covers_every_combination(self):
+        configs = param_grid({"stop_loss_pct": [0.02, 0.03], "predict_threshold": [0.5, 0.6, 0.7]})
+        self.assertEqual(len(configs), 6)
+        self.assertIn({"stop_loss_pct": 0.03, "predict_threshold": 0.6}, configs)
+
+    def test_sampler_respects_bounds_and_types(self):
+        configs = param_sampler({"trade_holding_period": (1, 5), "stop_loss_pct": (0.01, 0.05),
+                                 "predict_threshold": [0.5, 0.6]}, n=50, seed=1)
+        self.assertEqual(len(configs), 50)
+        for config in configs:
+            self.assertIsInstance(config["trade_holding_period"], int)
+            self.assertTrue(1 <= config["trade_holding_period"] <= 5)
+            self.assertTrue(0.01 <= config["stop_loss_pct"] <= 0.05)
+            self.assertIn(config["predict_threshold"], [0.5, 0.6])
+
+
+class ParameterSweepTests(unittest.TestCase):
+    def test_sweep_ranks_configurations_out_of_sample(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+        df = pd.DataFrame({"price": prices, "feature": rng.normal(size=n),
+                           "label": (np.roll(prices, -1) > prices).astype(int)})
+        sweep = ParameterSweep(df, model_params={"n_estimators": 10}, max_workers=2)
+        results = sweep.run({"predict_threshold": [0.0, 0.99], "stop_loss_pct": [0.02, 0.04]},
+                            train_size=100, test_size=50,
+                            defaults={"trade_holding_period": 2, "take_profit_pct": 0.05})
+
+        self.assertEqual(len(results), 4)
+        self.assertTrue(results["oos_sharpe"].is_monotonic_decreasing)
+        # A threshold of 0 enters on every row of every test window that has room to exit.
+        everything = results[results["predict_threshold"] == 0.0]
+        self.assertTrue((everything["oos_trades"] > 0).all())
+
+    def test_workers_split_the_cores(self):
+        df = pd.DataFrame({"price": np.linspace(1, 2, 50), "label": [0, 1] * 25})
+        with mock.patch("os.cpu_count", return_value=8):
+            self.assertEqual(ParameterSweep(df, max_workers=4).model_params["n_jobs"], 2)
+            self.assertEqual(ParameterSweep(df, max_workers=16).model_params["n_jobs"], 1)
+
+    def test_missing_parameters_are_rejected(self):
+        df = pd.DataFrame({"price": np.linspace(1, 2, 50), "label": [0, 1] * 25})
+        with self.assertRaises(ValueError):
+            ParameterSweep(df, max_workers=1).run([{"predict_threshold": 0.5}], train_size=20, test_size=10)
+        complete = {"trade_holding_period": 3, "stop_loss_pct": 0.02, "take_profit_pct": 0.04, "predict_threshold": 0.5}
+        partial = {k: v for k, v in complete.items() if k != "stop_loss_pct"}
+        with self.assertRaisesRegex(ValueError, r"\{1: \['stop_loss_pct'\]\}"):
+            ParameterSweep(df, max_workers=1).run([complete, partial], train_size=20, test_size=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
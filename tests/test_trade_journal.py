@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from utils import trade_journal
+from utils.trade_journal import JournalReader, TradeJournal
+
+
+def record(i, **extra):
+    return {"date": f"2025-03-{i + 1:02d}", "side": "CALL", "strike": 100.0 + i, "score": 0.5, **extra}
+
+
+class TestTradeJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "trades.jsonl")
+        self.journal = TradeJournal(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_returns_position_and_counts_from_index(self):
+        self.assertEqual(self.journal.count(), 0)
+        self.assertEqual(self.journal.append(record(0, delta=np.float64(0.3))), 0)
+        self.assertEqual(self.journal.append(record(1)), 1)
+        self.assertEqual(self.journal.extend([record(2), record(3)]), 2)
+        self.assertEqual(self.journal.count(), 4)
+        self.assertEqual(os.path.getsize(self.journal.index_path), 32)
+        self.assertEqual(self.journal.read()[0]["delta"], 0.3)
+
+    def test_reads_from_a_position(self):
+        self.journal.extend(record(i) for i in range(5))
+        self.assertEqual([r["strike"] for r in self.journal.read(3)], [103.0, 104.0])
+        self.assertEqual(self.journal.read(5), [])
+        self.assertEqual([r["strike"] for r in self.journal.tail(2)], [103.0, 104.0])
+        self.assertEqual(len(self.journal.read_frame(1)), 4)
+
+    def test_repair_indexes_unindexed_lines_and_drops_torn_line(self):
+        self.journal.extend([record(0), record(1)])
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record(2)) + "\n")
+            f.write('{"date": "2025-03-0')
+        journal = TradeJournal(self.path)
+        self.assertEqual(journal.count(), 3)
+        self.assertEqual(journal.read(2)[0]["strike"], 102.0)
+        self.assertEqual(journal.append(record(3)), 3)
+        self.assertEqual(journal.read(3)[0]["strike"], 103.0)
+
+    @unittest.skipIf(trade_journal.fcntl is None, "no cross-process file locks on this platform")
+    def test_open_waits_for_a_write_in_progress_instead_of_repairing_it(self):
+        self.journal.append(record(0))
+        line = (json.dumps(record(1)) + "\n").encode()
+        opened = []
+        with self.journal._locked():  # another writer, mid-append
+            with open(self.path, "ab") as data:
+                offset = data.seek(0, os.SEEK_END)
+                data.write(line[:10])
+            opener = threading.Thread(target=lambda: opened.append(TradeJournal(self.path)))
+            opener.start()
+            opener.join(0.05)
+            self.assertTrue(opener.is_alive())
+            with open(self.path, "ab") as data:
+                data.write(line[10:])
+            with open(self.journal.index_path, "ab") as idx:
+                idx.write(trade_journal._OFFSET.pack(offset))
+        opener.join()
+        self.assertEqual(opened[0].count(), 2)
+        self.assertEqual(opened[0].read(1)[0]["strike"], 101.0)
+
+    def test_migrate_json(self):
+        legacy = os.path.join(self.tmp.name, "trades.json")
+        with open(legacy, "w") as f:
+            json.dump([record(0), record(1)], f)
+        self.assertEqual(self.journal.migrate_json(legacy), 2)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(f"{legacy}.migrated"))
+        self.assertEqual(self.journal.count(), 2)
+
+    def test_reader_refresh_is_incremental(self):
+        reader = JournalReader(self.journal)
+        self.assertTrue(reader.refresh().empty)
+        self.journal.extend([record(0), record(1)])
+        self.assertEqual(len(reader.refresh()), 2)
+        self.journal.append(record(2))
+        df = reader.refresh()
+        self.assertEqual(df["strike"].tolist(), [100.0, 101.0, 102.0])
+        self.assertEqual(reader.checkpoint, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+from utils.trade_store import TradeStore
+
+
+def trade(day="2025-03-03", kind="Sell Call", strike=110.0, **extra):
+    return {"Date": day, "Type": kind, "Strike": strike, "Premium": 1.25, "DTE": 18, "Conviction": 0.8,
+            "Overrides": "", "ML Score": 0.6, "Hybrid Score": 0.7, **extra}
+
+
+class TestTradeStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TradeStore(os.path.join(self.tmp.name, "trades.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_insert_fills_expiry_and_keeps_unknown_keys(self):
+        self.store.insert(trade(note="rolled"))
+        df = self.store.all()
+        self.assertEqual(df["Expiry"].iloc[0], "2025-03-21")
+        self.assertEqual(list(df.columns[:4]), ["id", "Date", "Type", "Symbol"])
+        extra = self.store._conn().execute("SELECT extra FROM trades").fetchone()[0]
+        self.assertIn("rolled", extra)
+
+    def test_indexed_queries(self):
+        self.store.insert(trade("2025-03-03"))
+        self.store.insert(trade("2025-03-04", kind="Sell Put", strike=90.0))
+        self.store.insert(trade("2025-04-01"))
+        self.assertEqual(len(self.store.on("2025-03-04")), 1)
+        self.assertEqual(len(self.store.of_type("Sell Call")), 2)
+        self.assertEqual(len(self.store.between("2025-03-01", "2025-03-31")), 2)
+        self.assertEqual(len(self.store.unreconciled(expired_before="2025-04-01")), 2)
+        self.assertEqual(self.store.recent(2)["Date"].tolist(), ["2025-03-04", "2025-04-01"])
+        self.assertEqual(len(self.store.unreconciled(expired_before="2025-04-01", types=["Sell Put"])), 1)
+        for where, params in (("date = ?", ["2025-03-04"]), ("actual_pnl IS NULL AND expiry < ?", ["2025-04-01"]),
+                              ("actual_pnl IS NULL AND type IN (?, ?) AND expiry < ?",
+                               ["Sell Call", "Sell Put", "2025-04-01"]),
+                              ("type = ?", ["Sell Put"]), ("strike = ?", [90.0])):
+            plan = " ".join(row[-1] for row in self.store._conn().execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM trades WHERE {where}", params))
+            self.assertIn("USING INDEX", plan, where)
+
+    def test_update_many_sets_only_given_rows(self):
+        ids = [self.store.insert(trade()) for _ in range(3)]
+        self.store.update_many(ids[:2], {"Actual PnL": [1.0, -2.5]})
+        self.assertEqual(self.store.all()["Actual PnL"].tolist()[:2], [1.0, -2.5])
+        self.assertEqual(len(self.store.unreconciled()), 1)
+
+    def test_concurrent_writers(self):
+        def write(n):
+            for i in range(n):
+                self.store.insert(trade(strike=float(i)))
+        threads = [threading.Thread(target=write, args=(25,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.store.count(), 100)
+        mode = self.store._conn().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_migrate_csv(self):
+        path = os.path.join(self.tmp.name, "trade_history.csv")
+        pd.DataFrame([trade(), trade(strike=115.0)]).to_csv(path, index=False)
+        self.assertEqual(self.store.migrate_csv(path), 2)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.store.all()["Strike"].tolist(), [110.0, 115.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import optuna
+
+from ml.ML_Module.core.tuning import tune_xgb
+
+optuna.logging.set_verbosity(optuna.logging.WARNING)
+
+
+def space(trial):
+    return {
+        "n_estimators": trial.suggest_int("n_estimators", 20, 60),
+        "max_depth": trial.suggest_int("max_depth", 2, 4),
+    }
+
+
+class TuneXGBTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = os.path.join(self.tmp.name, "optuna.db")
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(400, 4))
+        y = (X[:, 0] + 0.5 * rng.normal(size=400) > 0).astype(int)
+        self.data = X[:300], y[:300], X[300:], y[300:]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_best_params_come_from_the_search_space(self):
+        best, study = tune_xgb(*self.data, space, n_trials=4, study_name="t", storage=self.storage, n_jobs=2)
+        self.assertEqual(set(best), {"n_estimators", "max_depth"})
+        self.assertGreater(study.best_value, 0.7)
+
+    def test_interrupted_study_resumes_from_storage(self):
+        tune_xgb(*self.data, space, n_trials=3, study_name="resume", storage=self.storage, n_jobs=1)
+        _, study = tune_xgb(*self.data, space, n_trials=5, study_name="resume", storage=self.storage, n_jobs=1)
+        self.assertEqual(len(study.trials), 5)
+
+    def test_new_data_starts_a_fresh_study(self):
+        tune_xgb(*self.data, space, n_trials=3, study_name="grown", storage=self.storage, n_jobs=1)
+        X_train, y_train, X_val, y_val = self.data
+        _, study = tune_xgb(X_train[:-10], y_train[:-10], X_val, y_val, space, n_trials=3, study_name="grown",
+                            storage=self.storage, n_jobs=1)
+        self.assertEqual(len(study.trials), 3)
+        self.assertTrue(study.study_name.startswith("grown-"))
+
+    def test_base_params_may_set_eval_metric(self):
+        best, _ = tune_xgb(*self.data, space, n_trials=2, study_name="metric", storage=self.storage, n_jobs=1,
+                           base_params={"eval_metric": "logloss"})
+        self.assertEqual(set(best), {"n_estimators", "max_depth"})
+
+
+if __name__ == "__main__":
+    unittest.main()
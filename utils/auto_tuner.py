@@ -1,22 +1,20 @@
-import json
 import pandas as pd
-import os
 from statistics import mean
+from config import TRADE_JOURNAL_PATH
+from utils.trade_journal import get_journal
 
 class StrategyAutoTuner:
-    def __init__(self, log_path="logs/trades.json"):
+    def __init__(self, log_path=TRADE_JOURNAL_PATH):
         self.log_path = log_path
         self.df = self.load_trades()
 
     def load_trades(self):
-        if not os.path.exists(self.log_path):
+        journal = get_journal(self.log_path)
+        if journal.count() == 0:
             print("[AUTO-TUNER] No trade log found.")
             return pd.DataFrame()
 
-        with open(self.log_path, "r") as f:
-            trades = json.load(f)
-
-        return pd.DataFrame(trades)
+        return journal.read_frame()
 
     def tune(self):
         if self.df.empty or len(self.df) < 10:
@@ -0,0 +1,129 @@
+# utils/contract_cache.py
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from ib_insync import Contract, util
+
+logger = logging.getLogger(__name__)
+
+
+class ContractCache:
+    """
+    Reference-data cache for IBKR contract definitions.
+
+    Qualified contracts are keyed by (symbol, expiry, strike, right) and option-chain
+    parameters (expirations, strikes, underlying conId) by symbol. Both live in memory
+    and are persisted to a JSON file so a restart can skip qualifyContracts and
+    reqSecDefOptParams round trips. Option entries stay valid until their expiry has
+    passed; chain parameters are refreshed after `chain_ttl_hours`.
+    """
+
+    def __init__(self, path: str = "data/contract_cache.json", chain_ttl_hours: float = 24):
+        self.path = path
+        self.chain_ttl = timedelta(hours=chain_ttl_hours)
+        self.contracts: Dict[str, dict] = {}
+        self.chains: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def key(symbol: str, expiry: str = "", strike: float = 0.0, right: str = "") -> str:
+        return f"{symbol}|{expiry}|{float(strike or 0.0)}|{right}"
+
+    @classmethod
+    def key_for(cls, contract) -> str:
+        return cls.key(contract.symbol, contract.lastTradeDateOrContractMonth, contract.strike, contract.right)
+
+    # -------------------------
+    # Contracts
+    # -------------------------
+
+    def get_contract(self, symbol: str, expiry: str = "", strike: float = 0.0, right: str = "") -> Optional[Contract]:
+        fields = self.contracts.get(self.key(symbol, expiry, strike, right))
+        if fields is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Contract.create(**fields)
+
+    def fill(self, contract) -> bool:
+        """Copy cached fields (conId etc.) onto `contract`; returns False on a miss."""
+        fields = self.contracts.get(self.key_for(contract))
+        if fields is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        util.dataclassUpdate(contract, **fields)
+        return True
+
+    def put_contract(self, contract):
+        if not contract.conId:
+            return
+        self.contracts[self.key_for(contract)] = util.dataclassNonDefaults(contract)
+        self._dirty = True
+
+    # -------------------------
+    # Chain parameters
+    # -------------------------
+
+    def get_chain(self, symbol: str) -> Optional[dict]:
+        chain = self.chains.get(symbol)
+        if chain is None or datetime.now() - datetime.fromisoformat(chain["fetched"]) > self.chain_ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return chain
+
+    def put_chain(self, symbol: str, expirations: List[str], strikes: List[float], trading_class: str = None):
+        self.chains[symbol] = {
+            "expirations": sorted(expirations),
+            "strikes": sorted(float(k) for k in strikes),
+            "trading_class": trading_class or symbol,
+            "fetched": datetime.now().isoformat(),
+        }
+        self._dirty = True
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+
+    def prune(self, today: Optional[date] = None):
+        """Drop option definitions whose expiry has passed."""
+        cutoff = (today or date.today()).strftime("%Y%m%d")
+        expired = [k for k, fields in self.contracts.items()
+                   if fields.get("lastTradeDateOrContractMonth", "") and fields["lastTradeDateOrContractMonth"][:8] < cutoff]
+        for k in expired:
+            del self.contracts[k]
+        if expired:
+            self._dirty = True
+        return len(expired)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[ContractCache] Ignoring unreadable cache {self.path}: {e}")
+            return
+        self.contracts = data.get("contracts", {})
+        self.chains = data.get("chains", {})
+        pruned = self.prune()
+        logger.info(f"[ContractCache] Loaded {len(self.contracts)} contracts and {len(self.chains)} chains "
+                    f"from {self.path} ({pruned} expired dropped)")
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"contracts": self.contracts, "chains": self.chains}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
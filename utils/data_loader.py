@@ -2,9 +2,12 @@ import os
 import time
 import asyncio
 import logging
+import threading
 import yfinance as yf
 import numpy as np
-from functools import lru_cache, wraps
+import pandas as pd
+
+from utils.price_store import PriceStore, period_start
 
 # -------------------------
 # Configuration & Logging
@@ -16,6 +19,15 @@ DEFAULT_INTERVAL = os.environ.get("PRICE_HISTORY_INTERVAL", "1d")
 DEFAULT_DAYS = int(os.environ.get("PRICE_HISTORY_DAYS", "21"))
 RETRY_COUNT = int(os.environ.get("PRICE_HISTORY_RETRY_COUNT", "3"))
 RETRY_DELAY = float(os.environ.get("PRICE_HISTORY_RETRY_DELAY", "2"))  # seconds
+PRICE_STORE_DIR = os.environ.get("PRICE_STORE_DIR", "data/prices")
+PRICE_STORE_MAX_AGE = float(os.environ.get("PRICE_STORE_MAX_AGE", "900"))  # seconds between refreshes
+BULK_BATCH_SIZE = int(os.environ.get("PRICE_BULK_BATCH_SIZE", "20"))  # symbols per batched download
+BULK_MAX_CONCURRENCY = int(os.environ.get("PRICE_BULK_CONCURRENCY", "4"))  # batches in flight at once
+
+# How far back the first fetch for a symbol goes (yfinance caps intraday history)
+BOOTSTRAP_PERIODS = {"1m": "7d", "2m": "60d", "5m": "60d", "15m": "60d", "30m": "60d",
+                     "60m": "730d", "1h": "730d", "1d": "5y", "1wk": "10y"}
+MARKET_TZ = "America/New_York"  # naive replay times and daily bar stamps are exchange-local
 
 # Setup logging
 logging.basicConfig(
@@ -28,75 +40,192 @@ logger = logging.getLogger(__name__)
 metrics = {
     "api_calls": 0,
     "failed_calls": 0,
-    "total_latency": 0.0
+    "total_latency": 0.0,
+    "symbols": {}  # per-symbol calls, failures and latency
 }
 
+price_store = PriceStore(PRICE_STORE_DIR, max_age=PRICE_STORE_MAX_AGE)
+
 # -------------------------
-# Retry Decorator (Async)
+# Shared Retry / Backoff
 # -------------------------
 
-def retry_async(retries=3, delay=2, backoff=2):
+class SharedBackoff:
     """
-    Decorator for asynchronous functions that retries on exception.
+    Retry state shared by concurrent downloads. A failure in any batch pushes
+    `resume_at` out exponentially, and every batch waits for it before its next
+    request, so a rate limit backs off the whole bulk fetch instead of each
+    batch hammering the API on its own schedule.
     """
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            current_delay = delay
-            for attempt in range(retries):
-                try:
-                    return await func(*args, **kwargs)
-                except Exception as e:
-                    logger.warning(f"Attempt {attempt+1} failed for {func.__name__}: {e}")
-                    if attempt < retries - 1:
-                        await asyncio.sleep(current_delay)
-                        current_delay *= backoff
-                    else:
-                        logger.error(f"All retries failed for {func.__name__}")
-                        raise
-        return wrapper
-    return decorator
+    def __init__(self, retries=RETRY_COUNT, delay=RETRY_DELAY, factor=2):
+        self.retries = retries
+        self.delay = delay
+        self.factor = factor
+        self.resume_at = 0.0
+
+    async def wait(self):
+        pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def failed(self, attempt):
+        self.resume_at = max(self.resume_at, time.monotonic() + self.delay * self.factor ** attempt)
+
+# -------------------------
+# Background Event Loop
+# -------------------------
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _background_loop():
+    """A long-lived loop on a daemon thread; the caller's own event loop is never touched."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="data-loader-loop", daemon=True).start()
+    return _loop
+
+def _run(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
 
 # -------------------------
 # Data Fetching Functions
 # -------------------------
 
-def get_price_history_sync(symbol, period, interval):
-    """
-    Synchronous function to fetch price history using yfinance.
-    """
-    ticker = yf.Ticker(symbol)
-    hist = ticker.history(period=period, interval=interval)
-    if hist.empty or "Close" not in hist:
-        raise ValueError(f"No data available for {symbol}")
-    return hist
+def _record(symbol, latency, failed=False):
+    stats = metrics["symbols"].setdefault(symbol, {"calls": 0, "failures": 0, "latency": 0.0})
+    stats["calls"] += 1
+    stats["latency"] += latency
+    if failed:
+        stats["failures"] += 1
+        metrics["failed_calls"] += 1
 
-async def async_get_price_history_sync(symbol, period, interval):
+def download_bars_sync(symbols, interval, start=None, period=None):
     """
-    Asynchronous wrapper for the synchronous yfinance call.
-    Uses asyncio.to_thread (Python 3.9+) to run blocking code in a thread.
+    Synchronous batched download of OHLCV bars for several symbols using yfinance.
+    With `start`, only bars from that timestamp on are requested.
     """
-    start_time = time.time()
-    data = await asyncio.to_thread(get_price_history_sync, symbol, period, interval)
+    return yf.download(list(symbols), start=start, period=None if start is not None else period,
+                       interval=interval, group_by="ticker", auto_adjust=True, progress=False)
+
+def _bars_for(data, symbol):
+    if data is None or data.empty:
+        return data
+    if isinstance(data.columns, pd.MultiIndex):
+        if symbol not in data.columns.get_level_values(0):
+            return pd.DataFrame()
+        data = data[symbol]
+    return data.dropna(how="all")
+
+async def _refresh_batch(symbols, interval, start, backoff, slots):
+    """Download one batch with the shared backoff and store each symbol's bars; returns failed symbols."""
+    period = BOOTSTRAP_PERIODS.get(interval, DEFAULT_PERIOD)
+    async with slots:
+        for attempt in range(backoff.retries):
+            await backoff.wait()
+            start_time = time.time()
+            try:
+                data = await asyncio.to_thread(download_bars_sync, symbols, interval, start, period)
+                break
+            except Exception as e:
+                logger.warning(f"Attempt {attempt+1} failed for {', '.join(symbols)}: {e}")
+                backoff.failed(attempt)
+        else:
+            logger.error(f"All retries failed for {', '.join(symbols)}")
+            latency = (time.time() - start_time) / len(symbols)
+            for symbol in symbols:
+                _record(symbol, latency, failed=True)
+            return set(symbols)
     latency = time.time() - start_time
     metrics["api_calls"] += 1
     metrics["total_latency"] += latency
-    logger.info(f"Fetched data for {symbol} in {latency:.2f} seconds.")
-    return data
+    logger.info(f"Fetched {interval} bars for {len(symbols)} symbols in {latency:.2f} seconds.")
+
+    failed = set()
+    for symbol in symbols:
+        bars = _bars_for(data, symbol)
+        # An empty incremental fetch just means no new bars; an empty bootstrap is a failure.
+        missing = start is None and (bars is None or bars.empty or "Close" not in bars)
+        _record(symbol, latency / len(symbols), failed=missing)
+        if missing:
+            failed.add(symbol)
+            continue
+        added = price_store.append(symbol, interval, bars)
+        logger.info(f"Stored {added} new {interval} bars for {symbol}.")
+    return failed
 
-@retry_async(retries=RETRY_COUNT, delay=RETRY_DELAY)
-async def get_price_history_async(symbol, days=DEFAULT_DAYS, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL):
+async def refresh_price_store_many_async(symbols, interval=DEFAULT_INTERVAL, batch_size=BULK_BATCH_SIZE,
+                                         max_concurrency=BULK_MAX_CONCURRENCY):
     """
-    Asynchronous function to fetch and process the closing price history.
-    Applies retry logic and basic data validation.
+    Brings the local store up to date for every stale symbol. Symbols are
+    downloaded in batches of `batch_size`, at most `max_concurrency` batches in
+    flight, sharing one backoff. New symbols are bootstrapped together; the rest
+    fetch from the earliest last-stored timestamp in their batch on (the last bar
+    is refetched so a partial session bar gets completed). Returns the symbols
+    whose refresh failed.
     """
-    try:
-        hist = await async_get_price_history_sync(symbol, period, interval)
-    except Exception as e:
-        metrics["failed_calls"] += 1
-        logger.error(f"Failed to fetch data for {symbol}: {e}")
-        # (Optional: send an alert via Discord here)
-        raise
+    stale = [symbol for symbol in dict.fromkeys(symbols) if not price_store.is_fresh(symbol, interval)]
+    last = {symbol: price_store.last_timestamp(symbol, interval) for symbol in stale}
+    bootstrap = [symbol for symbol in stale if last[symbol] is None]
+    incremental = sorted((symbol for symbol in stale if last[symbol] is not None), key=last.get)
+
+    backoff = SharedBackoff()
+    slots = asyncio.Semaphore(max_concurrency)
+    batches = [(bootstrap[i:i + batch_size], None) for i in range(0, len(bootstrap), batch_size)]
+    batches += [(incremental[i:i + batch_size], last[incremental[i]])
+                for i in range(0, len(incremental), batch_size)]
+    results = await asyncio.gather(*(_refresh_batch(batch, interval, start, backoff, slots)
+                                     for batch, start in batches))
+    return set().union(*results)
+
+async def refresh_price_store_async(symbol, interval=DEFAULT_INTERVAL):
+    if symbol in await refresh_price_store_many_async([symbol], interval):
+        raise ValueError(f"No data available for {symbol}")
+
+def _bars_end(as_of, interval):
+    """
+    Last bar timestamp visible at `as_of`. Daily and longer bars are stamped at
+    the session start but carry that session's close, so they are visible only
+    from the next day on; intraday bars up to `as_of` are.
+    """
+    end = pd.Timestamp(as_of)
+    end = end.tz_localize(MARKET_TZ) if end.tz is None else end.tz_convert(MARKET_TZ)
+    if not interval.endswith(("m", "h")):
+        end = end.normalize() - pd.Timedelta(1, "ns")
+    return end
+
+async def load_bars_many_async(symbols, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, as_of=None, **bulk):
+    """
+    OHLCV bars for `period` per symbol, served from the local store after one
+    bulk incremental refresh. If a refresh fails but bars are already stored, the
+    stale data is returned; symbols with no data at all are left out. With
+    `as_of`, the period ends at that time instead of now (for replays), and a
+    daily bar is left out until its session is over.
+    """
+    failed = await refresh_price_store_many_async(symbols, interval, **bulk)
+    end = _bars_end(as_of, interval) if as_of is not None else None
+    start = period_start(period, end)
+    bars = {}
+    for symbol in symbols:
+        if symbol in failed:
+            if price_store.last_timestamp(symbol, interval) is None:
+                logger.error(f"Failed to fetch data for {symbol}")
+                continue
+            logger.warning(f"Using stored {interval} bars for {symbol}; refresh failed.")
+        bars[symbol] = price_store.read(symbol, interval, start=start, end=end)
+    return bars
+
+async def load_bars_async(symbol, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, as_of=None):
+    bars = await load_bars_many_async([symbol], period, interval, as_of)
+    if symbol not in bars:
+        raise ValueError(f"No data available for {symbol}")
+    return bars[symbol]
+
+def _closing_prices(symbol, hist, days):
+    if hist.empty:
+        raise ValueError(f"No data available for {symbol}")
 
     if len(hist) < days:
         logger.warning(f"Not enough data for {symbol}: requested {days} days, got {len(hist)} days")
@@ -113,23 +242,49 @@ async def get_price_history_async(symbol, days=DEFAULT_DAYS, period=DEFAULT_PERI
     logger.info(f"Retrieved {len(prices)} closing prices for {symbol}.")
     return np.array(prices)
 
+async def get_price_history_async(symbol, days=DEFAULT_DAYS, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL,
+                                  as_of=None):
+    """
+    Asynchronous function to fetch and process the closing price history.
+    Bars come from the local price store; applies basic data validation.
+    """
+    hist = await load_bars_async(symbol, period, interval, as_of)
+    return _closing_prices(symbol, hist, days)
+
+async def get_price_history_many_async(symbols, days=DEFAULT_DAYS, period=DEFAULT_PERIOD,
+                                       interval=DEFAULT_INTERVAL, **bulk):
+    """Closing prices for many symbols from one bulk refresh; symbols that fail validation are left out."""
+    bars = await load_bars_many_async(symbols, period, interval, **bulk)
+    prices = {}
+    for symbol, hist in bars.items():
+        try:
+            prices[symbol] = _closing_prices(symbol, hist, days)
+        except ValueError as e:
+            logger.error(f"Skipping {symbol}: {e}")
+    return prices
+
 # -------------------------
-# Synchronous API (with caching)
+# Synchronous API
 # -------------------------
 
-@lru_cache(maxsize=10)
-def get_price_history(symbol, days=DEFAULT_DAYS, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL):
+def get_price_history(symbol, days=DEFAULT_DAYS, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, as_of=None):
     """
-    Synchronous wrapper that uses an event loop to call the async function.
-    Caches results for efficiency.
+    Synchronous wrapper that runs the async function on the loader's background loop.
+    Repeat calls are served from the memory-mapped local store.
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(get_price_history_async(symbol, days, period, interval))
-    finally:
-        loop.close()
-    return result
+    return _run(get_price_history_async(symbol, days, period, interval, as_of))
+
+def get_price_history_many(symbols, days=DEFAULT_DAYS, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, **bulk):
+    return _run(get_price_history_many_async(symbols, days, period, interval, **bulk))
+
+def load_bars(symbol, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, as_of=None):
+    return _run(load_bars_async(symbol, period, interval, as_of))
+
+def load_bars_many(symbols, period=DEFAULT_PERIOD, interval=DEFAULT_INTERVAL, **bulk):
+    return _run(load_bars_many_async(symbols, period, interval, **bulk))
+
+def refresh_price_store_many(symbols, interval=DEFAULT_INTERVAL, **bulk):
+    return _run(refresh_price_store_many_async(symbols, interval, **bulk))
 
 # -------------------------
 # Performance Metrics & Test Code
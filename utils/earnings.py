@@ -1,17 +1,125 @@
+import json
+import os
+import threading
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from config import EARNINGS_CACHE_PATH, EARNINGS_TTL_HOURS
 
-def is_near_earnings(symbol, window=7):
+
+class EarningsCalendar:
+    """
+    Per-symbol index of earnings dates (past and upcoming), persisted to JSON.
+
+    Each symbol is refetched from yfinance at most once per `ttl_hours`; fetched
+    dates are merged into what is already stored, so the history used for
+    backtests keeps growing even though yfinance only returns recent quarters.
+    Dates are held as a sorted datetime64[D] array and every lookup is a binary
+    search, so checking a whole column of dates is a single vectorized call.
+    Lookups, refreshes and saves hold one lock, since strategy workers for
+    several symbols query the shared calendar from their own threads.
+    """
+
+    def __init__(self, path=EARNINGS_CACHE_PATH, ttl_hours=EARNINGS_TTL_HOURS):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.entries = {}
+        self._index = {}
+        self._attempted = {}
+        self._lock = threading.RLock()
+        self.load()
+
+    def dates(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self.entries.get(symbol)
+            if entry is None or datetime.now() - datetime.fromisoformat(entry["fetched"]) > self.ttl:
+                self.refresh(symbol)
+            if symbol not in self._index:
+                stored = self.entries.get(symbol, {}).get("dates", [])
+                self._index[symbol] = np.array(sorted(stored), dtype="datetime64[D]")
+            return self._index[symbol]
+
+    def refresh(self, symbol):
+        with self._lock:
+            last_try = self._attempted.get(symbol)
+            if last_try is not None and datetime.now() - last_try < self.ttl:
+                return  # failed earlier today; keep serving what is stored
+            self._attempted[symbol] = datetime.now()
+            try:
+                fetched = _fetch_earnings_dates(symbol)
+            except Exception as e:
+                print(f"[EARNINGS CHECK ERROR] {e}")
+                return
+            stored = set(self.entries.get(symbol, {}).get("dates", []))
+            self.entries[symbol] = {"fetched": datetime.now().isoformat(), "dates": sorted(stored | fetched)}
+            self._index.pop(symbol, None)
+            self.save()
+
+    def near_mask(self, symbol, dates, window=7):
+        """Boolean array: is each date within `window` days of an earnings date."""
+        earnings = self.dates(symbol)
+        days = pd.to_datetime(np.asarray(dates)).values.astype("datetime64[D]")
+        if earnings.size == 0:
+            return np.zeros(days.shape, dtype=bool)
+        idx = np.searchsorted(earnings, days - np.timedelta64(window, "D"), side="left")
+        nearest = earnings[np.minimum(idx, earnings.size - 1)]
+        return (idx < earnings.size) & (nearest <= days + np.timedelta64(window, "D"))
+
+    def is_near(self, symbol, date=None, window=7):
+        return bool(self.near_mask(symbol, [date or datetime.now()], window)[0])
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[EARNINGS CHECK ERROR] Could not read {self.path}: {e}")
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+
+def _fetch_earnings_dates(symbol):
+    ticker = yf.Ticker(symbol)
+    dates = set()
     try:
-        ticker = yf.Ticker(symbol)
-        earnings_calendar = ticker.calendar
-        if "Earnings Date" in earnings_calendar.index:
-            earnings_date = earnings_calendar.loc["Earnings Date"].values[0]
-            if isinstance(earnings_date, pd.Timestamp):
-                days_until = (earnings_date - datetime.now()).days
-                if abs(days_until) <= window:
-                    return True
+        history = ticker.get_earnings_dates(limit=40)
+        if history is not None:
+            dates.update(ts.strftime("%Y-%m-%d") for ts in history.index)
     except Exception as e:
-        print(f"[EARNINGS CHECK ERROR] {e}")
-    return False
\ No newline at end of file
+        print(f"[EARNINGS CHECK ERROR] {symbol} earnings history: {e}")
+    calendar = ticker.calendar
+    upcoming = []
+    if isinstance(calendar, dict):
+        upcoming = calendar.get("Earnings Date", [])
+    elif calendar is not None and "Earnings Date" in calendar.index:
+        upcoming = calendar.loc["Earnings Date"].values
+    dates.update(pd.Timestamp(d).strftime("%Y-%m-%d") for d in upcoming)
+    return dates
+
+
+CALENDAR_PATH = EARNINGS_CACHE_PATH  # replays point this at their own copy
+
+_calendars = {}
+_calendar_lock = threading.Lock()
+
+def get_calendar():
+    with _calendar_lock:
+        if CALENDAR_PATH not in _calendars:
+            _calendars[CALENDAR_PATH] = EarningsCalendar(CALENDAR_PATH)
+        return _calendars[CALENDAR_PATH]
+
+def is_near_earnings(symbol, window=7, date=None):
+    return get_calendar().is_near(symbol, date, window)
+
+def near_earnings_mask(symbol, dates, window=7):
+    return get_calendar().near_mask(symbol, dates, window)
@@ -3,21 +3,15 @@ load_env()
 
 
 import smtplib
-import pandas as pd
 import os
 from email.mime.text import MIMEText
 from utils.discord_alerts import send_discord_alert
+from utils.trade_store import get_trade_store
 from datetime import datetime
 
 def send_daily_email_summary():
-    log_path = "logs/trade_history.csv"
-    if not os.path.exists(log_path):
-        print("No trade log to email.")
-        return
-
-    df = pd.read_csv(log_path)
     today = datetime.now().strftime("%Y-%m-%d")
-    df_today = df[df["Date"] == today]
+    df_today = get_trade_store().on(today)
 
     if df_today.empty:
         print("No trades today to email.")
@@ -3,17 +3,26 @@
 fetch_real_options_data.py
 
 A deployment-ready script to fetch real options chain data from Yahoo Finance.
-It processes the data to create a CSV file with key option trade features that support
-ML model training and backtesting in our institutional-grade trade bot.
-Note: The synthetic fields (delta, yield, etc.) are placeholders and should be refined
-for production use with proper financial models.
+collect_snapshots pulls every expiration inside a DTE window for a watchlist and
+appends the day's snapshot to the partitioned options store (utils/options_store.py),
+so history accumulates run over run; fetch_options_data still exports a single
+expiration to CSV.
+IV and greeks (delta/gamma/theta/vega) are computed with the vectorized Black-Scholes
+engine in utils/greeks.py; the remaining synthetic fields (yield, RSI, etc.) are placeholders.
 """
 
 import os
+import sys
 import logging
 import yfinance as yf
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from config import RISK_FREE_RATE, COLLECT_MIN_DTE, COLLECT_MAX_DTE, COLLECT_WORKERS
+from utils.greeks import add_greeks
+from utils.earnings import is_near_earnings
+from utils.iv_history import get_iv_history
+from utils.options_store import OptionsStore
 
 # Setup robust logging
 logger = logging.getLogger("RealOptionsDataCollector")
@@ -23,19 +32,79 @@ formatter = logging.Formatter('%(asctime)s [%(levelname)s]: %(message)s')
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-def fetch_options_data(ticker_symbol="NVDA", expiration_date=None, output_csv="data/real_options_data.csv"):
+def collect_snapshots(symbols, min_dte=COLLECT_MIN_DTE, max_dte=COLLECT_MAX_DTE, max_workers=COLLECT_WORKERS,
+                      store=None):
     """
-    Fetches options chain data for the specified ticker from Yahoo Finance.
-    
+    Appends today's snapshot of every expiration with min_dte <= DTE <= max_dte
+    for each symbol to the options store.
+
+    Expiration lists and then the individual chains are downloaded on one shared
+    thread pool, so at most `max_workers` requests are in flight across the whole
+    watchlist. Rows already stored for the same contract and snapshot date are
+    skipped, which makes re-running on the same day a no-op.
+
+    Returns:
+        dict: rows added per symbol.
+    """
+    symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+    store = store or OptionsStore()
+    today = datetime.now()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        listings = dict(zip(symbols, pool.map(lambda sym: _list_expirations(sym, min_dte, max_dte, today), symbols)))
+        tasks = [(sym, ticker, expiry) for sym, (ticker, expiries, _) in listings.items() for expiry in expiries]
+        chains = list(pool.map(lambda task: _download_chain(*task), tasks))
+
+    added = {}
+    for sym in symbols:
+        frames = [df for (task_sym, _, _), df in zip(tasks, chains) if task_sym == sym and df is not None]
+        spot = listings[sym][2]
+        if not frames or spot is None:
+            logger.warning(f"No option chains collected for {sym}.")
+            added[sym] = 0
+            continue
+        try:
+            options_df = _enrich(sym, pd.concat(frames, ignore_index=True), spot, today)
+            added[sym] = store.append(options_df)
+            logger.info(f"{sym}: {len(frames)} expirations, {len(options_df)} contracts, {added[sym]} new rows stored")
+        except Exception as e:
+            logger.error(f"Error storing options data for {sym}: {e}")
+            added[sym] = 0
+    return added
+
+def fetch_options_data(ticker_symbol="NVDA", expiration_date=None, output_csv="data/real_options_data.csv",
+                       max_workers=8):
+    """
+    Fetches options chain data for the specified ticker(s) from Yahoo Finance.
+
     Args:
-        ticker_symbol (str): Stock ticker symbol.
+        ticker_symbol (str or list): Stock ticker symbol, or a watchlist of symbols
+            whose chains are fetched concurrently and written to one CSV.
         expiration_date (str): Expiration date in "YYYY-MM-DD" format.
             If None, uses the first available expiration date.
         output_csv (str): Path where the CSV file will be saved.
-    
+        max_workers (int): Concurrent downloads when a watchlist is given.
+
     Returns:
         str: Path to the saved CSV file, or None if an error occurred.
     """
+    symbols = [ticker_symbol] if isinstance(ticker_symbol, str) else list(ticker_symbol)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+        frames = [df for df in pool.map(lambda sym: _fetch_symbol_chain(sym, expiration_date), symbols)
+                  if df is not None]
+    if not frames:
+        return None
+    try:
+        options_df = pd.concat(frames, ignore_index=True)
+        # Ensure the output directory exists
+        os.makedirs(os.path.dirname(output_csv), exist_ok=True)
+        options_df.to_csv(output_csv, index=False)
+        logger.info(f"Real options data for {', '.join(symbols)} saved to {output_csv}")
+        return output_csv
+    except Exception as e:
+        logger.error(f"Error saving options data to {output_csv}: {e}")
+        return None
+
+def _fetch_symbol_chain(ticker_symbol, expiration_date=None):
     try:
         logger.info(f"Fetching options data for {ticker_symbol}...")
         ticker = yf.Ticker(ticker_symbol)
@@ -43,62 +112,98 @@ def fetch_options_data(ticker_symbol="NVDA", expiration_date=None, output_csv="d
         if not expirations:
             logger.error(f"No options expiration dates found for {ticker_symbol}.")
             return None
-        
+
         if expiration_date is None:
             expiration_date = expirations[0]  # Use first available expiration
             logger.info(f"No expiration date provided. Using: {expiration_date}")
         elif expiration_date not in expirations:
             logger.error(f"Provided expiration date {expiration_date} not available. Options available: {expirations}")
             return None
-        
-        option_chain = ticker.option_chain(expiration_date)
-        calls_df = option_chain.calls
-        puts_df = option_chain.puts
-        
-        # Add OptionType column
-        calls_df["OptionType"] = "CALL"
-        puts_df["OptionType"] = "PUT"
-        
-        # Combine calls and puts into one DataFrame
-        options_df = pd.concat([calls_df, puts_df], ignore_index=True)
-        
-        # Rename 'lastPrice' to 'price' for consistency with our trade bot
-        options_df.rename(columns={"lastPrice": "price"}, inplace=True)
-        
-        # Add a 'Date' column with today's date for backtesting reference
-        options_df["Date"] = datetime.now().strftime("%Y-%m-%d")
-        
-        # ---- Synthetic Feature Engineering (placeholders) ----
-        num_rows = options_df.shape[0]
-        # In production, replace these with real calculations:
-        options_df["delta"] = 0.3  # Placeholder: in practice, calculate from option greeks
-        options_df["yield_to_strike"] = options_df["price"] / options_df["strike"] * 0.05  # Synthetic yield
-        options_df["Premium"] = options_df["price"]  # Using price as premium for simplicity
-        options_df["ROC"] = options_df["Premium"] / options_df["strike"]
-        options_df["RSI"] = 50  # Neutral RSI placeholder
-        options_df["Momentum"] = 0.0  # Placeholder momentum
-        options_df["IV_percentile"] = options_df["impliedVolatility"].fillna(0.5)  # Use impliedVolatility as proxy
-        options_df["NearEarnings"] = 0  # Placeholder; replace with real earnings check if available
-        
-        # For labeling, a simple heuristic: label = 1 if price is within 95% of strike (indicating an attractive premium)
-        options_df["label"] = (options_df["price"] > options_df["strike"] * 0.95).astype(int)
-        # ---------------------------------------------------------
-        
-        # Ensure the output directory exists
-        os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-        options_df.to_csv(output_csv, index=False)
-        logger.info(f"Real options data saved to {output_csv}")
-        return output_csv
+
+        options_df = _download_chain(ticker_symbol, ticker, expiration_date)
+        if options_df is None:
+            return None
+        spot = ticker.history(period="5d")["Close"].iloc[-1]
+        return _enrich(ticker_symbol, options_df, spot, datetime.now())
     except Exception as e:
         logger.error(f"Error fetching options data for {ticker_symbol}: {e}")
         return None
 
+def _list_expirations(ticker_symbol, min_dte, max_dte, today):
+    """(ticker, expirations inside the DTE window, last close) for one symbol."""
+    try:
+        ticker = yf.Ticker(ticker_symbol)
+        expirations = [exp for exp in ticker.options
+                       if min_dte <= (datetime.strptime(exp, "%Y-%m-%d") - today).days + 1 <= max_dte]
+        if not expirations:
+            logger.error(f"No expirations for {ticker_symbol} between {min_dte} and {max_dte} DTE.")
+            return ticker, [], None
+        return ticker, expirations, ticker.history(period="5d")["Close"].iloc[-1]
+    except Exception as e:
+        logger.error(f"Error listing expirations for {ticker_symbol}: {e}")
+        return None, [], None
+
+def _download_chain(ticker_symbol, ticker, expiration_date):
+    try:
+        option_chain = ticker.option_chain(expiration_date)
+    except Exception as e:
+        logger.error(f"Error fetching {ticker_symbol} {expiration_date} chain: {e}")
+        return None
+    calls_df = option_chain.calls
+    puts_df = option_chain.puts
+
+    # Add OptionType column
+    calls_df["OptionType"] = "CALL"
+    puts_df["OptionType"] = "PUT"
+
+    # Combine calls and puts into one DataFrame
+    options_df = pd.concat([calls_df, puts_df], ignore_index=True)
+    options_df["symbol"] = ticker_symbol
+    options_df["expiry"] = expiration_date.replace("-", "")
+    return options_df
+
+def _enrich(ticker_symbol, options_df, spot, today):
+    """Snapshot date, greeks and the synthetic features for one symbol's chains, in one vectorized pass."""
+    # Rename 'lastPrice' to 'price' for consistency with our trade bot
+    options_df.rename(columns={"lastPrice": "price"}, inplace=True)
+
+    # Add a 'Date' column with today's date for backtesting reference
+    options_df["Date"] = today.strftime("%Y-%m-%d")
+    options_df["dte"] = (pd.to_datetime(options_df["expiry"], format="%Y%m%d") - today).dt.days + 1
+    options_df["underlying_price"] = spot
+
+    # IV solved from the bid/ask mid (last price when there is no two-sided quote), then greeks
+    has_quote = (options_df["bid"] > 0) & (options_df["ask"] > 0)
+    options_df["mid"] = ((options_df["bid"] + options_df["ask"]) / 2).where(has_quote, options_df["price"])
+    add_greeks(options_df, spot_col="underlying_price", strike_col="strike", dte_col="dte",
+               price_col="mid", type_col="OptionType", rate=RISK_FREE_RATE)
+    iv_history = get_iv_history(ticker_symbol)
+    iv_history.record_chain(today, options_df["strike"], options_df["dte"], options_df["iv"], spot)
+    iv_history.save()
+
+    # ---- Synthetic Feature Engineering (placeholders) ----
+    # In production, replace these with real calculations:
+    options_df["yield_to_strike"] = options_df["price"] / options_df["strike"] * 0.05  # Synthetic yield
+    options_df["Premium"] = options_df["price"]  # Using price as premium for simplicity
+    options_df["ROC"] = options_df["Premium"] / options_df["strike"]
+    options_df["RSI"] = 50  # Neutral RSI placeholder
+    options_df["Momentum"] = 0.0  # Placeholder momentum
+    iv_percentile = iv_history.iv_percentile(today)
+    options_df["IV_percentile"] = 0.5 if iv_percentile is None else iv_percentile
+    options_df["NearEarnings"] = int(is_near_earnings(ticker_symbol))
+
+    # For labeling, a simple heuristic: label = 1 if price is within 95% of strike (indicating an attractive premium)
+    options_df["label"] = (options_df["price"] > options_df["strike"] * 0.95).astype(int)
+    # ---------------------------------------------------------
+    return options_df
+
 def main():
-    csv_path = fetch_options_data(ticker_symbol="NVDA", expiration_date=None, output_csv="data/real_options_data.csv")
-    if csv_path:
-        print(f"Data saved to {csv_path}")
+    symbols = sys.argv[1:] or [s for s in os.getenv("TRADE_WATCHLIST", "").split(",") if s] or ["NVDA"]
+    added = collect_snapshots(symbols)
+    if any(added.values()):
+        print(f"Stored {sum(added.values())} new option rows: {added}")
     else:
-        print("Data fetching failed.")
+        print("No new option rows collected.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+# utils/greeks.py
+"""
+Vectorized Black-Scholes pricing, greeks and implied volatility.
+
+Every function takes scalars or NumPy arrays (broadcast against each other) and
+does all of its work in array operations, so a full option chain or a multi-year
+history is priced in a single call. `is_call` is a boolean array or scalar;
+time to expiry `t` is in years. Rows that cannot be priced (expired, zero or
+negative inputs, prices outside no-arbitrage bounds) come back as NaN.
+"""
+import numpy as np
+from scipy.special import ndtr
+
+DAYS_PER_YEAR = 365.0
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+
+
+def _d1_d2(spot, strike, t, vol, rate, div):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_t = np.sqrt(t)
+        d1 = (np.log(spot / strike) + (rate - div + 0.5 * vol ** 2) * t) / (vol * sqrt_t)
+    return d1, d1 - vol * sqrt_t, sqrt_t
+
+
+def _npdf(x):
+    return np.exp(-0.5 * x ** 2) / np.sqrt(2 * np.pi)
+
+
+def bs_price(spot, strike, t, vol, is_call, rate=0.0, div=0.0):
+    spot, strike, t, vol, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float), np.asarray(strike, dtype=float), np.asarray(t, dtype=float),
+        np.asarray(vol, dtype=float), np.asarray(is_call, dtype=bool))
+    d1, d2, _ = _d1_d2(spot, strike, t, vol, rate, div)
+    disc_s = spot * np.exp(-div * t)
+    disc_k = strike * np.exp(-rate * t)
+    call = disc_s * ndtr(d1) - disc_k * ndtr(d2)
+    put = disc_k * ndtr(-d2) - disc_s * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_greeks(spot, strike, t, vol, is_call, rate=0.0, div=0.0):
+    """
+    Returns a dict of arrays: delta, gamma, theta (per calendar day) and
+    vega (per one volatility point, i.e. 0.01).
+    """
+    spot, strike, t, vol, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float), np.asarray(strike, dtype=float), np.asarray(t, dtype=float),
+        np.asarray(vol, dtype=float), np.asarray(is_call, dtype=bool))
+    d1, d2, sqrt_t = _d1_d2(spot, strike, t, vol, rate, div)
+    q_disc = np.exp(-div * t)
+    r_disc = np.exp(-rate * t)
+    pdf_d1 = _npdf(d1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = q_disc * pdf_d1 / (spot * vol * sqrt_t)
+        decay = -spot * q_disc * pdf_d1 * vol / (2 * sqrt_t)
+    delta = np.where(is_call, q_disc * ndtr(d1), -q_disc * ndtr(-d1))
+    theta_call = decay - rate * strike * r_disc * ndtr(d2) + div * spot * q_disc * ndtr(d1)
+    theta_put = decay + rate * strike * r_disc * ndtr(-d2) - div * spot * q_disc * ndtr(-d1)
+    return {
+        "delta": delta,
+        "gamma": gamma,
+        "theta": np.where(is_call, theta_call, theta_put) / DAYS_PER_YEAR,
+        "vega": spot * q_disc * pdf_d1 * sqrt_t / 100.0,
+    }
+
+
+def _price_and_vega(spot, strike, t, vol, is_call, rate, div):
+    d1, d2, sqrt_t = _d1_d2(spot, strike, t, vol, rate, div)
+    disc_s = spot * np.exp(-div * t)
+    disc_k = strike * np.exp(-rate * t)
+    call = disc_s * ndtr(d1) - disc_k * ndtr(d2)
+    price = np.where(is_call, call, call - disc_s + disc_k)  # put via put-call parity
+    return price, disc_s * _npdf(d1) * sqrt_t
+
+
+def implied_volatility(price, spot, strike, t, is_call, rate=0.0, div=0.0,
+                       tol=1e-6, max_iter=50, lower=IV_LOWER, upper=IV_UPPER):
+    """
+    Batched implied volatility by safeguarded Newton iteration.
+
+    Each row keeps a [lo, hi] bracket that is tightened on every step; whenever a
+    Newton step would leave the bracket (or vega is too small to trust) the row
+    falls back to bisection, so convergence is guaranteed within [lower, upper].
+    Prices outside the no-arbitrage range for that bracket return NaN.
+    """
+    price, spot, strike, t, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float), np.asarray(strike, dtype=float),
+        np.asarray(t, dtype=float), np.asarray(is_call, dtype=bool))
+    shape = price.shape
+    price, spot, strike, t, is_call = (a.ravel() for a in (price, spot, strike, t, is_call))
+
+    iv = np.full(price.shape, np.nan)
+    valid = (price > 0) & (spot > 0) & (strike > 0) & (t > 0)
+    valid &= np.isfinite(price) & np.isfinite(spot) & np.isfinite(strike) & np.isfinite(t)
+    idx = np.flatnonzero(valid)
+    if idx.size == 0:
+        return iv.reshape(shape)
+
+    p, s, k, tt, c = price[idx], spot[idx], strike[idx], t[idx], is_call[idx]
+    lo = np.full(idx.size, lower)
+    hi = np.full(idx.size, upper)
+    inside = (bs_price(s, k, tt, lo, c, rate, div) <= p) & (p <= bs_price(s, k, tt, hi, c, rate, div))
+
+    # Brenner-Subrahmanyam starting point, clipped into the bracket.
+    sigma = np.clip(np.sqrt(2 * np.pi / tt) * p / s, 0.05, 2.0)
+    a = np.flatnonzero(inside)
+    for _ in range(max_iter):
+        if a.size == 0:
+            break
+        model, vega = _price_and_vega(s[a], k[a], tt[a], sigma[a], c[a], rate, div)
+        diff = model - p[a]
+        over = diff > 0
+        hi[a] = np.where(over, sigma[a], hi[a])
+        lo[a] = np.where(over, lo[a], sigma[a])
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = sigma[a] - diff / vega
+        use_bisect = ~np.isfinite(step) | (step <= lo[a]) | (step >= hi[a])
+        converged = np.abs(diff) < tol
+        sigma[a] = np.where(converged, sigma[a], np.where(use_bisect, 0.5 * (lo[a] + hi[a]), step))
+        a = a[~converged & ((hi[a] - lo[a]) > tol)]
+
+    iv[idx] = np.where(inside, sigma, np.nan)
+    return iv.reshape(shape)
+
+
+def add_greeks(df, spot_col="underlying_price", strike_col="strike", dte_col="dte", price_col="price",
+               type_col="OptionType", iv_col=None, rate=0.0, div=0.0):
+    """
+    Adds iv/delta/gamma/theta/vega columns to an option DataFrame in one vectorized pass.
+    If `iv_col` is given, those volatilities are used where valid and only the
+    remaining rows are solved for from `price_col`.
+    """
+    spot = df[spot_col].to_numpy(dtype=float)
+    strike = df[strike_col].to_numpy(dtype=float)
+    t = df[dte_col].to_numpy(dtype=float) / DAYS_PER_YEAR
+    is_call = df[type_col].astype(str).str.upper().str.startswith("C").to_numpy()
+    iv = np.full(len(df), np.nan)
+    if iv_col is not None and iv_col in df.columns:
+        iv = df[iv_col].to_numpy(dtype=float).copy()
+        iv[(iv <= 0) | (iv > IV_UPPER)] = np.nan
+    missing = ~np.isfinite(iv)
+    if missing.any():
+        iv[missing] = implied_volatility(df[price_col].to_numpy(dtype=float)[missing], spot[missing],
+                                         strike[missing], t[missing], is_call[missing], rate, div)
+    greeks = bs_greeks(spot, strike, t, iv, is_call, rate, div)
+    df["iv"] = iv
+    for name, values in greeks.items():
+        df[name] = values
+    return df
@@ -1,11 +1,30 @@
+import asyncio
+import logging
+import numpy as np
 from ib_insync import IB, Stock, Option, LimitOrder
 from datetime import datetime
 from typing import List
+from config import (SNAPSHOT_TIMEOUT, MAX_MKT_DATA_LINES, MIN_DTE, MAX_DTE, MAX_EXPIRIES,
+                    MONEYNESS_ITM, MONEYNESS_OTM, CONTRACT_CACHE_PATH, CHAIN_PARAMS_TTL_HOURS, RISK_FREE_RATE)
+from utils.contract_cache import ContractCache
+from utils.market_data import MarketDataSubscriptions, valid_price
+from utils.greeks import bs_greeks, implied_volatility, DAYS_PER_YEAR
+from utils.option_chain import days_to_expiry, select_expiries, select_strikes
+from utils.iv_history import get_iv_history
+
+logger = logging.getLogger(__name__)
+
 
 class IBKRClient:
     def __init__(self):
         self.ib = IB()
         self.ib.connect('127.0.0.1', 7497, clientId=1)
+        self.contracts = ContractCache(CONTRACT_CACHE_PATH, CHAIN_PARAMS_TTL_HOURS)
+        self.market_data = MarketDataSubscriptions(self.ib, MAX_MKT_DATA_LINES)
+
+    def now(self) -> datetime:
+        """Current time as strategies should see it; the simulated broker returns its replay clock."""
+        return datetime.now()
 
     def has_underlying(self, symbol: str) -> bool:
         positions = self.ib.positions()
@@ -15,9 +34,14 @@ class IBKRClient:
         return False
 
     def buy_underlying(self, symbol: str, quantity: int = 100):
+        return self.ib.run(self.buy_underlying_async(symbol, quantity))
+
+    async def buy_underlying_async(self, symbol: str, quantity: int = 100):
         contract = Stock(symbol, "SMART", "USD")
-        self.ib.qualifyContracts(contract)
-        order = LimitOrder("BUY", quantity, self.ib.reqMktData(contract).ask)
+        await self.qualify_async(contract)
+        async with self.market_data.lease([contract], SNAPSHOT_TIMEOUT) as (ticker,):
+            await self.market_data.wait_for_quotes([ticker], SNAPSHOT_TIMEOUT)
+        order = LimitOrder("BUY", quantity, ticker.ask)
         self.ib.placeOrder(contract, order)
 
     def get_open_calls(self, symbol: str):
@@ -27,59 +51,187 @@ class IBKRClient:
                 return pos.contract
         return None
 
+    def qualify(self, *contracts) -> List:
+        return self.ib.run(self.qualify_async(*contracts))
+
+    async def qualify_async(self, *contracts) -> List:
+        """
+        qualifyContracts through the contract cache: cached definitions are filled in
+        locally and only the misses go to IB, in a single bulk request.
+        """
+        misses = [c for c in contracts if not self.contracts.fill(c)]
+        if misses:
+            for contract in await self.ib.qualifyContractsAsync(*misses):
+                self.contracts.put_contract(contract)
+            self.contracts.save()
+        return [c for c in contracts if c.conId]
+
+    def option_contract(self, symbol: str, expiry: str, strike: float, right: str):
+        return self.ib.run(self.option_contract_async(symbol, expiry, strike, right))
+
+    async def option_contract_async(self, symbol: str, expiry: str, strike: float, right: str):
+        contract = Option(symbol, expiry.replace("-", ""), strike, right, "SMART")
+        await self.qualify_async(contract)
+        return contract
+
+    async def _chain_params_async(self, stock) -> dict:
+        chain = self.contracts.get_chain(stock.symbol)
+        if chain is None:
+            chains = await self.ib.reqSecDefOptParamsAsync(stock.symbol, "", "STK", stock.conId)
+            params = next(c for c in chains if c.tradingClass == stock.symbol and c.exchange == "SMART")
+            self.contracts.put_chain(stock.symbol, params.expirations, params.strikes, params.tradingClass)
+            self.contracts.save()
+            chain = self.contracts.get_chain(stock.symbol)
+        return chain
+
     def get_put_chain(self, symbol: str) -> List:
-        contract = Stock(symbol, "SMART", "USD")
-        chains = self.ib.reqSecDefOptParams(symbol, "", "STK", contract.conId)
-        chain = next(c for c in chains if c.tradingClass == symbol and c.exchange == "SMART")
-        expiries = sorted(chain.expirations)[:1]  # nearest expiry
-        strikes = sorted(chain.strikes)
-        return self._build_options(symbol, expiries, strikes, "P")
+        return self.ib.run(self.get_put_chain_async(symbol))
 
     def get_option_chain(self, symbol: str) -> List:
-        contract = Stock(symbol, "SMART", "USD")
-        chains = self.ib.reqSecDefOptParams(symbol, "", "STK", contract.conId)
-        chain = next(c for c in chains if c.tradingClass == symbol and c.exchange == "SMART")
-        expiries = sorted(chain.expirations)[:1]
-        strikes = sorted(chain.strikes)
-        return self._build_options(symbol, expiries, strikes, "C")
-
-    def _build_options(self, symbol: str, expiries: List[str], strikes: List[float], right: str) -> List:
-        options = []
-        for expiry in expiries:
-            for strike in strikes:
-                opt = Option(symbol, expiry, strike, right, "SMART")
-                self.ib.qualifyContracts(opt)
-                ticker = self.ib.reqMktData(opt)
-                self.ib.sleep(1)
-                bid = ticker.bid or 0
-                ask = ticker.ask or 0
-                last = ticker.last or 0
-                mark = (bid + ask) / 2 if bid and ask else last
-                days = (datetime.strptime(expiry, "%Y%m%d") - datetime.now()).days
-                yield_ = mark / (strike * 100) if strike else 0
-                options.append(type('OptionData', (object,), {
-                    'strike': strike,
-                    'expiry': expiry,
-                    'delta': getattr(ticker.modelGreeks, 'delta', 0),
-                    'yield_': yield_,
-                    'bid': bid,
-                    'ask': ask,
-                    'last': last,
-                    'days_to_expiry': days
-                }))
+        return self.ib.run(self.get_option_chain_async(symbol))
+
+    async def get_put_chain_async(self, symbol: str) -> List:
+        return await self._get_chain_async(symbol, "P")
+
+    async def get_option_chain_async(self, symbol: str) -> List:
+        return await self._get_chain_async(symbol, "C")
+
+    async def _get_chain_async(self, symbol: str, right: str) -> List:
+        """
+        Prune the chain to the DTE window and moneyness band before requesting any
+        quotes, so only strikes DELTA_TARGET/MIN_YIELD could plausibly accept are priced.
+        """
+        stock = Stock(symbol, "SMART", "USD")
+        await self.qualify_async(stock)
+        chain = await self._chain_params_async(stock)
+        spot = await self._underlying_price_async(stock)
+        if spot is None:
+            logger.warning(f"No underlying price for {symbol}; quoting every strike in the window.")
+        expiries = select_expiries(chain["expirations"], MIN_DTE, MAX_DTE, MAX_EXPIRIES)
+        strikes = select_strikes(chain["strikes"], spot, right, MONEYNESS_ITM, MONEYNESS_OTM)
+        logger.info(f"[CHAIN] {symbol} {right}: {len(expiries)} expiries x {len(strikes)} strikes "
+                    f"(of {len(chain['expirations'])} x {len(chain['strikes'])}) around spot {spot}")
+        options = await self._build_options_async(symbol, expiries, strikes, right, spot=spot)
+        self._record_atm_iv(symbol, options, spot)
         return options
 
+    def _record_atm_iv(self, symbol: str, options: List, spot):
+        history = get_iv_history(symbol)
+        history.record_chain(self.now(), [opt.strike for opt in options],
+                             [opt.days_to_expiry for opt in options],
+                             [opt.iv if opt.iv is not None else np.nan for opt in options], spot)
+        history.save()
+
+    async def _underlying_price_async(self, stock, timeout: float = SNAPSHOT_TIMEOUT):
+        async with self.market_data.lease([stock], timeout) as (ticker,):
+            await self.market_data.wait_for_quotes([ticker], timeout)
+        if valid_price(ticker.bid) and valid_price(ticker.ask):
+            return (ticker.bid + ticker.ask) / 2
+        for price in (ticker.last, ticker.close):
+            if valid_price(price):
+                return price
+        return None
+
+    def _build_options(self, symbol: str, expiries: List[str], strikes: List[float], right: str,
+                       timeout: float = SNAPSHOT_TIMEOUT, max_lines: int = MAX_MKT_DATA_LINES, spot=None) -> List:
+        return self.ib.run(self._build_options_async(symbol, expiries, strikes, right, timeout, max_lines, spot))
+
+    async def _build_options_async(self, symbol: str, expiries: List[str], strikes: List[float], right: str,
+                                   timeout: float = SNAPSHOT_TIMEOUT, max_lines: int = MAX_MKT_DATA_LINES,
+                                   spot=None) -> List:
+        """
+        Snapshot a whole (expiry x strike) grid in one pass: qualify every contract
+        in a single bulk request (cache misses only), then take quotes through the
+        subscription manager in batches of at most `max_lines` contracts. Live
+        subscriptions from earlier cycles are reused as-is. Returns when every
+        ticker has a quote or when the overall `timeout` expires. Strikes IB sent no
+        model greeks for get a Black-Scholes delta priced off `spot`.
+        """
+        contracts = [Option(symbol, expiry, strike, right, "SMART") for expiry in expiries for strike in strikes]
+        qualified = await self.qualify_async(*contracts)
+        tickers = await self._snapshot_async(qualified, timeout, max_lines)
+        options = [self._option_data(ticker) for ticker in tickers]
+        self._fill_deltas(options, spot, right)
+        return options
+
+    async def _snapshot_async(self, contracts: List, timeout: float, max_lines: int) -> List:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        batch_size = min(max_lines, self.market_data.max_lines)
+        tickers = []
+        for i in range(0, len(contracts), batch_size):
+            # Lines stay pinned while this batch waits, so concurrent snapshots cannot evict them.
+            try:
+                async with self.market_data.lease(contracts[i:i + batch_size], deadline - loop.time()) as batch:
+                    await self.market_data.wait_for_quotes(batch, deadline - loop.time())
+            except asyncio.TimeoutError:
+                logger.warning(f"[MKT DATA] No free lines for the last {len(contracts) - i} contracts before "
+                               f"the snapshot deadline.")
+                break
+            tickers.extend(batch)
+        logger.info(f"[MKT DATA] {self.market_data.stats()}")
+        return tickers
+
+    def _fill_deltas(self, options: List, spot, right: str):
+        """Solve IV from the mark and price delta for every option missing model greeks, in one call."""
+        missing = [opt for opt in options if opt.delta is None or opt.iv is None]
+        if not missing:
+            return
+        deltas = np.zeros(len(missing))
+        iv = np.full(len(missing), np.nan)
+        if spot:
+            marks = np.array([opt.mark for opt in missing], dtype=float)
+            strikes = np.array([opt.strike for opt in missing], dtype=float)
+            t = (np.array([opt.days_to_expiry for opt in missing], dtype=float) + 1) / DAYS_PER_YEAR
+            iv = implied_volatility(marks, spot, strikes, t, right == "C", RISK_FREE_RATE)
+            deltas = np.nan_to_num(bs_greeks(spot, strikes, t, iv, right == "C", RISK_FREE_RATE)["delta"])
+        for opt, delta, vol in zip(missing, deltas, iv):
+            if opt.delta is None:
+                opt.delta = float(delta)
+            if opt.iv is None and np.isfinite(vol):
+                opt.iv = float(vol)
+
+    def _option_data(self, ticker):
+        contract = ticker.contract
+        expiry = contract.lastTradeDateOrContractMonth
+        strike = contract.strike
+        bid = ticker.bid if valid_price(ticker.bid) else 0
+        ask = ticker.ask if valid_price(ticker.ask) else 0
+        last = ticker.last if valid_price(ticker.last) else 0
+        mark = (bid + ask) / 2 if bid and ask else last
+        days = days_to_expiry(expiry, self.now().date())
+        yield_ = mark / (strike * 100) if strike else 0
+        delta = getattr(ticker.modelGreeks, 'delta', None)
+        iv = getattr(ticker.modelGreeks, 'impliedVol', None)
+        return type('OptionData', (object,), {
+            'symbol': contract.symbol,
+            'strike': strike,
+            'expiry': expiry,
+            'delta': delta if delta is not None and not np.isnan(delta) else None,
+            'iv': iv if iv is not None and not np.isnan(iv) else None,
+            'mark': mark,
+            'yield_': yield_,
+            'bid': bid,
+            'ask': ask,
+            'last': last,
+            'days_to_expiry': days
+        })
+
     def sell_option(self, option_data):
-        contract = Option("NVDA", option_data.expiry, option_data.strike, "C", "SMART")
-        self.ib.qualifyContracts(contract)
-        order = LimitOrder("SELL", 1, round(option_data.bid or option_data.last or 1.0, 2))
-        self.ib.placeOrder(contract, order)
+        return self.ib.run(self.sell_option_async(option_data))
 
     def sell_put(self, option_data):
-        contract = Option("NVDA", option_data.expiry, option_data.strike, "P", "SMART")
-        self.ib.qualifyContracts(contract)
+        return self.ib.run(self.sell_put_async(option_data))
+
+    async def sell_option_async(self, option_data):
+        contract = await self.option_contract_async(option_data.symbol, option_data.expiry, option_data.strike, "C")
         order = LimitOrder("SELL", 1, round(option_data.bid or option_data.last or 1.0, 2))
-        self.ib.placeOrder(contract, order)
+        return self.ib.placeOrder(contract, order)
+
+    async def sell_put_async(self, option_data):
+        contract = await self.option_contract_async(option_data.symbol, option_data.expiry, option_data.strike, "P")
+        order = LimitOrder("SELL", 1, round(option_data.bid or option_data.last or 1.0, 2))
+        return self.ib.placeOrder(contract, order)
 
     def get_historical_data(self, symbol):
         # Fetch historical data for the given symbol
@@ -0,0 +1,281 @@
+# utils/iv_history.py
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import IV_HISTORY_DIR, IV_PERCENTILE_WINDOW, REALIZED_VOL_WINDOW
+
+logger = logging.getLogger(__name__)
+
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+class RollingVol:
+    """Annualized rolling std of log returns, updated in O(1) per close from running sums."""
+
+    def __init__(self, window: int = REALIZED_VOL_WINDOW, periods_per_year: int = 252):
+        self.window = window
+        self.scale = math.sqrt(periods_per_year)
+        self.returns = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.last_close = None
+
+    def update(self, close: float) -> Optional[float]:
+        if self.last_close and close > 0:
+            r = math.log(close / self.last_close)
+            self.returns.append(r)
+            self.total += r
+            self.total_sq += r * r
+            if len(self.returns) > self.window:
+                old = self.returns.popleft()
+                self.total -= old
+                self.total_sq -= old * old
+        if close > 0:
+            self.last_close = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        n = len(self.returns)
+        if n < self.window or n < 2:
+            return None
+        var = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(var, 0.0)) * self.scale
+
+
+class PercentileWindow:
+    """The last `size` values kept sorted, so a percentile rank is one bisect."""
+
+    def __init__(self, size: int = IV_PERCENTILE_WINDOW):
+        self.size = size
+        self.values = deque()
+        self.sorted = []
+
+    def push(self, value: float):
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        if len(self.values) > self.size:
+            self._remove(self.values.popleft())
+
+    def replace_last(self, value: float):
+        self._remove(self.values[-1])
+        self.values[-1] = value
+        bisect.insort(self.sorted, value)
+
+    def _remove(self, value: float):
+        del self.sorted[bisect.bisect_left(self.sorted, value)]
+
+    def rank(self, value: float) -> Optional[float]:
+        """Fraction of the window strictly below `value`."""
+        if not self.sorted:
+            return None
+        return bisect.bisect_left(self.sorted, value) / len(self.sorted)
+
+
+class _Track:
+    """A dated series with the percentile rank of each value against its trailing window."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.dates, self.values, self.pct = [], [], []
+        self.window = PercentileWindow(size)
+
+    def append(self, day: str, value: float):
+        if self.dates and day == self.dates[-1]:
+            self.values[-1] = value
+            self.window.replace_last(value)
+            self.pct[-1] = self.window.rank(value)
+        elif self.dates and day < self.dates[-1]:
+            i = bisect.bisect_left(self.dates, day)
+            if self.dates[i] == day:
+                self.values[i] = value
+            else:
+                self.dates.insert(i, day)
+                self.values.insert(i, value)
+            self._rebuild()
+        else:
+            self.dates.append(day)
+            self.values.append(value)
+            self.window.push(value)
+            self.pct.append(self.window.rank(value))
+
+    def merge(self, days, values):
+        """Bulk insert/overwrite; the percentiles are rebuilt once."""
+        merged = dict(zip(self.dates, self.values))
+        merged.update(zip(days, values))
+        self.dates = sorted(merged)
+        self.values = [merged[day] for day in self.dates]
+        self._rebuild()
+
+    def _rebuild(self):
+        self.window = PercentileWindow(self.size)
+        self.pct = []
+        for value in self.values:
+            self.window.push(value)
+            self.pct.append(self.window.rank(value))
+
+    def lookup(self, days) -> tuple:
+        """Positions of the latest entry on or before each day (-1 if none), vectorized."""
+        idx = np.searchsorted(np.array(self.dates), np.asarray(days), side="right") - 1
+        pct = np.array(self.pct + [np.nan], dtype=float)[np.where(idx >= 0, idx, -1)]
+        return idx, pct
+
+    def to_dict(self) -> dict:
+        return {"dates": self.dates, "values": self.values, "pct": self.pct}
+
+    @classmethod
+    def from_dict(cls, data: dict, size: int) -> "_Track":
+        track = cls(size)
+        track.dates, track.values, track.pct = data["dates"], data["values"], data["pct"]
+        for value in track.values[-size:]:
+            track.window.push(value)
+        return track
+
+
+class IVHistory:
+    """
+    Daily IV history for one symbol, persisted to `<root>/<SYMBOL>.json`.
+
+    Two tracks are kept: ATM implied vol recorded from chain snapshots, and
+    realized vol rolled forward one close at a time. Each day's percentile rank
+    against its trailing `window` is computed once, when the day is recorded, so
+    querying any past or current date is a binary search over the stored dates.
+    Until `min_history` days of implied vol exist, the realized-vol percentile is
+    used instead.
+
+    One history object is shared by every thread working on the symbol, so all
+    updates, reads and saves hold its lock. With `root=None` the history lives in
+    memory only and is never loaded or saved (backtests use this so they do not
+    overwrite the live history).
+    """
+
+    def __init__(self, symbol: str, root: Optional[str] = IV_HISTORY_DIR, window: int = IV_PERCENTILE_WINDOW,
+                 rv_window: int = REALIZED_VOL_WINDOW, min_history: int = 20):
+        self.symbol = symbol.upper()
+        self.path = os.path.join(root, f"{self.symbol}.json") if root is not None else None
+        self.window = window
+        self.min_history = min_history
+        self.iv = _Track(window)
+        self.rv = _Track(window)
+        self.realized = RollingVol(rv_window)
+        self.last_bar = ""
+        self._dirty = False
+        self._lock = threading.RLock()
+        self.load()
+
+    def record_iv(self, day, atm_iv: float):
+        if atm_iv is None or not np.isfinite(atm_iv) or atm_iv <= 0:
+            return
+        with self._lock:
+            self.iv.append(_day(day), float(atm_iv))
+            self._dirty = True
+
+    def record_many(self, dates, atm_ivs):
+        pairs = [(_day(d), float(v)) for d, v in zip(dates, atm_ivs) if np.isfinite(v) and v > 0]
+        if pairs:
+            with self._lock:
+                self.iv.merge(*zip(*pairs))
+                self._dirty = True
+
+    def record_chain(self, day, strikes, dtes, ivs, spot):
+        self.record_iv(day, atm_iv(strikes, dtes, ivs, spot))
+
+    def update_closes(self, dates, closes) -> int:
+        """Roll realized vol forward over closes newer than the last one seen; returns bars used."""
+        days = list(pd.DatetimeIndex(dates).strftime("%Y-%m-%d"))
+        with self._lock:  # last_bar is read and advanced atomically, so no close is rolled in twice
+            start = bisect.bisect_right(days, self.last_bar)
+            for day, close in zip(days[start:], closes[start:]):
+                vol = self.realized.update(float(close))
+                if vol is not None:
+                    self.rv.append(day, vol)
+            if start < len(days):
+                self.last_bar = days[-1]
+                self._dirty = True
+        return len(days) - start
+
+    def percentiles(self, dates) -> np.ndarray:
+        days = pd.to_datetime(np.asarray(dates)).strftime("%Y-%m-%d").to_numpy()
+        with self._lock:
+            iv_idx, iv_pct = self.iv.lookup(days)
+            _, rv_pct = self.rv.lookup(days)
+        return np.where(iv_idx + 1 >= self.min_history, iv_pct, rv_pct)
+
+    def iv_percentile(self, day=None) -> Optional[float]:
+        pct = self.percentiles([day or pd.Timestamp.now()])[0]
+        return None if np.isnan(pct) else float(pct)
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[IV HISTORY] Could not read {self.path}: {e}")
+            return
+        with self._lock:
+            self.iv = _Track.from_dict(data["iv"], self.window)
+            self.rv = _Track.from_dict(data["rv"], self.window)
+            self.realized.returns = deque(data["returns"])
+            self.realized.total = sum(self.realized.returns)
+            self.realized.total_sq = sum(r * r for r in self.realized.returns)
+            self.realized.last_close = data["last_close"]
+            self.last_bar = data["last_bar"]
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            data = {"iv": self.iv.to_dict(), "rv": self.rv.to_dict(), "returns": list(self.realized.returns),
+                    "last_close": self.realized.last_close, "last_bar": self.last_bar}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+def atm_iv(strikes, dtes, ivs, spot) -> Optional[float]:
+    """IV of the strike closest to spot in the nearest expiry that has a usable IV."""
+    strikes, dtes, ivs = (np.asarray(a, dtype=float) for a in (strikes, dtes, ivs))
+    ok = np.isfinite(ivs) & (ivs > 0) & np.isfinite(strikes)
+    if not spot or not ok.any():
+        return None
+    strikes, dtes, ivs = strikes[ok], dtes[ok], ivs[ok]
+    front = dtes == dtes.min()
+    return float(ivs[front][np.argmin(np.abs(strikes[front] - spot))])
+
+
+def daily_atm_iv(df, date_col="date", spot_col="underlying_price", strike_col="strike",
+                 dte_col="dte", iv_col="iv") -> pd.Series:
+    """ATM IV per date for a multi-day option history, in one sort instead of a loop over days."""
+    rows = df[[date_col, spot_col, strike_col, dte_col, iv_col]].dropna()
+    rows = rows[rows[iv_col] > 0].assign(_dist=(rows[strike_col] - rows[spot_col]).abs())
+    rows = rows.sort_values([date_col, dte_col, "_dist"]).drop_duplicates(date_col)
+    return rows.set_index(date_col)[iv_col]
+
+
+HISTORY_ROOT = IV_HISTORY_DIR  # replays point this at their own directory
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+def get_iv_history(symbol: str) -> IVHistory:
+    key = (HISTORY_ROOT, symbol.upper())
+    with _histories_lock:
+        if key not in _histories:
+            _histories[key] = IVHistory(key[1], root=HISTORY_ROOT)
+        return _histories[key]
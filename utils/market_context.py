@@ -0,0 +1,79 @@
+# utils/market_context.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+from utils.data_loader import get_price_history
+from utils.earnings import is_near_earnings
+from utils.volatility import VolatilityToolkit
+
+
+@dataclass
+class MarketContext:
+    """
+    Per-symbol market state shared by every option scored in a cycle.
+    Built once per cycle so feature extraction over a chain costs one set of fetches.
+    """
+    symbol: str
+    prices: np.ndarray
+    rsi: float
+    momentum: float
+    iv_percentile: float
+    near_earnings: bool
+    as_of: datetime = field(default_factory=datetime.now)
+
+    def annotate(self, option):
+        """Attach the market-level features to an option object."""
+        option.rsi = self.rsi
+        option.momentum = self.momentum
+        option.iv_percentile = self.iv_percentile
+        option.near_earnings = self.near_earnings
+        return option
+
+
+def compute_rsi(prices, period=14):
+    deltas = np.diff(prices)
+    seed = deltas[:period]
+    up = seed[seed >= 0].sum() / period
+    down = -seed[seed < 0].sum() / period
+    rs = up / down if down != 0 else 0
+    return 100. - 100. / (1. + rs)
+
+
+def _assemble(symbol, prices, iv_percentile, near_earnings, as_of=None):
+    momentum = prices[-1] - prices[-10] if len(prices) >= 10 else 0
+    return MarketContext(
+        symbol=symbol,
+        prices=prices,
+        rsi=compute_rsi(prices),
+        momentum=momentum,
+        iv_percentile=iv_percentile,
+        near_earnings=bool(near_earnings),
+        as_of=as_of or datetime.now(),
+    )
+
+
+def build_market_context(symbol, vol=None, days=21, as_of=None):
+    """
+    Fetch price history, IV percentile and earnings proximity concurrently.
+    `as_of` takes the snapshot at a past time (replays); None means now.
+    """
+    vol = vol or VolatilityToolkit(symbol)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        prices = pool.submit(get_price_history, symbol, days, as_of=as_of)
+        iv_percentile = pool.submit(vol.get_iv_percentile, as_of)
+        near_earnings = pool.submit(is_near_earnings, symbol, date=as_of)
+        return _assemble(symbol, prices.result(), iv_percentile.result(), near_earnings.result(), as_of)
+
+
+async def build_market_context_async(symbol, vol=None, days=21, as_of=None):
+    vol = vol or VolatilityToolkit(symbol)
+    prices, iv_percentile, near_earnings = await asyncio.gather(
+        asyncio.to_thread(get_price_history, symbol, days, as_of=as_of),
+        asyncio.to_thread(vol.get_iv_percentile, as_of),
+        asyncio.to_thread(is_near_earnings, symbol, date=as_of),
+    )
+    return _assemble(symbol, prices, iv_percentile, near_earnings, as_of)
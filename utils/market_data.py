@@ -0,0 +1,153 @@
+# utils/market_data.py
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from ib_insync import util
+
+logger = logging.getLogger(__name__)
+
+
+def valid_price(value) -> bool:
+    return value is not None and not util.isNan(value) and value > 0
+
+
+def has_quote(ticker) -> bool:
+    """True once a ticker carries a usable bid/ask pair or a last print."""
+    return (valid_price(ticker.bid) and valid_price(ticker.ask)) or valid_price(ticker.last)
+
+
+class MarketDataSubscriptions:
+    """
+    Keeps streaming reqMktData subscriptions alive across cycles and reuses them.
+
+    Subscriptions are keyed by conId (contracts must be qualified) and ordered by
+    last use. Callers take them through `lease`, which pins the lines until the
+    block exits, so concurrent snapshots and order pricing never cancel each
+    other's tickers mid-wait. When the line budget is reached the
+    least-recently-used unpinned line is cancelled to make room; if every line is
+    pinned, a lease waits until enough are released. A lease takes all its lines
+    at once, so leases of at most `max_lines` contracts cannot deadlock. The
+    ticker objects handed out keep their last values after eviction, so a caller
+    holding one from a finished snapshot can still read it.
+    """
+
+    def __init__(self, ib, max_lines: int = 90):
+        self.ib = ib
+        self.max_lines = max_lines
+        self._tickers: "OrderedDict[int, object]" = OrderedDict()
+        self._pins: Dict[int, int] = {}
+        self._released = asyncio.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(contract) -> int:
+        if not contract.conId:
+            raise ValueError(f"Cannot subscribe to unqualified contract {contract!r}")
+        return contract.conId
+
+    @asynccontextmanager
+    async def lease(self, contracts: List, timeout: Optional[float] = None):
+        """
+        Subscribe to `contracts` and pin their lines for the duration of the block;
+        yields the tickers in order. Raises asyncio.TimeoutError if the lines
+        cannot be freed within `timeout`.
+        """
+        keys = [self._key(contract) for contract in contracts]
+        if len(set(keys)) > self.max_lines:
+            raise ValueError(f"A lease of {len(set(keys))} lines exceeds the budget of {self.max_lines}")
+        async with self._released:
+            if not self._has_room(keys):
+                await asyncio.wait_for(self._released.wait_for(lambda: self._has_room(keys)), timeout)
+            tickers = self._subscribe(contracts, keys)
+        try:
+            yield tickers
+        finally:
+            async with self._released:
+                for key in keys:
+                    self._pins[key] -= 1
+                    if not self._pins[key]:
+                        del self._pins[key]
+                self._released.notify_all()
+
+    def _has_room(self, keys: List[int]) -> bool:
+        wanted = set(keys)
+        missing = sum(1 for key in wanted if key not in self._tickers)
+        evictable = sum(1 for key in self._tickers if key not in self._pins and key not in wanted)
+        return len(self._tickers) - evictable + missing <= self.max_lines
+
+    def _subscribe(self, contracts: List, keys: List[int]) -> List:
+        for key in keys:  # pin first so making room never evicts a line this lease reuses
+            self._pins[key] = self._pins.get(key, 0) + 1
+        tickers = []
+        for contract, key in zip(contracts, keys):
+            ticker = self._tickers.get(key)
+            if ticker is not None:
+                self._tickers.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+                while len(self._tickers) >= self.max_lines:
+                    self._evict()
+                ticker = self.ib.reqMktData(contract)
+                self._tickers[key] = ticker
+            tickers.append(ticker)
+        return tickers
+
+    def release(self, contract):
+        """Cancel a subscription now, unless a lease still holds it."""
+        key = self._key(contract)
+        if key in self._pins:
+            return
+        ticker = self._tickers.pop(key, None)
+        if ticker is not None:
+            self.ib.cancelMktData(ticker.contract)
+
+    def clear(self):
+        """Cancel every unpinned subscription."""
+        for key in [key for key in self._tickers if key not in self._pins]:
+            self.ib.cancelMktData(self._tickers.pop(key).contract)
+
+    def _evict(self):
+        key = next(key for key in self._tickers if key not in self._pins)
+        ticker = self._tickers.pop(key)
+        self.ib.cancelMktData(ticker.contract)
+        self.evictions += 1
+
+    async def wait_for_quotes(self, tickers: List, timeout: float):
+        """Wait on pendingTickersEvent until every ticker has quoted or the timeout hits."""
+        pending = {ticker for ticker in tickers if not has_quote(ticker)}
+        if not pending or timeout <= 0:
+            return
+        done = asyncio.Event()
+
+        def on_pending(updated):
+            for ticker in updated:
+                if ticker in pending and has_quote(ticker):
+                    pending.discard(ticker)
+            if not pending:
+                done.set()
+
+        self.ib.pendingTickersEvent += on_pending
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.ib.pendingTickersEvent -= on_pending
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "active": len(self._tickers),
+            "pinned": len(self._pins),
+            "max_lines": self.max_lines,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+        }
@@ -0,0 +1,43 @@
+# utils/option_chain.py
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+
+def days_to_expiry(expiry: str, today: Optional[date] = None) -> int:
+    today = today or date.today()
+    return (datetime.strptime(expiry, "%Y%m%d").date() - today).days
+
+
+def select_expiries(expirations: Iterable[str], min_dte: int, max_dte: int,
+                    max_expiries: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """
+    Return the expiries whose days-to-expiry fall inside [min_dte, max_dte], nearest first.
+    If nothing lands in the window, fall back to the nearest expiry at or beyond min_dte
+    so callers still get a chain to look at.
+    """
+    upcoming = sorted(e for e in expirations if days_to_expiry(e, today) >= min_dte)
+    selected = [e for e in upcoming if days_to_expiry(e, today) <= max_dte]
+    if not selected:
+        selected = upcoming[:1]
+    if max_expiries:
+        selected = selected[:max_expiries]
+    return selected
+
+
+def select_strikes(strikes: Iterable[float], spot: Optional[float], right: str,
+                   itm_band: float, otm_band: float) -> List[float]:
+    """
+    Keep strikes within a moneyness band around the underlying's last price.
+
+    For calls the OTM side is above spot, for puts it is below, so the band is
+    [spot * (1 - itm_band), spot * (1 + otm_band)] for calls and mirrored for puts.
+    Without a usable spot price every strike is returned.
+    """
+    strikes = sorted(strikes)
+    if not spot or spot <= 0:
+        return strikes
+    if right == "C":
+        low, high = spot * (1 - itm_band), spot * (1 + otm_band)
+    else:
+        low, high = spot * (1 - otm_band), spot * (1 + itm_band)
+    return [k for k in strikes if low <= k <= high]
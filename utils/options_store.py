@@ -0,0 +1,252 @@
+# utils/options_store.py
+import glob
+import logging
+import os
+import sys
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config import OPTIONS_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32()), ("expiry", pa.date32())]), flavor="hive")
+
+# Column names are the lowercased fetch_real_options_data columns, which is what
+# BacktestEngine already works with. `date` and `expiry` live in the directory names.
+SCHEMA = pa.schema([
+    ("contractsymbol", pa.string()),
+    ("symbol", pa.string()),
+    ("optiontype", pa.string()),
+    ("dte", pa.int16()),
+    ("strike", pa.float64()),
+    ("price", pa.float64()),
+    ("bid", pa.float64()),
+    ("ask", pa.float64()),
+    ("mid", pa.float64()),
+    ("change", pa.float64()),
+    ("percentchange", pa.float64()),
+    ("volume", pa.float64()),
+    ("openinterest", pa.float64()),
+    ("impliedvolatility", pa.float64()),
+    ("inthemoney", pa.bool_()),
+    ("lasttradedate", pa.timestamp("us", tz="UTC")),
+    ("underlying_price", pa.float64()),
+    ("iv", pa.float64()),
+    ("delta", pa.float64()),
+    ("gamma", pa.float64()),
+    ("theta", pa.float64()),
+    ("vega", pa.float64()),
+    ("yield_to_strike", pa.float64()),
+    ("premium", pa.float64()),
+    ("roc", pa.float64()),
+    ("rsi", pa.float64()),
+    ("momentum", pa.float64()),
+    ("iv_percentile", pa.float64()),
+    ("nearearnings", pa.int8()),
+    ("label", pa.int8()),
+])
+DATASET_SCHEMA = SCHEMA.append(pa.field("date", pa.date32())).append(pa.field("expiry", pa.date32()))
+
+# OCC option symbol: root, YYMMDD expiry, C/P, strike * 1000.
+_OCC = r"^(?P<root>[A-Z.]+?)(?P<expiry>\d{6})(?P<right>[CP])\d{8}$"
+
+
+def normalize_snapshots(df: pd.DataFrame, symbol: Optional[str] = None) -> pd.DataFrame:
+    """
+    Bring a chain snapshot frame (fetch_real_options_data output, or the old
+    CSV) to SCHEMA: lowercase columns, date/expiry as dates, DTE computed for
+    every row at once. Missing symbol/expiry/type are parsed from the OCC
+    contract symbol. Rows without a usable date or expiry are dropped.
+    """
+    df = df.rename(columns=str.lower).rename(columns={"lastprice": "price"})
+    occ = df["contractsymbol"].astype(str).str.extract(_OCC) if "contractsymbol" in df.columns else None
+    if "symbol" not in df.columns:
+        df["symbol"] = symbol if symbol else (occ["root"] if occ is not None else None)
+    if "expiry" not in df.columns and occ is not None:
+        df["expiry"] = "20" + occ["expiry"]
+    if "optiontype" not in df.columns:
+        right = df["right"] if "right" in df.columns else (occ["right"] if occ is not None else None)
+        df["optiontype"] = right
+    if "date" not in df.columns or "expiry" not in df.columns:
+        raise ValueError("[OPTIONS STORE] Snapshots need a date and an expiry (or OCC contract symbols)")
+
+    df["symbol"] = df["symbol"].astype(str).str.upper()
+    df["optiontype"] = df["optiontype"].astype(str).str.upper().str[0].map({"C": "CALL", "P": "PUT"})
+    df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=True).dt.tz_localize(None).dt.normalize()
+    expiry = df["expiry"].astype(str).str.replace("-", "", regex=False).str[:8]
+    df["expiry"] = pd.to_datetime(expiry, format="%Y%m%d", errors="coerce")
+    valid = df["date"].notna() & df["expiry"].notna()
+    if not valid.all():
+        logger.warning(f"[OPTIONS STORE] Dropping {int((~valid).sum())} rows without a date or expiry")
+        df = df[valid]
+    df["dte"] = (df["expiry"] - df["date"]).dt.days
+    if "lasttradedate" in df.columns:
+        df["lasttradedate"] = pd.to_datetime(df["lasttradedate"], errors="coerce", utc=True)
+    return df
+
+
+def _table(df: pd.DataFrame) -> pa.Table:
+    arrays = []
+    for field in SCHEMA:
+        if field.name in df.columns:
+            values = df[field.name]
+            if pa.types.is_integer(field.type):
+                values = pd.to_numeric(values, errors="coerce").round().astype("Int64")
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.nulls(len(df), field.type))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+class OptionsStore:
+    """
+    Option-chain history as a hive-partitioned Parquet dataset:
+    `<root>/date=YYYY-MM-DD/expiry=YYYY-MM-DD/<SYMBOL>.parquet`, with later
+    appends to the same partition landing beside it as `<SYMBOL>.partN.parquet`.
+
+    Columns are typed (SCHEMA) and DTE is computed when a snapshot is written,
+    so a read only touches the partitions, row groups and columns it needs:
+    date ranges prune directories, DTE and symbol prune files through their
+    Parquet statistics (both are constant within a file), and option type is
+    filtered in Arrow before anything reaches pandas.
+    """
+
+    def __init__(self, root: str = OPTIONS_STORE_DIR):
+        self.root = root
+
+    def path(self, day, expiry, symbol: str) -> str:
+        return os.path.join(self.root, f"date={pd.Timestamp(day):%Y-%m-%d}", f"expiry={pd.Timestamp(expiry):%Y-%m-%d}",
+                            f"{symbol.upper()}.parquet")
+
+    def files(self, day, expiry, symbol: str) -> list:
+        """The symbol's files in one partition: the base file plus any appended `.partN` files."""
+        base = self.path(day, expiry, symbol)
+        parts = glob.glob(glob.escape(base[:-len(".parquet")]) + ".part*.parquet")
+        return ([base] if os.path.exists(base) else []) + sorted(parts)
+
+    def write(self, df: pd.DataFrame, symbol: Optional[str] = None) -> int:
+        """Write snapshots, replacing any stored files for the same (date, expiry, symbol); returns rows written."""
+        df = normalize_snapshots(df, symbol)
+        written = 0
+        for (day, expiry, sym), rows in df.groupby(["date", "expiry", "symbol"], sort=False).indices.items():
+            for stale in self.files(day, expiry, sym)[1:]:
+                os.remove(stale)
+            self._write_file(self.path(day, expiry, sym), df.iloc[rows])
+            written += len(rows)
+        logger.info(f"[OPTIONS STORE] Wrote {written} rows to {self.root}")
+        return written
+
+    def append(self, df: pd.DataFrame, symbol: Optional[str] = None) -> int:
+        """
+        Add snapshots without touching stored history. A contract is stored at most
+        once per snapshot date: rows whose (contract symbol, date) is already in the
+        store are dropped, and the rest go to a new file in their partition. Returns
+        rows added.
+        """
+        df = normalize_snapshots(df, symbol)
+        df = df.drop_duplicates(["contractsymbol", "date"], keep="last")
+        added = 0
+        for (day, expiry, sym), rows in df.groupby(["date", "expiry", "symbol"], sort=False).indices.items():
+            new = df.iloc[rows]
+            existing = self.files(day, expiry, sym)
+            if existing:
+                # The contract symbol encodes the expiry, so a (contract, date) can only be in this partition.
+                stored = pa.concat_tables([pq.read_table(f, columns=["contractsymbol"]) for f in existing])
+                new = new[~new["contractsymbol"].isin(stored.column("contractsymbol").to_pylist())]
+                if new.empty:
+                    continue
+            path = self.path(day, expiry, sym)
+            if existing:
+                path = f"{path[:-len('.parquet')]}.part{len(existing)}.parquet"
+            self._write_file(path, new)
+            added += len(new)
+        logger.info(f"[OPTIONS STORE] Appended {added} of {len(df)} rows to {self.root}")
+        return added
+
+    def _write_file(self, path: str, rows: pd.DataFrame):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")  # dot files are not scanned
+        pq.write_table(_table(rows.sort_values(["optiontype", "strike"], kind="stable")), tmp)
+        os.replace(tmp, path)
+
+    def import_csv(self, path: str, symbol: Optional[str] = None) -> int:
+        """Load a snapshot CSV (e.g. the old data/real_options_data.csv) into the store."""
+        return self.write(pd.read_csv(path), symbol)
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        if not os.path.isdir(self.root):
+            return None
+        dataset = ds.dataset(self.root, format="parquet", schema=DATASET_SCHEMA, partitioning=PARTITIONING,
+                             exclude_invalid_files=True)
+        return dataset if dataset.files else None
+
+    def _filter(self, symbols=None, start=None, end=None, min_dte=None, max_dte=None, option_type=None):
+        conditions = []
+        if symbols is not None:
+            conditions.append(ds.field("symbol").isin([s.upper() for s in symbols]))
+        if start is not None:
+            conditions.append(ds.field("date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32()))
+        if end is not None:
+            conditions.append(ds.field("date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32()))
+        if min_dte is not None:
+            conditions.append(ds.field("dte") >= min_dte)
+        if max_dte is not None:
+            conditions.append(ds.field("dte") <= max_dte)
+        if option_type is not None:
+            conditions.append(ds.field("optiontype") == ("CALL" if option_type.upper().startswith("C") else "PUT"))
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+        return condition
+
+    def scan(self, symbols: Optional[Iterable[str]] = None, start=None, end=None, min_dte: Optional[int] = None,
+             max_dte: Optional[int] = None, option_type: Optional[str] = None,
+             columns: Optional[Iterable[str]] = None) -> pa.Table:
+        dataset = self.dataset()
+        if dataset is None:
+            return DATASET_SCHEMA.empty_table() if columns is None else \
+                DATASET_SCHEMA.empty_table().select(list(columns))
+        return dataset.to_table(columns=list(columns) if columns is not None else None,
+                                filter=self._filter(symbols, start, end, min_dte, max_dte, option_type))
+
+    def iter_frames(self, symbols: Optional[Iterable[str]] = None, start=None, end=None,
+                    min_dte: Optional[int] = None, max_dte: Optional[int] = None, option_type: Optional[str] = None,
+                    columns: Optional[Iterable[str]] = None, batch_size: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Stream matching rows as DataFrames of at most `batch_size` rows, in path
+        order (date, then expiry), so only one batch is materialized at a time.
+        """
+        dataset = self.dataset()
+        if dataset is None:
+            return
+        for batch in dataset.to_batches(columns=list(columns) if columns is not None else None,
+                                        filter=self._filter(symbols, start, end, min_dte, max_dte, option_type),
+                                        batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas(date_as_object=False)
+
+    def read(self, symbols: Optional[Iterable[str]] = None, start=None, end=None, min_dte: Optional[int] = None,
+             max_dte: Optional[int] = None, option_type: Optional[str] = None,
+             columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Snapshots matching every given filter, sorted by date, symbol, expiry, type and strike."""
+        table = self.scan(symbols, start, end, min_dte, max_dte, option_type, columns)
+        df = table.to_pandas(date_as_object=False)
+        keys = [col for col in ("date", "symbol", "expiry", "optiontype", "strike") if col in df.columns]
+        return df.sort_values(keys, kind="stable", ignore_index=True) if keys else df
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: python -m utils.options_store <snapshots.csv> [SYMBOL]")
+        return
+    rows = OptionsStore().import_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Imported {rows} rows into {OPTIONS_STORE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
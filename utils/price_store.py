@@ -0,0 +1,154 @@
+# utils/price_store.py
+import logging
+import os
+import re
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+def period_start(period: Optional[str], now: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """Translate a yfinance-style period ("5d", "6mo", "1y") into a UTC start timestamp."""
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period or "")
+    if match is None:
+        return None  # "max", "ytd" or unset: no trimming
+    now = now if now is not None else pd.Timestamp.now(tz="UTC")
+    return now - pd.DateOffset(**{_PERIOD_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def _utc64(ts) -> np.datetime64:
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+    return ts.tz_localize(None).to_datetime64()
+
+
+class PriceStore:
+    """
+    On-disk OHLCV bars, one Arrow IPC file per (symbol, interval).
+
+    Files are written uncompressed so reads are memory-mapped and zero-copy; the
+    opened table is kept in memory and reopened only when the file changes. New
+    bars are merged in by timestamp (later rows win, so a partial bar fetched
+    mid-session is replaced on the next update) and the file is swapped in
+    atomically. The file's mtime marks the last successful refresh, which lets
+    separate processes share the `is_fresh` check without any network calls.
+    """
+
+    def __init__(self, root: str = "data/prices", max_age: float = 900):
+        self.root = root
+        self.max_age = max_age
+        self._tables = {}
+
+    def path(self, symbol: str, interval: str = "1d") -> str:
+        return os.path.join(self.root, f"{symbol.upper()}_{interval}.arrow")
+
+    def read_table(self, symbol: str, interval: str = "1d") -> Optional[pa.Table]:
+        path = self.path(symbol, interval)
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._tables.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        self._tables[path] = (stamp, table)
+        return table
+
+    def read(self, symbol: str, interval: str = "1d", start: Optional[pd.Timestamp] = None,
+             end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Bars with start <= timestamp <= end (UTC), sliced on the Arrow table before conversion."""
+        table = self.read_table(symbol, interval)
+        if table is None:
+            return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="Date"))
+        if start is not None or end is not None:
+            dates = table.column("Date").to_numpy()
+            lo = np.searchsorted(dates, _utc64(start)) if start is not None else 0
+            hi = np.searchsorted(dates, _utc64(end), side="right") if end is not None else len(dates)
+            table = table.slice(lo, max(hi - lo, 0))
+        return table.to_pandas().set_index("Date")
+
+    def closes(self, symbol: str, interval: str = "1d", count: Optional[int] = None) -> np.ndarray:
+        table = self.read_table(symbol, interval)
+        if table is None:
+            return np.array([])
+        closes = table.column("Close").to_numpy()
+        return closes[-count:] if count else closes
+
+    def closes_at(self, symbol: str, dates, interval: str = "1d", tz: str = "America/New_York",
+                  max_gap_days: int = 5) -> np.ndarray:
+        """
+        Close of the last bar on or before each of `dates` (calendar days in `tz`),
+        looked up for all dates in one searchsorted over the stored timestamps. A
+        date falling on a weekend or holiday gets the previous session's close; NaN
+        where no bar precedes the date, or where the last one is more than
+        `max_gap_days` before it (the store has not caught up to that date yet).
+        """
+        days = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        table = self.read_table(symbol, interval)
+        if table is None or table.num_rows == 0 or len(days) == 0:
+            return np.full(len(days), np.nan)
+        stamps = table.column("Date").to_numpy()
+        if days.tz is None:
+            days = days.tz_localize(tz)
+        day_starts = days.tz_convert("UTC").tz_localize(None).to_numpy().astype(stamps.dtype)
+        day_ends = (days + pd.Timedelta(days=1)).tz_convert("UTC").tz_localize(None).to_numpy()
+        idx = np.searchsorted(stamps, day_ends.astype(stamps.dtype), side="left") - 1
+        matched = np.maximum(idx, 0)
+        recent = day_starts - stamps[matched] <= np.timedelta64(max_gap_days, "D")
+        closes = table.column("Close").to_numpy()
+        return np.where((idx >= 0) & recent, closes[matched], np.nan)
+
+    def last_timestamp(self, symbol: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+        table = self.read_table(symbol, interval)
+        if table is None or table.num_rows == 0:
+            return None
+        return pd.Timestamp(table.column("Date")[-1].as_py())
+
+    def is_fresh(self, symbol: str, interval: str = "1d") -> bool:
+        try:
+            return time.time() - os.path.getmtime(self.path(symbol, interval)) < self.max_age
+        except FileNotFoundError:
+            return False
+
+    def append(self, symbol: str, interval: str, bars: pd.DataFrame) -> int:
+        """Merge `bars` (DatetimeIndex, OHLCV columns) into the store; returns rows added."""
+        path = self.path(symbol, interval)
+        existing = self.read(symbol, interval)
+        new = self._normalize(bars)
+        if new.empty:
+            if os.path.exists(path):
+                os.utime(path)  # nothing new, but the refresh still counts
+            return 0
+        merged = pd.concat([existing, new]) if not existing.empty else new
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        self._write(path, merged)
+        return len(merged) - len(existing)
+
+    @staticmethod
+    def _normalize(bars: pd.DataFrame) -> pd.DataFrame:
+        if bars is None or bars.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        df = bars.reindex(columns=BAR_COLUMNS).astype("float64")
+        index = pd.DatetimeIndex(df.index)
+        df.index = (index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")).rename("Date")
+        return df
+
+    def _write(self, path: str, df: pd.DataFrame):
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+        tmp = f"{path}.tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        logger.info(f"[PRICES] Stored {len(df)} bars in {path}")
@@ -1,38 +1,75 @@
+import logging
+from datetime import datetime
 
+import numpy as np
 import pandas as pd
-import os
-from datetime import datetime
 
-LOG_PATH = "logs/trade_history.csv"
+from utils import data_loader
+from utils.trade_store import get_trade_store
+
+logger = logging.getLogger(__name__)
+
 PRICE_AT_EXPIRY_COL = "Underlying Expiry Price"
+SHORT_CALL = "Sell Call"
+SHORT_PUT = "Sell Put"
+
+
+def expiry_closes(trades, refresh=True):
+    """
+    Underlying close on each trade's expiry, looked up per symbol in one pass over
+    the local price store. Stale symbols are refreshed in one bulk download first.
+    """
+    closes = pd.Series(np.nan, index=trades.index)
+    symbols = trades["Symbol"].dropna().unique().tolist()
+    if refresh and symbols:
+        failed = data_loader.refresh_price_store_many(symbols)
+        if failed:
+            logger.warning(f"[RECONCILE] Price refresh failed for {sorted(failed)}; using stored bars.")
+    for symbol, group in trades.groupby("Symbol"):
+        closes[group.index] = data_loader.price_store.closes_at(symbol, group["Expiry"])
+    return closes
+
+
+def short_option_pnl(trade_type, strike, premium, expiry_price):
+    """Premium kept minus intrinsic value at expiry, per share; NaN for other trade types."""
+    trade_type, strike = np.asarray(trade_type), np.asarray(strike, dtype=float)
+    premium, expiry_price = np.asarray(premium, dtype=float), np.asarray(expiry_price, dtype=float)
+    intrinsic = np.where(trade_type == SHORT_CALL, np.maximum(expiry_price - strike, 0),
+                         np.where(trade_type == SHORT_PUT, np.maximum(strike - expiry_price, 0), np.nan))
+    return premium - intrinsic
 
-def reconcile_outcomes():
-    if not os.path.exists(LOG_PATH):
-        print("No trade log found.")
-        return
 
-    df = pd.read_csv(LOG_PATH)
-    updated = False
+def reconcile_outcomes(as_of=None, store=None, refresh=True):
+    """
+    Fill Actual PnL for short calls and puts that expired before `as_of` (default
+    today). Only unreconciled, expired rows are read (partial index), expiry closes
+    not logged by hand are looked up in bulk, and only rows that get a PnL are
+    written back. Returns the number of trades reconciled.
+    """
+    store = store or get_trade_store()
+    as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+    df = store.unreconciled(expired_before=as_of, types=[SHORT_CALL, SHORT_PUT],
+                            columns=["Type", "Symbol", "Strike", "Premium", "Expiry", PRICE_AT_EXPIRY_COL])
+    if df.empty:
+        logger.info("[RECONCILE] No expired trades to reconcile.")
+        return 0
 
-    for i, row in df.iterrows():
-        if pd.notnull(row.get("Actual PnL")):
-            continue  # already filled
+    missing = df[PRICE_AT_EXPIRY_COL].isnull() & df["Symbol"].notnull()
+    if missing.any():
+        df.loc[missing, PRICE_AT_EXPIRY_COL] = expiry_closes(df[missing], refresh)
 
-        if row["Type"] == "Sell Call":
-            expiry_price = row.get(PRICE_AT_EXPIRY_COL)
-            strike = row["Strike"]
-            premium = row["Premium"]
+    df = df[df[PRICE_AT_EXPIRY_COL].notnull()]
+    if df.empty:
+        logger.info("[RECONCILE] No updates made. Ensure expiry prices are available.")
+        return 0
 
-            if pd.notnull(expiry_price):
-                pnl = premium if expiry_price <= strike else premium - (expiry_price - strike)
-                df.at[i, "Actual PnL"] = round(pnl, 2)
-                updated = True
+    pnl = short_option_pnl(df["Type"], df["Strike"], df["Premium"], df[PRICE_AT_EXPIRY_COL])
+    store.update_many(df["id"], {PRICE_AT_EXPIRY_COL: df[PRICE_AT_EXPIRY_COL].round(2),
+                                 "Actual PnL": np.round(pnl, 2)})
+    logger.info(f"[RECONCILE] Reconciled {len(df)} expired trades.")
+    return len(df)
 
-    if updated:
-        df.to_csv(LOG_PATH, index=False)
-        print("Trade log updated with Actual PnL.")
-    else:
-        print("No updates made. Ensure expiry prices are available.")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     reconcile_outcomes()
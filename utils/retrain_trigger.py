@@ -1,15 +1,14 @@
 from utils.trade_model import TradeModel
-import os
-import json
+from config import TRADE_JOURNAL_PATH
+from utils.trade_journal import get_journal
 
-def retrain_if_needed(log_path="logs/trades.json", min_trades=20):
-    if not os.path.exists(log_path):
+def retrain_if_needed(log_path=TRADE_JOURNAL_PATH, min_trades=20):
+    # The journal's sidecar index gives the record count without parsing the log.
+    count = get_journal(log_path).count()
+    if count == 0:
         return
 
-    with open(log_path, "r") as f:
-        trades = json.load(f)
-
-    if len(trades) % min_trades == 0:
+    if count % min_trades == 0:
         print("[ML] Auto-retraining triggered")
-        model = TradeModel()
-        model.train_model()
\ No newline at end of file
+        model = TradeModel(log_path)
+        model.train_model()
@@ -0,0 +1,476 @@
+# utils/sim_broker.py
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+import shutil
+from datetime import date, datetime, time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from ib_insync import LimitOrder, Option, OrderStatus, Position, Stock, Ticker, Trade
+
+from config import MIN_DTE, MAX_DTE, MAX_EXPIRIES, MONEYNESS_ITM, MONEYNESS_OTM, RISK_FREE_RATE
+from utils.greeks import add_greeks
+from utils.option_chain import days_to_expiry, select_expiries, select_strikes
+from utils.options_store import OptionsStore
+from utils.price_store import PriceStore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLUMNS = ["date", "symbol", "expiry", "strike", "right", "bid", "ask", "last",
+                    "underlying_price", "delta", "iv"]
+
+
+class ChainSnapshots:
+    """
+    Historical option-chain snapshots indexed by (symbol, date).
+
+    The frame is normalized and sorted once; each (symbol, date) maps to a row
+    range and every column is held as a NumPy array, so looking up a day's chain
+    during a replay is a dict hit plus array slicing. Rows without a delta get
+    Black-Scholes greeks in one vectorized pass at load time.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = self._normalize(df)
+        self.columns = {col: df[col].to_numpy() for col in SNAPSHOT_COLUMNS}
+        keys = df["symbol"] + "|" + df["date"]
+        starts = np.flatnonzero(np.r_[True, keys.to_numpy()[1:] != keys.to_numpy()[:-1]])
+        stops = np.r_[starts[1:], len(df)]
+        self.index: Dict[tuple, slice] = {
+            tuple(keys.iat[start].split("|")): slice(start, stop) for start, stop in zip(starts, stops)
+        }
+        self.symbols = sorted(df["symbol"].unique())
+        self.dates = sorted(df["date"].unique())
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ChainSnapshots":
+        return cls(pd.read_csv(path))
+
+    @classmethod
+    def from_store(cls, store: Optional[OptionsStore] = None, symbols=None, start=None, end=None,
+                   max_dte: Optional[int] = MAX_DTE) -> "ChainSnapshots":
+        """Snapshots from the partitioned options store, reading only the dates and expiries replayed."""
+        store = store or OptionsStore()
+        columns = ["date", "symbol", "expiry", "strike", "optiontype", "bid", "ask", "price",
+                   "underlying_price", "delta", "iv"]
+        return cls(store.read(symbols, start, end, max_dte=max_dte, columns=columns))
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        df = df.rename(columns=str.lower).rename(columns={"price": "last", "lastprice": "last"})
+        df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+        df["expiry"] = df["expiry"].astype(str).str.replace("-", "")
+        df["symbol"] = df["symbol"].astype(str).str.upper()
+        right = df["right"] if "right" in df.columns else df["optiontype"]
+        df["right"] = right.astype(str).str.upper().str[0]
+        for col in ("bid", "ask", "last", "delta", "iv"):
+            if col not in df.columns:
+                df[col] = np.nan
+        df[["bid", "ask", "last"]] = df[["bid", "ask", "last"]].fillna(0.0)
+        missing = df["delta"].isna()
+        if missing.any():
+            mid = ((df["bid"] + df["ask"]) / 2).where((df["bid"] > 0) & (df["ask"] > 0), df["last"])
+            dte = (pd.to_datetime(df["expiry"]) - pd.to_datetime(df["date"])).dt.days + 1
+            priced = add_greeks(pd.DataFrame({"underlying_price": df["underlying_price"], "strike": df["strike"],
+                                              "dte": dte, "price": mid, "OptionType": df["right"],
+                                              "iv": df["iv"]}).loc[missing],
+                                iv_col="iv", rate=RISK_FREE_RATE)
+            df.loc[missing, ["delta", "iv"]] = priced[["delta", "iv"]].to_numpy()
+        return df.sort_values(["symbol", "date", "expiry", "right", "strike"], kind="stable").reset_index(drop=True)
+
+    def chain(self, symbol: str, day: str) -> Dict[str, np.ndarray]:
+        rows = self.index.get((symbol.upper(), day))
+        if rows is None:
+            return {col: values[:0] for col, values in self.columns.items()}
+        return {col: values[rows] for col, values in self.columns.items()}
+
+    def spot(self, symbol: str, day: str) -> Optional[float]:
+        rows = self.index.get((symbol.upper(), day))
+        return float(self.columns["underlying_price"][rows.start]) if rows is not None else None
+
+
+class SimClock:
+    """Replay clock over trading dates; `now()` is the decision time on the current date."""
+
+    def __init__(self, dates: Iterable[str], at: time = time(15, 30)):
+        self.dates = sorted(dates)
+        self.at = at
+        self.current: Optional[str] = None
+
+    def __iter__(self):
+        for day in self.dates:
+            self.current = day
+            yield day
+
+    def now(self) -> datetime:
+        return datetime.combine(date.fromisoformat(self.current), self.at)
+
+    def today(self) -> date:
+        return date.fromisoformat(self.current)
+
+
+class SimIB:
+    """
+    The slice of ib_insync.IB the strategies touch: `run`, `positions` and
+    `placeOrder`. Orders fill immediately against the current snapshot quote when
+    marketable at the mid or better; anything else is cancelled (IOC), so no
+    strategy ever waits on the wall clock.
+    """
+
+    def __init__(self, broker: "SimulatedIBKRClient"):
+        self.broker = broker
+        self.loop = asyncio.new_event_loop()
+        self._order_ids = itertools.count(1)
+        self.trades: Dict[int, Trade] = {}
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def positions(self) -> List[Position]:
+        return [Position("SIM", contract, qty, cost) for contract, qty, cost in self.broker.positions.values()]
+
+    def placeOrder(self, contract, order):
+        if not order.orderId:
+            order.orderId = next(self._order_ids)
+        trade = self.trades.get(order.orderId)
+        if trade is None:
+            trade = Trade(contract, order, OrderStatus(orderId=order.orderId, status="Submitted"))
+            self.trades[order.orderId] = trade
+        elif trade.isDone():
+            return trade
+        quote = self.broker.market_data.subscribe(contract)
+        bid, ask = quote.bid or 0.0, quote.ask or 0.0
+        mid = (bid + ask) / 2 if bid and ask else quote.last
+        price = order.lmtPrice
+        marketable = mid and ((order.action == "SELL" and price <= mid) or (order.action == "BUY" and price >= mid))
+        if marketable:
+            self.broker.fill(contract, order.action, order.totalQuantity, price)
+            trade.orderStatus.status = "Filled"
+            trade.orderStatus.filled = order.totalQuantity
+            trade.orderStatus.avgFillPrice = price
+            trade.filledEvent.emit(trade)
+        else:
+            trade.orderStatus.status = "Cancelled"
+            trade.cancelledEvent.emit(trade)
+        return trade
+
+
+class SimMarketData:
+    """Stands in for MarketDataSubscriptions: quotes come straight from the current snapshot."""
+
+    def __init__(self, broker: "SimulatedIBKRClient"):
+        self.broker = broker
+        self.hits = 0
+
+    def subscribe(self, contract):
+        self.hits += 1
+        day = self.broker.clock.current
+        if contract.secType == "STK":
+            spot = self.broker.snapshots.spot(contract.symbol, day) or 0.0
+            return Ticker(contract=contract, bid=spot, ask=spot, last=spot)
+        quote = self.broker.quote(contract.symbol, contract.lastTradeDateOrContractMonth, contract.strike,
+                                  contract.right, day)
+        if quote is None:
+            return Ticker(contract=contract)
+        return Ticker(contract=contract, bid=quote["bid"], ask=quote["ask"], last=quote["last"])
+
+    @contextlib.asynccontextmanager
+    async def lease(self, contracts, timeout=None):
+        yield [self.subscribe(contract) for contract in contracts]
+
+    def release(self, contract):
+        pass
+
+    def clear(self):
+        pass
+
+    async def wait_for_quotes(self, tickers, timeout):
+        return tickers
+
+    def stats(self) -> dict:
+        return {"active": 0, "max_lines": 0, "hits": self.hits, "misses": 0, "evictions": 0, "hit_rate": 1.0}
+
+
+class SimulatedIBKRClient:
+    """
+    Drop-in replacement for IBKRClient that trades against ChainSnapshots on a SimClock.
+
+    It exposes the same surface the strategies use (positions, chains, contract
+    qualification, order placement, selling calls and puts, `now()`), so
+    CoveredCallStrategy and CSPOverlay run unchanged. Chains are pruned with the
+    same DTE window and moneyness band as the live client. Short options still
+    open after expiry are cash-settled at intrinsic value against the underlying
+    price of the expiry date, and equity is marked to the snapshot every day.
+    """
+
+    def __init__(self, snapshots: ChainSnapshots, clock: SimClock, cash: float = 100_000.0):
+        self.snapshots = snapshots
+        self.clock = clock
+        self.cash = cash
+        self.positions: Dict[tuple, list] = {}  # key -> [contract, quantity, avg cost]
+        self.fills: List[dict] = []
+        self.equity: List[dict] = []
+        self.ib = SimIB(self)
+        self.market_data = SimMarketData(self)
+        self._con_ids = itertools.count(1)
+        self._con_id_map: Dict[tuple, int] = {}
+
+    # -------------------------
+    # IBKRClient surface
+    # -------------------------
+
+    def now(self) -> datetime:
+        return self.clock.now()
+
+    def has_underlying(self, symbol: str) -> bool:
+        return any(pos.contract.symbol == symbol and pos.contract.secType == "STK" and pos.position > 0
+                   for pos in self.ib.positions())
+
+    def buy_underlying(self, symbol: str, quantity: int = 100):
+        return self.ib.run(self.buy_underlying_async(symbol, quantity))
+
+    async def buy_underlying_async(self, symbol: str, quantity: int = 100):
+        contract = Stock(symbol, "SMART", "USD")
+        await self.qualify_async(contract)
+        spot = self.snapshots.spot(symbol, self.clock.current)
+        if spot:
+            self.ib.placeOrder(contract, LimitOrder("BUY", quantity, spot))
+
+    def get_open_calls(self, symbol: str):
+        for pos in self.ib.positions():
+            if pos.contract.symbol == symbol and pos.contract.right == "C":
+                return pos.contract
+        return None
+
+    def qualify(self, *contracts) -> List:
+        return self.ib.run(self.qualify_async(*contracts))
+
+    async def qualify_async(self, *contracts) -> List:
+        for contract in contracts:
+            key = self._key(contract)
+            if key not in self._con_id_map:
+                self._con_id_map[key] = next(self._con_ids)
+            contract.conId = self._con_id_map[key]
+        return list(contracts)
+
+    def option_contract(self, symbol: str, expiry: str, strike: float, right: str):
+        return self.ib.run(self.option_contract_async(symbol, expiry, strike, right))
+
+    async def option_contract_async(self, symbol: str, expiry: str, strike: float, right: str):
+        contract = Option(symbol, expiry.replace("-", ""), strike, right, "SMART", multiplier="100")
+        await self.qualify_async(contract)
+        return contract
+
+    def get_put_chain(self, symbol: str) -> List:
+        return self.ib.run(self.get_put_chain_async(symbol))
+
+    def get_option_chain(self, symbol: str) -> List:
+        return self.ib.run(self.get_option_chain_async(symbol))
+
+    async def get_put_chain_async(self, symbol: str) -> List:
+        return self._chain(symbol, "P")
+
+    async def get_option_chain_async(self, symbol: str) -> List:
+        return self._chain(symbol, "C")
+
+    def sell_option(self, option_data):
+        return self.ib.run(self.sell_option_async(option_data))
+
+    def sell_put(self, option_data):
+        return self.ib.run(self.sell_put_async(option_data))
+
+    async def sell_option_async(self, option_data):
+        return await self._sell(option_data, "C")
+
+    async def sell_put_async(self, option_data):
+        return await self._sell(option_data, "P")
+
+    # -------------------------
+    # Simulation
+    # -------------------------
+
+    async def _sell(self, option_data, right: str):
+        contract = await self.option_contract_async(option_data.symbol, option_data.expiry, option_data.strike, right)
+        order = LimitOrder("SELL", 1, round(option_data.bid or option_data.last or 1.0, 2))
+        return self.ib.placeOrder(contract, order)
+
+    def _chain(self, symbol: str, right: str) -> List:
+        day = self.clock.current
+        chain = self.snapshots.chain(symbol, day)
+        spot = self.snapshots.spot(symbol, day)
+        mask = chain["right"] == right
+        expiries = select_expiries(np.unique(chain["expiry"][mask]), MIN_DTE, MAX_DTE, MAX_EXPIRIES,
+                                   today=self.clock.today())
+        strikes = select_strikes(np.unique(chain["strike"][mask]), spot, right, MONEYNESS_ITM, MONEYNESS_OTM)
+        mask &= np.isin(chain["expiry"], expiries) & np.isin(chain["strike"], strikes)
+        options = []
+        for i in np.flatnonzero(mask):
+            bid, ask, last = chain["bid"][i], chain["ask"][i], chain["last"][i]
+            mark = (bid + ask) / 2 if bid and ask else last
+            strike = float(chain["strike"][i])
+            delta = chain["delta"][i]
+            options.append(SimpleNamespace(
+                symbol=symbol, strike=strike, expiry=chain["expiry"][i],
+                delta=float(delta) if np.isfinite(delta) else 0.0,
+                iv=float(chain["iv"][i]) if np.isfinite(chain["iv"][i]) else None,
+                mark=mark, yield_=mark / (strike * 100) if strike else 0,
+                bid=bid, ask=ask, last=last,
+                days_to_expiry=days_to_expiry(chain["expiry"][i], self.clock.today()),
+            ))
+        return options
+
+    def quote(self, symbol: str, expiry: str, strike: float, right: str, day: str) -> Optional[dict]:
+        chain = self.snapshots.chain(symbol, day)
+        match = np.flatnonzero((chain["expiry"] == expiry) & (chain["strike"] == strike) & (chain["right"] == right))
+        if match.size == 0:
+            return None
+        i = match[0]
+        return {"bid": chain["bid"][i], "ask": chain["ask"][i], "last": chain["last"][i]}
+
+    @staticmethod
+    def _key(contract) -> tuple:
+        return (contract.symbol, contract.secType, contract.lastTradeDateOrContractMonth,
+                float(contract.strike or 0.0), contract.right)
+
+    def fill(self, contract, action: str, quantity: float, price: float):
+        signed = quantity if action == "BUY" else -quantity
+        multiplier = 100 if contract.secType == "OPT" else 1
+        self.cash -= signed * price * multiplier
+        key = self._key(contract)
+        position = self.positions.setdefault(key, [contract, 0, price])
+        position[1] += signed
+        if position[1] == 0:
+            del self.positions[key]
+        self.fills.append({"date": self.clock.current, "symbol": contract.symbol, "secType": contract.secType,
+                           "expiry": contract.lastTradeDateOrContractMonth, "strike": contract.strike,
+                           "right": contract.right, "action": action, "quantity": quantity, "price": price})
+
+    def settle_expired(self):
+        """Cash-settle options that expired before the current date at intrinsic value."""
+        today = self.clock.current.replace("-", "")
+        for key, (contract, qty, _) in list(self.positions.items()):
+            expiry = contract.lastTradeDateOrContractMonth
+            if contract.secType != "OPT" or expiry >= today:
+                continue
+            spot = self._spot_on_or_before(contract.symbol, f"{expiry[:4]}-{expiry[4:6]}-{expiry[6:]}")
+            intrinsic = max(spot - contract.strike, 0.0) if contract.right == "C" else max(contract.strike - spot, 0.0)
+            self.cash += qty * intrinsic * 100
+            self.fills.append({"date": self.clock.current, "symbol": contract.symbol, "secType": "OPT",
+                               "expiry": expiry, "strike": contract.strike, "right": contract.right,
+                               "action": "EXPIRE", "quantity": qty, "price": intrinsic})
+            del self.positions[key]
+
+    def _spot_on_or_before(self, symbol: str, day: str) -> float:
+        dates = self.snapshots.dates
+        for i in range(np.searchsorted(dates, day, side="right") - 1, -1, -1):
+            spot = self.snapshots.spot(symbol, dates[i])
+            if spot is not None:
+                return spot
+        return 0.0
+
+    def mark(self) -> dict:
+        """Mark positions to the current snapshot and append the day's equity."""
+        day = self.clock.current
+        value = 0.0
+        for contract, qty, cost in self.positions.values():
+            if contract.secType == "STK":
+                value += qty * (self.snapshots.spot(contract.symbol, day) or cost)
+            else:
+                quote = self.quote(contract.symbol, contract.lastTradeDateOrContractMonth, contract.strike,
+                                   contract.right, day)
+                mark = ((quote["bid"] + quote["ask"]) / 2 or quote["last"]) if quote else cost
+                value += qty * mark * 100
+        row = {"date": day, "cash": self.cash, "positions": value, "equity": self.cash + value,
+               "open_positions": len(self.positions)}
+        self.equity.append(row)
+        return row
+
+
+def _seed(source: str, target: str):
+    """Copy live cached state (a file or a directory) into the replay's directory."""
+    if os.path.isdir(source):
+        shutil.copytree(source, target, dirs_exist_ok=True)
+    elif os.path.exists(source):
+        shutil.copy2(source, target)
+
+
+@contextlib.contextmanager
+def offline_side_effects(log_dir: str):
+    """
+    Keep a replay from posting Discord/webhook alerts or writing to any live state:
+    the trade log, the ML journal, the IV histories, the earnings calendar and the
+    price store are all redirected into `log_dir`. The caches start as copies of
+    the live ones and the copied price store is treated as fresh, so a replay only
+    downloads bars for symbols that were never stored.
+    """
+    import utils.data_loader as data_loader
+    import utils.discord_alerts as discord_alerts
+    import utils.earnings as earnings
+    import utils.iv_history as iv_history
+    import utils.trade_journal as trade_journal
+    import utils.trade_logger as trade_logger
+    import utils.webhook_logger as webhook_logger
+    os.makedirs(log_dir, exist_ok=True)
+    iv_root = os.path.join(log_dir, "iv_history")
+    calendar_path = os.path.join(log_dir, "earnings_calendar.json")
+    price_root = os.path.join(log_dir, "prices")
+    _seed(iv_history.HISTORY_ROOT, iv_root)
+    _seed(earnings.CALENDAR_PATH, calendar_path)
+    _seed(data_loader.price_store.root, price_root)
+    saved = (discord_alerts.DISCORD_WEBHOOK_URL, webhook_logger.WEBHOOK_URL, trade_logger.DB_PATH,
+             trade_journal.JOURNAL_PATH, iv_history.HISTORY_ROOT, earnings.CALENDAR_PATH, data_loader.price_store,
+             os.environ.pop("DISCORD_WEBHOOK_URL", None))
+    discord_alerts.DISCORD_WEBHOOK_URL = ""
+    webhook_logger.WEBHOOK_URL = None
+    trade_logger.DB_PATH = os.path.join(log_dir, "trades.db")
+    trade_journal.JOURNAL_PATH = os.path.join(log_dir, "trades.jsonl")
+    iv_history.HISTORY_ROOT = iv_root
+    earnings.CALENDAR_PATH = calendar_path
+    data_loader.price_store = PriceStore(price_root, max_age=float("inf"))
+    # Objects cached by an earlier replay into the same directory predate the fresh copies.
+    with iv_history._histories_lock:
+        for key in [key for key in iv_history._histories if key[0] == iv_root]:
+            del iv_history._histories[key]
+    with earnings._calendar_lock:
+        earnings._calendars.pop(calendar_path, None)
+    try:
+        yield
+    finally:
+        (discord_alerts.DISCORD_WEBHOOK_URL, webhook_logger.WEBHOOK_URL, trade_logger.DB_PATH,
+         trade_journal.JOURNAL_PATH, iv_history.HISTORY_ROOT, earnings.CALENDAR_PATH, data_loader.price_store,
+         env) = saved
+        if env is not None:
+            os.environ["DISCORD_WEBHOOK_URL"] = env
+
+
+def replay(snapshots: ChainSnapshots, watchlist: Optional[List[str]] = None, start: Optional[str] = None,
+           end: Optional[str] = None, cost_basis=650, cash: float = 100_000.0,
+           log_dir: str = "backtests/replay") -> dict:
+    """
+    Run the live StrategyManager day by day over the snapshot dates in [start, end].
+    Returns the simulated broker's equity curve and fills as DataFrames.
+    """
+    from strategy.manager import StrategyManager
+
+    dates = [d for d in snapshots.dates if (start is None or d >= start) and (end is None or d <= end)]
+    clock = SimClock(dates)
+    broker = SimulatedIBKRClient(snapshots, clock, cash)
+    manager = StrategyManager(broker, watchlist=watchlist or snapshots.symbols, cost_basis=cost_basis)
+    outcomes = []
+    with offline_side_effects(log_dir):
+        try:
+            for day in clock:
+                broker.settle_expired()
+                outcomes.append({"date": day, **manager.run()})
+                broker.mark()
+        finally:
+            manager.close()
+    logger.info(f"[REPLAY] {len(dates)} days, {len(broker.fills)} fills, "
+                f"final equity {broker.equity[-1]['equity'] if broker.equity else cash:.2f}")
+    return {"equity": pd.DataFrame(broker.equity), "fills": pd.DataFrame(broker.fills),
+            "outcomes": pd.DataFrame(outcomes)}
@@ -1,16 +1,33 @@
+import asyncio
+import time
 from ib_insync import LimitOrder
+from config import SNAPSHOT_TIMEOUT
+from utils.market_data import valid_price
 
 class SmartExecutor:
-    def __init__(self, ibkr_client):
+    def __init__(self, ibkr_client, attempt_timeout=2.0):
         self.ibkr = ibkr_client
+        self.attempt_timeout = attempt_timeout
+        self.fill_latencies = {}  # orderId -> seconds from decision to fill
 
     def place_limit_order(self, contract, quantity, action="SELL", max_attempts=3):
-        market_data = self.ibkr.ib.reqMktData(contract, "", False, False)
-        self.ibkr.ib.sleep(2)
+        return self.ibkr.ib.run(self.place_limit_order_async(contract, quantity, action, max_attempts))
 
-        bid = market_data.bid
-        ask = market_data.ask
-        mark = (bid + ask) / 2 if bid and ask else market_data.last or 0
+    async def place_limit_order_async(self, contract, quantity, action="SELL", max_attempts=3):
+        """
+        Works a single limit order: waits for the first quote instead of sleeping,
+        reacts to the trade's fill/cancel events (fed by orderStatusEvent and
+        execDetailsEvent) as soon as they arrive, and reprices the same order in
+        place between attempts rather than stacking new ones.
+        """
+        decided_at = time.perf_counter()
+        async with self.ibkr.market_data.lease([contract], SNAPSHOT_TIMEOUT) as (market_data,):
+            await self.ibkr.market_data.wait_for_quotes([market_data], SNAPSHOT_TIMEOUT)
+
+        bid = market_data.bid if valid_price(market_data.bid) else None
+        ask = market_data.ask if valid_price(market_data.ask) else None
+        last = market_data.last if valid_price(market_data.last) else 0
+        mark = (bid + ask) / 2 if bid and ask else last
 
         if not mark:
             print("[SMART ORDER] No valid market price available.")
@@ -22,15 +39,41 @@ class SmartExecutor:
         order = LimitOrder(action, quantity, limit_price)
         trade = self.ibkr.ib.placeOrder(contract, order)
 
-        for attempt in range(max_attempts):
-            self.ibkr.ib.sleep(2)
-            if trade.orderStatus.status == "Filled":
-                print(f"[ORDER] Filled at attempt {attempt+1}")
-                return trade
-            else:
-                print(f"[RETRY] Attempt {attempt+1} failed, adjusting limit...")
-                limit_price *= 0.99  # tighten price slightly
-                trade = self.ibkr.ib.placeOrder(contract, LimitOrder(action, quantity, round(limit_price, 2)))
+        done = asyncio.Event()
+        filled_at = []
+
+        def on_filled(trade):
+            filled_at.append(time.perf_counter())
+            done.set()
+
+        def on_cancelled(trade):
+            done.set()
+
+        trade.filledEvent += on_filled
+        trade.cancelledEvent += on_cancelled
+        try:
+            for attempt in range(max_attempts):
+                if not trade.isDone():
+                    try:
+                        await asyncio.wait_for(done.wait(), self.attempt_timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                if trade.orderStatus.status == "Filled":
+                    latency = (filled_at[0] if filled_at else time.perf_counter()) - decided_at
+                    self.fill_latencies[order.orderId] = latency
+                    print(f"[ORDER] Filled at attempt {attempt+1}, {latency * 1000:.0f} ms after decision")
+                    return trade
+                if trade.isDone():
+                    print(f"[ORDER] Order ended with status {trade.orderStatus.status}")
+                    return trade
+                if attempt < max_attempts - 1:
+                    print(f"[RETRY] Attempt {attempt+1} failed, adjusting limit...")
+                    limit_price *= 0.99 if action == "SELL" else 1.01  # tighten price slightly
+                    order.lmtPrice = round(limit_price, 2)
+                    self.ibkr.ib.placeOrder(contract, order)  # same orderId: modifies in place
+        finally:
+            trade.filledEvent -= on_filled
+            trade.cancelledEvent -= on_cancelled
 
         print("[ORDER] Max attempts reached without fill.")
-        return trade
\ No newline at end of file
+        return trade
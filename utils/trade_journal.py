@@ -0,0 +1,211 @@
+# utils/trade_journal.py
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are serialised within one process only
+    fcntl = None
+
+from config import TRADE_JOURNAL_PATH
+
+logger = logging.getLogger(__name__)
+
+LEGACY_JSON_PATH = "logs/trades.json"
+JOURNAL_PATH = TRADE_JOURNAL_PATH
+
+_OFFSET = struct.Struct("<q")
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()  # NumPy scalars
+    return str(value)
+
+
+class TradeJournal:
+    """
+    Append-only ML trade journal: one JSON record per line in `path`, plus a
+    sidecar `<path>.idx` holding each record's byte offset as a fixed-width
+    int64.
+
+    Appending writes one line and one index entry, independent of history
+    size. The record count is the index size / 8, and record k starts at the
+    offset stored at byte 8k, so a reader holding a checkpoint (the count it
+    last saw) seeks straight to the new records and parses only those. If a
+    crash leaves lines the index does not cover, they are indexed on open, and
+    a torn final line is cut off. Writes and that repair hold an exclusive lock
+    on `<path>.lock`, so opening the journal in one process never mistakes a
+    record another process is still writing for a crashed one.
+    """
+
+    def __init__(self, path: str = TRADE_JOURNAL_PATH):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._locked():
+            self._repair()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and, where available, an exclusive lock shared with other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self.index_path) // _OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def _offset(self, position: int) -> int:
+        with open(self.index_path, "rb") as idx:
+            idx.seek(position * _OFFSET.size)
+            return _OFFSET.unpack(idx.read(_OFFSET.size))[0]
+
+    def append(self, record: dict) -> int:
+        """Append one record; returns its position (the new count - 1)."""
+        line = (json.dumps(record, default=_json_default) + "\n").encode()
+        with self._locked():
+            with open(self.path, "ab") as data:
+                offset = data.seek(0, os.SEEK_END)
+                data.write(line)
+            with open(self.index_path, "ab") as idx:
+                idx.write(_OFFSET.pack(offset))
+                position = idx.tell() // _OFFSET.size - 1
+        return position
+
+    def extend(self, records) -> int:
+        """Append many records with one open of each file; returns the number appended."""
+        lines = [(json.dumps(r, default=_json_default) + "\n").encode() for r in records]
+        with self._locked():
+            with open(self.path, "ab") as data:
+                offset = data.seek(0, os.SEEK_END)
+                offsets = []
+                for line in lines:
+                    offsets.append(offset)
+                    offset += len(line)
+                data.write(b"".join(lines))
+            with open(self.index_path, "ab") as idx:
+                idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+        return len(lines)
+
+    def iter_records(self, since: int = 0) -> Iterator[dict]:
+        """Records at positions >= `since`, read from that record's offset onward."""
+        count = self.count()
+        if since >= count:
+            return
+        with open(self.path, "rb") as data:
+            data.seek(self._offset(since))
+            for _ in range(count - since):
+                line = data.readline()
+                if not line:
+                    break
+                yield json.loads(line)
+
+    def read(self, since: int = 0) -> List[dict]:
+        return list(self.iter_records(since))
+
+    def read_frame(self, since: int = 0) -> pd.DataFrame:
+        return pd.DataFrame(self.read(since))
+
+    def tail(self, n: int) -> List[dict]:
+        return self.read(max(self.count() - n, 0))
+
+    def _repair(self):
+        """Index complete lines past the last indexed record; drop a torn final line."""
+        if not os.path.exists(self.path):
+            return
+        count = self.count()
+        with open(self.path, "rb+") as data:
+            if count:
+                data.seek(self._offset(count - 1))
+                data.readline()
+            end = data.tell()
+            size = data.seek(0, os.SEEK_END)
+            if end == size:
+                return
+            data.seek(end)
+            offsets = []
+            while True:
+                start = data.tell()
+                line = data.readline()
+                if not line.endswith(b"\n"):
+                    data.truncate(start)
+                    break
+                offsets.append(start)
+        if offsets:
+            with open(self.index_path, "ab") as idx:
+                idx.write(b"".join(_OFFSET.pack(o) for o in offsets))
+            logger.warning(f"[JOURNAL] Recovered {len(offsets)} unindexed records in {self.path}")
+
+    def migrate_json(self, json_path: str = LEGACY_JSON_PATH) -> int:
+        """Append a legacy JSON-array trade log once, then rename it to `<path>.migrated`."""
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path) as f:
+            records = json.load(f)
+        count = self.extend(records)
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"[JOURNAL] Migrated {count} records from {json_path} into {self.path}")
+        return count
+
+
+class JournalReader:
+    """Keeps a journal's records as a DataFrame, reading only what was appended since the last refresh."""
+
+    def __init__(self, journal: "TradeJournal"):
+        self.journal = journal
+        self.checkpoint = 0
+        self.frame = pd.DataFrame()
+
+    def refresh(self) -> pd.DataFrame:
+        if self.journal.count() < self.checkpoint:  # journal was replaced; start over
+            self.checkpoint, self.frame = 0, pd.DataFrame()
+        new = self.journal.read_frame(self.checkpoint)
+        if not new.empty:
+            self.frame = pd.concat([self.frame, new], ignore_index=True) if not self.frame.empty else new
+            self.checkpoint += len(new)
+        return self.frame
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path: Optional[str] = None) -> TradeJournal:
+    path = path or JOURNAL_PATH
+    with _journals_lock:
+        if path not in _journals:
+            journal = TradeJournal(path)
+            if path == TRADE_JOURNAL_PATH and journal.count() == 0:
+                journal.migrate_json(LEGACY_JSON_PATH)
+            _journals[path] = journal
+        return _journals[path]
+
+
+def main():
+    json_path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_JSON_PATH
+    print(f"Migrated {TradeJournal().migrate_json(json_path)} records into {TRADE_JOURNAL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
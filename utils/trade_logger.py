@@ -1,12 +1,8 @@
 
-import csv
-import os
-from datetime import datetime
+from config import TRADE_DB_PATH
+from utils.trade_store import get_trade_store
 
-LOG_PATH = "logs/trade_history.csv"
-
-# Ensure log directory exists
-os.makedirs("logs", exist_ok=True)
+DB_PATH = TRADE_DB_PATH
 
 def log_trade(trade_data):
     """
@@ -14,17 +10,14 @@ def log_trade(trade_data):
     {
         "Date": str,
         "Type": str,
+        "Symbol": str,
         "Strike": float,
         "Premium": float,
         "DTE": int,
         "Conviction": float,
         "Overrides": str
     }
+    Inserted as one row into the SQLite trade store (utils/trade_store.py);
+    keys outside its schema are kept in the row's `extra` JSON.
     """
-    file_exists = os.path.isfile(LOG_PATH)
-
-    with open(LOG_PATH, mode='a', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=trade_data.keys())
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(trade_data)
+    return get_trade_store(DB_PATH).insert(trade_data)
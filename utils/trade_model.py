@@ -1,25 +1,29 @@
+import numpy as np
 import pandas as pd
-import json
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score
 import joblib
 import os
+from config import TRADE_JOURNAL_PATH
+from utils.trade_journal import JournalReader, get_journal
+
+FEATURES = ["delta", "roc", "rsi", "momentum", "yield_to_strike", "iv_percentile", "near_earnings"]
 
 class TradeModel:
-    def __init__(self, log_path="logs/trades.json", model_path="models/trade_model.pkl"):
+    def __init__(self, log_path=TRADE_JOURNAL_PATH, model_path="models/trade_model.pkl"):
         self.log_path = log_path
         self.model_path = model_path
         self.model = None
+        self._reader = None
 
     def load_data(self):
-        if not os.path.exists(self.log_path):
+        """Scored journal records; each call only parses records appended since the previous one."""
+        if self._reader is None:
+            self._reader = JournalReader(get_journal(self.log_path))
+        df = self._reader.refresh()
+        if df.empty or "score" not in df.columns:
             return pd.DataFrame()
-
-        with open(self.log_path, "r") as f:
-            trades = json.load(f)
-
-        df = pd.DataFrame(trades)
         df = df.dropna(subset=["score"])
         return df
 
@@ -29,8 +33,7 @@ class TradeModel:
             print("[ML] Not enough data to train.")
             return None
 
-        features = ["delta", "roc", "rsi", "momentum", "yield_to_strike", "iv_percentile", "near_earnings"]
-        X = df[features]
+        X = df[FEATURES]
         y = df["score"]
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -50,6 +53,14 @@ class TradeModel:
         return self.model
 
     def predict_score(self, feature_dict):
+        scores = self.predict_many([feature_dict])
+        return None if scores is None else scores[0]
+
+    def predict_many(self, rows):
+        """
+        Scores a batch in a single model call. `rows` is a DataFrame or a list of
+        feature dicts; returns an array aligned with it, or None without a model.
+        """
         if not self.model:
             self.load_model()
 
@@ -57,6 +68,7 @@ class TradeModel:
             print("[ML] No trained model available.")
             return None
 
-        features = ["delta", "roc", "rsi", "momentum", "yield_to_strike", "iv_percentile", "near_earnings"]
-        X = pd.DataFrame([feature_dict])[features]
-        return self.model.predict(X)[0]
\ No newline at end of file
+        X = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if X.empty:
+            return np.array([])
+        return self.model.predict(X[FEATURES])
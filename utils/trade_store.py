@@ -0,0 +1,227 @@
+# utils/trade_store.py
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from config import TRADE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+LEGACY_CSV_PATH = "logs/trade_history.csv"
+
+# (name used by log_trade callers and the dashboard, SQL column, SQL type)
+FIELDS = [
+    ("Date", "date", "TEXT"),
+    ("Type", "type", "TEXT"),
+    ("Symbol", "symbol", "TEXT"),
+    ("Strike", "strike", "REAL"),
+    ("Premium", "premium", "REAL"),
+    ("DTE", "dte", "INTEGER"),
+    ("Expiry", "expiry", "TEXT"),
+    ("Conviction", "conviction", "REAL"),
+    ("Overrides", "overrides", "TEXT"),
+    ("ML Score", "ml_score", "REAL"),
+    ("Hybrid Score", "hybrid_score", "REAL"),
+    ("Underlying Expiry Price", "underlying_expiry_price", "REAL"),
+    ("Actual PnL", "actual_pnl", "REAL"),
+]
+_COLUMN = {name: column for name, column, _ in FIELDS}
+_COLUMN.update({name.lower(): column for name, column, _ in FIELDS})
+_COLUMN.update({column: column for _, column, _ in FIELDS})
+_NAME = {column: name for name, column, _ in FIELDS}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    logged_at TEXT NOT NULL,
+    {", ".join(f"{column} {sql_type}" for _, column, sql_type in FIELDS)},
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_date ON trades(date);
+CREATE INDEX IF NOT EXISTS idx_trades_type ON trades(type, date);
+CREATE INDEX IF NOT EXISTS idx_trades_strike ON trades(strike);
+CREATE INDEX IF NOT EXISTS idx_trades_unreconciled ON trades(expiry) WHERE actual_pnl IS NULL;
+CREATE INDEX IF NOT EXISTS idx_trades_unreconciled_type ON trades(type, expiry) WHERE actual_pnl IS NULL;
+"""
+
+
+def _plain(value):
+    """NumPy scalars (from DataFrame rows) as the Python values sqlite3 can bind."""
+    return value.item() if hasattr(value, "item") else value
+
+
+class TradeStore:
+    """
+    Trade history in an embedded SQLite database with a fixed schema.
+
+    The database runs in WAL mode, so the bot can insert while the dashboard and
+    the reporting jobs read, and readers never see a half-written row. Each
+    thread gets its own connection; writers wait on `busy_timeout` instead of
+    failing. Every read goes through an indexed query (by date, type, strike, or
+    the partial index over unreconciled rows) rather than a scan of the history.
+    Keys a caller logs outside the schema are kept as JSON in `extra`.
+    """
+
+    def __init__(self, path: str = TRADE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(trade: dict) -> dict:
+        row, extra = {}, {}
+        for key, value in trade.items():
+            column = _COLUMN.get(key, _COLUMN.get(str(key).lower()))
+            if column is None:
+                extra[key] = value
+            elif value is not None and not (isinstance(value, float) and pd.isna(value)):
+                row[column] = _plain(value)
+        if "expiry" in row:  # IB contracts carry YYYYMMDD; expiry comparisons need ISO dates
+            row["expiry"] = pd.Timestamp(str(row["expiry"])).strftime("%Y-%m-%d")
+        elif "date" in row and "dte" in row:
+            row["expiry"] = (pd.Timestamp(row["date"]) + timedelta(days=int(row["dte"]))).strftime("%Y-%m-%d")
+        row["logged_at"] = datetime.now().isoformat(timespec="seconds")
+        row["extra"] = json.dumps(extra, default=str) if extra else None
+        return row
+
+    def insert(self, trade: dict) -> int:
+        """Insert one trade; returns its id."""
+        row = self._row(trade)
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(f"INSERT INTO trades ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                                  list(row.values()))
+        return cursor.lastrowid
+
+    def insert_many(self, trades: Iterable[dict]) -> int:
+        """Insert trades in one transaction (used for migrations); returns the number inserted."""
+        conn = self._conn()
+        count = 0
+        with conn:
+            for trade in trades:
+                row = self._row(trade)
+                conn.execute(f"INSERT INTO trades ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                             list(row.values()))
+                count += 1
+        return count
+
+    def update(self, trade_id: int, **fields) -> None:
+        self.update_many([trade_id], {name: [value] for name, value in fields.items()})
+
+    def update_many(self, ids: Iterable[int], fields: dict) -> int:
+        """Set `fields` ({name: values aligned with ids}) on the given rows in one transaction."""
+        ids = [int(i) for i in ids]
+        columns = [_COLUMN[name] for name in fields]
+        values = [list(v) for v in fields.values()]
+        params = [[None if pd.isna(v[i]) else _plain(v[i]) for v in values] + [trade_id]
+                  for i, trade_id in enumerate(ids)]
+        conn = self._conn()
+        with conn:
+            conn.executemany(f"UPDATE trades SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?", params)
+        return len(ids)
+
+    def query(self, where: str = "", params: Iterable = (), columns: Optional[Iterable[str]] = None,
+              order: str = "id", limit: Optional[int] = None) -> pd.DataFrame:
+        """Rows as a DataFrame with the log's column names (plus `id`)."""
+        selected = ["id"] + ([_COLUMN[c] for c in columns] if columns is not None else list(_NAME))
+        sql = f"SELECT {', '.join(selected)} FROM trades"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(sql, self._conn(), params=list(params)).rename(columns=_NAME)
+
+    def all(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return self.query(columns=columns)
+
+    def on(self, day=None, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Trades dated `day` (default today)."""
+        day = pd.Timestamp(day or datetime.now()).strftime("%Y-%m-%d")
+        return self.query("date = ?", [day], columns)
+
+    def between(self, start, end, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return self.query("date BETWEEN ? AND ?", [pd.Timestamp(start).strftime("%Y-%m-%d"),
+                                                   pd.Timestamp(end).strftime("%Y-%m-%d")], columns)
+
+    def of_type(self, trade_type: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return self.query("type = ?", [trade_type], columns)
+
+    def unreconciled(self, expired_before=None, columns: Optional[Iterable[str]] = None,
+                     types: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Trades missing Actual PnL, optionally only those whose expiry is before
+        `expired_before` and whose type is one of `types`. Filtering by type here
+        keeps rows reconcile never fills out of every later read.
+        """
+        where, params = ["actual_pnl IS NULL"], []
+        if types is not None:
+            types = list(types)
+            where.append(f"type IN ({', '.join('?' * len(types))})")
+            params.extend(types)
+        if expired_before is not None:
+            where.append("expiry < ?")
+            params.append(pd.Timestamp(expired_before).strftime("%Y-%m-%d"))
+        return self.query(" AND ".join(where), params, columns)
+
+    def recent(self, n: int = 5, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        return self.query(columns=columns, order="id DESC", limit=n).iloc[::-1].reset_index(drop=True)
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def max_id(self) -> int:
+        """Highest trade id (0 when empty), read from the end of the rowid b-tree rather than a count."""
+        return self._conn().execute("SELECT MAX(id) FROM trades").fetchone()[0] or 0
+
+    def migrate_csv(self, csv_path: str = LEGACY_CSV_PATH) -> int:
+        """Import a legacy trade_history.csv once, then rename it to `<path>.migrated`."""
+        if not os.path.exists(csv_path):
+            return 0
+        df = pd.read_csv(csv_path)
+        count = self.insert_many(df.to_dict("records"))
+        os.replace(csv_path, f"{csv_path}.migrated")
+        logger.info(f"[TRADE STORE] Migrated {count} trades from {csv_path} into {self.path}")
+        return count
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_trade_store(path: str = None) -> TradeStore:
+    path = path or TRADE_DB_PATH
+    with _stores_lock:
+        if path not in _stores:
+            store = TradeStore(path)
+            if path == TRADE_DB_PATH and store.count() == 0:
+                store.migrate_csv(LEGACY_CSV_PATH)
+            _stores[path] = store
+        return _stores[path]
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else LEGACY_CSV_PATH
+    print(f"Migrated {TradeStore().migrate_csv(csv_path)} trades into {TRADE_DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,31 @@
-import yfinance as yf
-import numpy as np
+import pandas as pd
+from utils.data_loader import load_bars
+from utils.iv_history import get_iv_history
 from datetime import datetime, timedelta
 
 class VolatilityToolkit:
     def __init__(self, symbol="NVDA"):
         self.symbol = symbol
 
-    def get_iv_percentile(self, days=252):
-        ticker = yf.Ticker(self.symbol)
-        hist = ticker.history(period="1y")
-        if "Close" not in hist or hist.empty:
+    def get_iv_percentile(self, date=None):
+        """
+        Percentile of today's ATM implied vol (realized vol until enough IV
+        history is recorded) within its trailing window, from the IV history.
+        Only daily closes not yet seen by the history are processed, and only
+        sessions completed before `date` (default now) are loaded.
+        """
+        history = get_iv_history(self.symbol)
+        try:
+            completed = load_bars(self.symbol, period="2y", interval="1d",
+                                  as_of=date if date is not None else pd.Timestamp.now(tz="UTC"))
+        except ValueError:
+            return 0.5  # fallback: no stored bars and the refresh failed
+        history.update_closes(completed.index, completed["Close"].to_numpy())
+        history.save()
+        pct = history.iv_percentile(date)
+        if pct is None:
             return 0.5  # fallback
-
-        hist['returns'] = np.log(hist['Close'] / hist['Close'].shift(1))
-        hist.dropna(inplace=True)
-        hist['vol'] = hist['returns'].rolling(window=21).std() * np.sqrt(252)
-
-        current_vol = hist['vol'].iloc[-1]
-        iv_rank = np.sum(hist['vol'] < current_vol) / len(hist['vol'])
-        return round(iv_rank, 2)
+        return round(pct, 2)
 
     def calculate_roc(self, premium, strike, days_to_expiry):
         capital = strike * 100